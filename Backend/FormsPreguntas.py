@@ -1,26 +1,21 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from dotenv import load_dotenv
-from supabase import create_client, Client
+from config import get_supabase
+from puntaje import ScoringEngine
+from niveles import Clasificador, SIN_EVALUAR
 from datetime import datetime
+from collections import OrderedDict
+import hashlib
+import time
+import jwt
 import os
 
 # ==============================
 # CONFIGURACIÓN
 # ==============================
-dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(dotenv_path=dotenv_path)
-
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
 SECRET_KEY = os.getenv('SECRET_KEY')
 
-if not url or not key:
-    raise RuntimeError("No se cargaron las variables de entorno de Supabase")
-
-supabase: Client = create_client(url, key)
-
 # ==============================
 # APP FASTAPI
 # ==============================
@@ -40,52 +35,96 @@ app.add_middleware(
 # ==============================
 security = HTTPBearer()
 
+# Verificación local del JWT (SUPABASE_JWT_SECRET / SUPABASE_JWKS_URL) con cache
+# acotada de tokens ya validados; sin clave se consulta a supabase.auth.get_user.
+JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+JWKS_URL = os.getenv("SUPABASE_JWKS_URL")
+JWT_AUDIENCIA = os.getenv("SUPABASE_JWT_AUD", "authenticated")
+AUTH_MODO = os.getenv("AUTH_MODO", "local" if (JWT_SECRET or JWKS_URL) else "remoto")
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+
+_cache_tokens = OrderedDict()
+_jwks_client = jwt.PyJWKClient(JWKS_URL, cache_keys=True) if JWKS_URL else None
+
+class UsuarioToken:
+    def __init__(self, claims: dict):
+        self.id = claims["sub"]
+        self.email = claims.get("email")
+        self.role = claims.get("role")
+        self.app_metadata = claims.get("app_metadata") or {}
+
+def verificar_jwt_local(token: str) -> dict:
+    if JWT_SECRET:
+        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"], audience=JWT_AUDIENCIA)
+    clave = _jwks_client.get_signing_key_from_jwt(token).key
+    return jwt.decode(token, clave, algorithms=["RS256", "ES256"], audience=JWT_AUDIENCIA)
+
+def verificar_remoto(token: str):
+    user = get_supabase().auth.get_user(token)
+    if not user or not user.user:
+        raise ValueError("Token inválido")
+    return user.user
+
 async def token_required(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
+    clave = hashlib.sha256(token.encode()).hexdigest()
+    entrada = _cache_tokens.get(clave)
+    if entrada and entrada[1] > time.time():
+        _cache_tokens.move_to_end(clave)
+        return entrada[0]
     try:
-        user = supabase.auth.get_user(token)
-        if not user or not user.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido"
-            )
-        return user.user
+        claims = jwt.decode(token, options={"verify_signature": False})
+        if AUTH_MODO == "local":
+            try:
+                claims = verificar_jwt_local(token)
+                usuario = UsuarioToken(claims)
+            except jwt.PyJWKClientError:
+                usuario = verificar_remoto(token)
+        else:
+            usuario = verificar_remoto(token)
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido"
         )
+    expira = min(time.time() + AUTH_CACHE_TTL, claims.get("exp", float("inf")))
+    _cache_tokens[clave] = (usuario, expira)
+    while len(_cache_tokens) > AUTH_CACHE_MAX:
+        _cache_tokens.popitem(last=False)
+    return usuario
 
 # ==============================
 # LÓGICA TERMÓMETRO
 # ==============================
-def calcular_nivel_exportador(porcentaje: float):
-    if porcentaje >= 85:
-        return {"nivel": "excelente", "color": "green", "puede_exportar": True,
-                "mensaje": "¡Listo para exportar! Tienes todas las capacidades",
-                "descripcion": "Cuentas con todos los requisitos necesarios"}
-    elif porcentaje >= 70:
-        return {"nivel": "bueno", "color": "light-green", "puede_exportar": True,
-                "mensaje": "Casi listo - Solo algunos detalles por mejorar",
-                "descripcion": "Tienes la mayoría de requisitos cubiertos"}
-    elif porcentaje >= 50:
-        return {"nivel": "moderado", "color": "yellow", "puede_exportar": False,
-                "mensaje": "Necesitas mejorar varias áreas",
-                "descripcion": "Estás en buen camino pero faltan cosas importantes"}
-    elif porcentaje >= 30:
-        return {"nivel": "bajo", "color": "orange", "puede_exportar": False,
-                "mensaje": "Te falta bastante preparación",
-                "descripcion": "Necesitas trabajar en muchos aspectos básicos"}
-    else:
-        return {"nivel": "crítico", "color": "red", "puede_exportar": False,
-                "mensaje": "No estás preparado para exportar",
-                "descripcion": "Te faltan la mayoría de requisitos fundamentales"}
-
-def calcular_puntaje_pregunta(pregunta, respuesta):
-    puntos_si = pregunta.get('points_for_yes', 1)
-    puntos_no = pregunta.get('points_for_no', 0)
-    peso = pregunta.get('weight', 1)
-    return puntos_si * peso if str(respuesta).lower() == "yes" else puntos_no * peso
+# Motores de puntaje compilados por formulario (ver puntaje.py, igual al de BackendOrganizado).
+# El máximo de cada pregunta es weight * max(points_for_yes, points_for_no) y
+# no weight como antes: con puntos propios el porcentaje ya no pasa de 100; con
+# los puntos por defecto (1 y 0) el resultado no cambia.
+MOTOR_TTL = float(os.getenv("CATALOGO_TTL", "600"))
+_motores = {}
+
+def motor_puntaje(form_id: str) -> ScoringEngine:
+    entrada = _motores.get(form_id)
+    if entrada and entrada[1] > time.time():
+        return entrada[0]
+    preguntas_resp = get_supabase().table('questions').select('*').eq('form_id', form_id).execute()
+    motor = ScoringEngine(preguntas_resp.data)
+    _motores[form_id] = (motor, time.time() + MOTOR_TTL)
+    return motor
+
+# Bandas del termómetro por formulario (niveles.py, igual al de BackendOrganizado)
+_clasificadores = {}
+
+def clasificador_niveles(form_id: str) -> Clasificador:
+    entrada = _clasificadores.get(form_id)
+    if entrada and entrada[1] > time.time():
+        return entrada[0]
+    filas = get_supabase().table('readiness_levels').select('*')\
+        .or_(f"form_id.eq.{form_id},form_id.is.null").execute()
+    clasificador = Clasificador.desde_filas(filas.data, form_id)
+    _clasificadores[form_id] = (clasificador, time.time() + MOTOR_TTL)
+    return clasificador
 
 # ==============================
 # ENDPOINTS FORMULARIOS
@@ -93,7 +132,7 @@ def calcular_puntaje_pregunta(pregunta, respuesta):
 @app.get("/api/formularios")
 async def obtener_formularios(current_user: dict = Depends(token_required)):
     try:
-        respuesta = supabase.table('forms').select('*').eq('is_active', True).execute()
+        respuesta = get_supabase().table('forms').select('*').eq('is_active', True).execute()
         return {"exito": True, "formularios": respuesta.data}
     except Exception as e:
         raise HTTPException(500, f"Error al obtener formularios: {str(e)}")
@@ -101,7 +140,7 @@ async def obtener_formularios(current_user: dict = Depends(token_required)):
 @app.get("/api/formularios/{form_id}/preguntas")
 async def obtener_preguntas(form_id: str, current_user: dict = Depends(token_required)):
     try:
-        respuesta = supabase.table('questions')\
+        respuesta = get_supabase().table('questions')\
             .select('*').eq('form_id', form_id).order('order_index').execute()
         return {"exito": True, "preguntas": respuesta.data}
     except Exception as e:
@@ -121,33 +160,17 @@ async def responder_termometro(form_id: str, request: Request, current_user: dic
 
         respuestas = datos.get("respuestas")  # [{question_id, response_value}]
 
-        preguntas_resp = supabase.table('questions').select('*').eq('form_id', form_id).execute()
-        preguntas_dict = {p['id']: p for p in preguntas_resp.data}
-
-        puntaje_total = 0
-        puntaje_maximo = 0
-        registros_respuestas = []
-
-        for respuesta in respuestas:
-            qid = respuesta.get("question_id")
-            val = respuesta.get("response_value")
-            if qid not in preguntas_dict:
-                continue
-            pregunta = preguntas_dict[qid]
-            peso = pregunta.get("weight", 1)
-            puntaje_maximo += peso
-            puntos = calcular_puntaje_pregunta(pregunta, val)
-            puntaje_total += puntos
-            registros_respuestas.append({
-                "user_id": user_id, "form_id": form_id,
-                "question_id": qid, "response_value": str(val), "score": puntos
-            })
-
-        if registros_respuestas:
-            supabase.table("user_responses").upsert(registros_respuestas, on_conflict="user_id,question_id").execute()
-
-        porcentaje = (puntaje_total / puntaje_maximo * 100) if puntaje_maximo > 0 else 0
-        info_nivel = calcular_nivel_exportador(porcentaje)
+        resultado = motor_puntaje(form_id).score(respuestas)
+        puntaje_total = resultado.puntaje_total
+        puntaje_maximo = resultado.puntaje_maximo
+        registros_respuestas = [
+            {"user_id": user_id, "form_id": form_id,
+             "question_id": qid, "response_value": val, "score": puntos}
+            for qid, val, puntos in resultado.detalle
+        ]
+
+        porcentaje = resultado.porcentaje
+        info_nivel = clasificador_niveles(form_id).clasificar(porcentaje).info
 
         datos_puntaje = {
             "user_id": user_id, "form_id": form_id,
@@ -156,7 +179,13 @@ async def responder_termometro(form_id: str, request: Request, current_user: dic
             "readiness_color": info_nivel["color"], "can_export": info_nivel["puede_exportar"],
             "completion_status": "complete", "completed_at": datetime.utcnow().isoformat()
         }
-        supabase.table("user_form_scores").upsert(datos_puntaje, on_conflict="user_id,form_id").execute()
+        # Respuestas, puntaje e historial en una sola transacción. Requiere la
+        # función guardar_evaluaciones de BackendOrganizado/sql (003, redefinida
+        # en 008, 010 y 012): sin esas migraciones en el proyecto de Supabase la
+        # llamada falla y /responder devuelve 500.
+        get_supabase().rpc("guardar_evaluaciones", {
+            "p_respuestas": registros_respuestas, "p_puntajes": [datos_puntaje]
+        }).execute()
 
         return {"exito": True, "mensaje": "Evaluación completada", "termometro": {
             "puntaje_total": puntaje_total, "puntaje_maximo": puntaje_maximo,
@@ -169,19 +198,17 @@ async def responder_termometro(form_id: str, request: Request, current_user: dic
 async def ver_estado_termometro(form_id: str, current_user: dict = Depends(token_required)):
     try:
         user_id = current_user.id
-        puntaje = supabase.table("user_form_scores").select("*").eq("user_id", user_id).eq("form_id", form_id).execute()
+        puntaje = get_supabase().table("user_form_scores").select("*").eq("user_id", user_id).eq("form_id", form_id).execute()
         if not puntaje.data:
-            return {"exito": True, "termometro": {
-                "porcentaje": 0, "nivel": "sin_evaluar", "color": "gray",
-                "puede_exportar": False, "mensaje": "Aún no has completado la evaluación",
-                "descripcion": "Completa el formulario para conocer tu nivel"
-            }}
+            return {"exito": True, "termometro": {"porcentaje": 0, **SIN_EVALUAR.info}}
         datos = puntaje.data[0]
+        nivel = clasificador_niveles(form_id).por_nombre(datos["readiness_level"])
         return {"exito": True, "termometro": {
             "porcentaje": datos["percentage"], "nivel": datos["readiness_level"],
             "color": datos["readiness_color"], "puede_exportar": datos["can_export"],
             "puntaje_total": datos["total_score"], "puntaje_maximo": datos["max_possible_score"],
-            "completado_en": datos["completed_at"]
+            "completado_en": datos["completed_at"],
+            "mensaje": nivel and nivel.mensaje, "descripcion": nivel and nivel.descripcion
         }}
     except Exception as e:
         raise HTTPException(500, f"Error al obtener estado del termómetro: {str(e)}")
@@ -190,7 +217,7 @@ async def ver_estado_termometro(form_id: str, current_user: dict = Depends(token
 async def ver_mis_resultados(current_user: dict = Depends(token_required)):
     try:
         user_id = current_user.id
-        resultados = supabase.table("user_form_scores").select("*, forms(title, description)").eq("user_id", user_id).execute()
+        resultados = get_supabase().table("user_form_scores").select("*, forms(title, description)").eq("user_id", user_id).execute()
         return {"exito": True, "resultados": resultados.data}
     except Exception as e:
         raise HTTPException(500, f"Error al obtener resultados: {str(e)}")
@@ -1,27 +1,11 @@
-from matplotlib import typing
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
-import os
-from dotenv import load_dotenv
-from supabase._sync.client import SyncClient as Client, create_client
+from config import get_supabase, cliente_auth
 from datetime import datetime
 from typing import Optional
-
-
-# Cargar variables de entorno
-
-dotenv_path = os.path.join(os.path.dirname(__file__), ".env")
-load_dotenv(dotenv_path=dotenv_path)
-
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
-
-if not url or not key:
-    raise RuntimeError("No se cargaron las variables de entorno de Supabase")
-
-from supabase._sync.client import create_client
-supabase = create_client(url, key)
+import os
 
 # Crear app FastAPI
 app = FastAPI(
@@ -32,8 +16,6 @@ app = FastAPI(
 
 # Configurar CORS para permitir requests desde el frontend
 
-
-load_dotenv()
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 
 if ENVIRONMENT == "production":
@@ -110,6 +92,15 @@ class AuthResponse(BaseModel):
     message: str
     user: Optional[UserResponse] = None
     access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    expires_at: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+# El usuario de cada petición sale de su Bearer, nunca de una sesión guardada en
+# el cliente compartido (que es la misma para todos los usuarios del worker).
+security = HTTPBearer()
 
 class ErrorResponse(BaseModel):
     success: bool
@@ -136,7 +127,7 @@ async def register_user(user_data: UserRegister):
     - **password**: Contraseña segura (mínimo 6 caracteres)
     """
     try:
-        response = supabase.auth.sign_up({
+        response = cliente_auth().sign_up({
             "email": user_data.email,
             "password": user_data.password
         })
@@ -161,7 +152,9 @@ async def register_user(user_data: UserRegister):
                 success=True,
                 message="Usuario registrado exitosamente",
                 user=user_info,
-                access_token=response.session.access_token
+                access_token=response.session.access_token,
+                refresh_token=response.session.refresh_token,
+                expires_at=response.session.expires_at
             )
         else:
             raise HTTPException(
@@ -189,7 +182,7 @@ async def login_user(user_data: UserLogin):
     - **password**: Contraseña del usuario
     """
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = cliente_auth().sign_in_with_password({
             "email": user_data.email,
             "password": user_data.password
         })
@@ -205,7 +198,9 @@ async def login_user(user_data: UserLogin):
                 success=True,
                 message="Login exitoso",
                 user=user_info,
-                access_token=response.session.access_token
+                access_token=response.session.access_token,
+                refresh_token=response.session.refresh_token,
+                expires_at=response.session.expires_at
             )
         else:
             raise HTTPException(
@@ -219,17 +214,49 @@ async def login_user(user_data: UserLogin):
             detail=f"Error en el login: {str(e)}"
         )
 
+# Endpoint de refresh ----------------------------------------------------
+@app.post("/auth/refresh",
+         response_model=AuthResponse,
+         tags=["Autenticación"],
+         summary="Renovar sesión",
+         description="Entrega un nuevo access_token a partir del refresh_token")
+async def refresh_session(data: RefreshRequest):
+    """
+    Renueva la sesión sin volver a pedir la contraseña
+
+    - **refresh_token**: el devuelto por /auth/login o por el último refresh
+    """
+    try:
+        response = cliente_auth().refresh_session(data.refresh_token)
+        return AuthResponse(
+            success=True,
+            message="Sesión renovada",
+            user=UserResponse(
+                id=response.user.id,
+                email=response.user.email,
+                created_at=response.user.created_at
+            ),
+            access_token=response.session.access_token,
+            refresh_token=response.session.refresh_token,
+            expires_at=response.session.expires_at
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Error al renovar la sesión: {str(e)}"
+        )
+
 # Endpoint de logout ----------------------------------------------------
 @app.post("/auth/logout", 
          tags=["Autenticación"],
          summary="Cerrar sesión",
          description="Cierra la sesión del usuario actual")
-async def logout_user():
+async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
-    Cierra la sesión del usuario actual
+    Cierra la sesión del token enviado (solo esa sesión)
     """
     try:
-        supabase.auth.sign_out()
+        get_supabase().auth.admin.sign_out(credentials.credentials, "local")
         return {"success": True, "message": "Sesión cerrada exitosamente"}
     except Exception as e:
         raise HTTPException(
@@ -243,12 +270,12 @@ async def logout_user():
         tags=["Usuario"],
         summary="Obtener usuario actual",
         description="Obtiene la información del usuario autenticado")
-async def get_current_user():
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
-    Obtiene la información del usuario actualmente autenticado
+    Obtiene la información del usuario dueño del token enviado
     """
     try:
-        user = supabase.auth.get_user()
+        user = get_supabase().auth.get_user(credentials.credentials)
         if user and user.user:
             return UserResponse(
                 id=user.user.id,
@@ -0,0 +1,47 @@
+from dotenv import load_dotenv
+from functools import lru_cache
+import os
+
+# Único lugar donde se lee el .env de este backend
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
+
+
+@lru_cache(maxsize=1)
+def get_supabase():
+    """Cliente de Supabase compartido, creado en el primer uso.
+
+    El SDK se importa aquí para no cargarlo al arrancar, y la falta de
+    credenciales falla en la primera llamada en vez de al importar la app.
+    """
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        raise RuntimeError("No se cargaron las variables de entorno de Supabase")
+
+    from supabase import create_client
+    return create_client(url, key)
+
+
+@lru_cache(maxsize=1)
+def _http_auth():
+    import httpx
+    return httpx.Client(timeout=30, follow_redirects=True)
+
+
+def cliente_auth():
+    """Cliente de auth desechable para login, registro y refresh: la sesión que
+    guardan queda en él y no en el cliente compartido (que si no pasaría a
+    consultar la base con el token del último usuario que inició sesión)."""
+    from supabase_auth import SyncGoTrueClient
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+    if not url or not key:
+        raise RuntimeError("No se cargaron las variables de entorno de Supabase")
+    return SyncGoTrueClient(
+        url=f"{url.rstrip('/')}/auth/v1",
+        headers={"apiKey": key, "Authorization": f"Bearer {key}"},
+        http_client=_http_auth(),
+        auto_refresh_token=False,
+        persist_session=False,
+    )
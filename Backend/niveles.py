@@ -0,0 +1,105 @@
+# Backend/niveles.py y BackendOrganizado/utils/niveles.py deben ser idénticos (la API
+# anterior se despliega sola y no puede importar el otro paquete);
+# BackendOrganizado/tests/test_puntaje.py falla si difieren.
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+
+@dataclass(frozen=True)
+class Nivel:
+    """Banda del termómetro: aplica desde `minimo` (inclusive) hasta la siguiente."""
+    minimo: float
+    nivel: str
+    color: str
+    puede_exportar: bool
+    mensaje: str = None
+    descripcion: str = None
+    # Dict que se devuelve en la API, armado una vez (solo lectura, se comparte)
+    info: MappingProxyType = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "info", MappingProxyType({
+            "nivel": self.nivel, "color": self.color, "puede_exportar": self.puede_exportar,
+            "mensaje": self.mensaje, "descripcion": self.descripcion,
+        }))
+
+    @classmethod
+    def desde_fila(cls, fila: dict):
+        """Fila de readiness_levels (ver BackendOrganizado/sql/005_niveles.sql)."""
+        return cls(
+            minimo=float(fila["min_percentage"]),
+            nivel=fila["level"],
+            color=fila["color"],
+            puede_exportar=bool(fila["can_export"]),
+            mensaje=fila.get("message"),
+            descripcion=fila.get("description"),
+        )
+
+
+NIVELES_PREDETERMINADOS = (
+    Nivel(85, "excelente", "green", True,
+          "¡Listo para exportar! Tienes todas las capacidades",
+          "Cuentas con todos los requisitos necesarios"),
+    Nivel(70, "bueno", "light-green", True,
+          "Casi listo - Solo algunos detalles por mejorar",
+          "Tienes la mayoría de requisitos cubiertos"),
+    Nivel(50, "moderado", "yellow", False,
+          "Necesitas mejorar varias áreas",
+          "Estás en buen camino pero faltan cosas importantes"),
+    Nivel(30, "bajo", "orange", False,
+          "Te falta bastante preparación",
+          "Necesitas trabajar en muchos aspectos básicos"),
+    Nivel(0, "crítico", "red", False,
+          "No estás preparado para exportar",
+          "Te faltan la mayoría de requisitos fundamentales"),
+)
+
+SIN_EVALUAR = Nivel(0, "sin_evaluar", "gray", False,
+                    "Aún no has completado la evaluación",
+                    "Completa el formulario para conocer tu nivel")
+
+
+class Clasificador:
+    """Bandas de un formulario con los umbrales ordenados para buscar con bisect."""
+
+    def __init__(self, niveles=NIVELES_PREDETERMINADOS):
+        ordenados = sorted(niveles, key=lambda n: n.minimo)
+        if not ordenados:
+            raise ValueError("Se requiere al menos un nivel")
+        self.niveles = tuple(ordenados)
+        self.umbrales = tuple(n.minimo for n in ordenados)
+        self._por_nombre = {n.nivel: n for n in ordenados}
+
+    @classmethod
+    def desde_filas(cls, filas: list, form_id: str = None):
+        """Bandas propias del formulario si las tiene; si no, las globales
+        (form_id nulo) y, sin ninguna, las predeterminadas."""
+        propias = [f for f in filas if form_id is not None and f.get("form_id") == form_id]
+        globales = [f for f in filas if f.get("form_id") is None]
+        elegidas = propias or globales
+        if not elegidas:
+            return PREDETERMINADO
+        return cls([Nivel.desde_fila(f) for f in elegidas])
+
+    def clasificar(self, porcentaje: float) -> Nivel:
+        # Por debajo del menor umbral se usa la banda más baja
+        return self.niveles[max(bisect_right(self.umbrales, porcentaje) - 1, 0)]
+
+    def clasificar_muchos(self, porcentajes) -> list:
+        """Versión por lotes para recálculos y analítica: con numpy instalado
+        clasifica todo el arreglo con una sola búsqueda vectorizada."""
+        try:
+            import numpy as np
+        except ImportError:
+            umbrales, niveles = self.umbrales, self.niveles
+            return [niveles[max(bisect_right(umbrales, p) - 1, 0)] for p in porcentajes]
+        indices = np.searchsorted(self.umbrales, np.asarray(porcentajes, dtype=float), side="right") - 1
+        return [self.niveles[i] for i in np.maximum(indices, 0).tolist()]
+
+    def por_nombre(self, nivel: str) -> Nivel:
+        """Banda guardada en user_form_scores.readiness_level (None si ya no existe)."""
+        return self._por_nombre.get(nivel)
+
+
+PREDETERMINADO = Clasificador(NIVELES_PREDETERMINADOS)
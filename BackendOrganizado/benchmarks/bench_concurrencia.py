@@ -0,0 +1,121 @@
+"""Throughput de la API bajo muchos clientes concurrentes.
+
+Levanta fake_supabase y la API (uvicorn, un worker) en subprocesos y lanza
+--clientes peticiones simultáneas contra endpoints protegidos. Para comparar
+antes/después se corre el mismo script contra otra copia del código:
+
+    git worktree add /tmp/antes <commit>
+    python benchmarks/bench_concurrencia.py --app-dir /tmp/antes/BackendOrganizado
+    python benchmarks/bench_concurrencia.py
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+import jwt
+
+from fake_supabase import FORM_ID
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+SECRETO = "secreto-benchmark"
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _levantar(app: str, app_dir: str, puerto: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--app-dir", app_dir,
+         "--port", str(puerto), "--log-level", "warning",
+         "--timeout-keep-alive", "60"],
+        env={**os.environ, **env}, cwd=app_dir,
+    )
+
+
+async def _esperar(url: str, segundos: float = 20):
+    limite = time.monotonic() + segundos
+    async with httpx.AsyncClient() as cliente:
+        while time.monotonic() < limite:
+            try:
+                await cliente.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} no respondió")
+
+
+def _token(i: int) -> str:
+    return jwt.encode({"sub": f"usuario-{i}", "email": f"u{i}@ejemplo.com",
+                       "aud": "authenticated", "role": "authenticated",
+                       "exp": int(time.time()) + 3600}, SECRETO)
+
+
+async def _carga(base: str, ruta: str, clientes: int, total: int):
+    latencias = []
+    pendientes = iter(range(total))
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+
+    async with httpx.AsyncClient(base_url=base, limits=limites, timeout=60) as cliente:
+        async def trabajador(n):
+            cabeceras = {"Authorization": f"Bearer {_token(n)}"}
+            for _ in pendientes:
+                inicio = time.perf_counter()
+                r = await cliente.get(ruta, headers=cabeceras)
+                latencias.append(time.perf_counter() - inicio)
+                if r.status_code != 200:
+                    raise RuntimeError(f"{ruta}: {r.status_code} {r.text}")
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador(n) for n in range(clientes)))
+        duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "req_s": total / duracion,
+        "p50_ms": statistics.median(latencias) * 1000,
+        "p95_ms": latencias[int(len(latencias) * 0.95) - 1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-dir", default=os.path.dirname(AQUI))
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    p_fake, p_api = _puerto_libre(), _puerto_libre()
+    fake = _levantar("fake_supabase:app", AQUI, p_fake,
+                     {"FAKE_LATENCIA_MS": str(args.latencia_ms)})
+    api = _levantar("main:app", os.path.abspath(args.app_dir), p_api, {
+        "SUPABASE_URL": f"http://127.0.0.1:{p_fake}",
+        "SUPABASE_KEY": jwt.encode({"role": "anon"}, SECRETO),
+        "SUPABASE_JWT_SECRET": SECRETO,
+    })
+    try:
+        await _esperar(f"http://127.0.0.1:{p_fake}/rest/v1/forms")
+        await _esperar(f"http://127.0.0.1:{p_api}/api/salud")
+        base = f"http://127.0.0.1:{p_api}"
+        print(f"{args.app_dir} | {args.clientes} clientes | "
+              f"latencia upstream {args.latencia_ms:.0f} ms")
+        for ruta in (f"/api/termometro/{FORM_ID}/estado", f"/api/formularios/{FORM_ID}/preguntas"):
+            r = await _carga(base, ruta, args.clientes, args.peticiones)
+            print(f"  {ruta:40} {r['req_s']:8.1f} req/s  "
+                  f"p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms")
+    finally:
+        api.terminate()
+        fake.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+"""Prueba de carga offline de la API completa.
+
+Importa la app de main.py y la ejecuta en este mismo proceso contra
+fake_supabase, levantado en un hilo con la latencia indicada. Cada usuario
+virtual recorre el flujo real: login -> formularios -> preguntas -> responder
+-> estado. Por cada nivel de concurrencia se reportan p50/p95/p99 y
+throughput por endpoint.
+
+Con --repositorio sqlite los datos viven en un SQLite temporal sembrado con
+las mismas preguntas (fake_supabase solo atiende el login): mide la API sin
+el salto HTTP hacia PostgREST.
+
+    cd BackendOrganizado
+    python benchmarks/carga.py --concurrencia 10,50,200 --usuarios 400 --latencia-ms 20
+    python benchmarks/carga.py --repositorio sqlite
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+import uvicorn
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+sys.path.insert(0, os.path.dirname(AQUI))
+
+import fake_supabase  # noqa: E402
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def levantar_fake(latencia_ms: float, jitter_ms: float, n_preguntas: int) -> str:
+    """Arranca fake_supabase en un hilo con su propio event loop y devuelve su URL."""
+    puerto = _puerto_libre()
+    app = fake_supabase.crear_app(latencia_ms=latencia_ms, jitter_ms=jitter_ms,
+                                  n_preguntas=n_preguntas)
+    servidor = uvicorn.Server(uvicorn.Config(app, port=puerto, log_level="warning",
+                                             timeout_keep_alive=60))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{puerto}"
+
+
+def sembrar_sqlite(n_preguntas: int) -> str:
+    """SQLite temporal con el formulario y las preguntas de fake_supabase."""
+    from utils.repositorio_sql import ESQUEMA_SQLITE
+
+    ruta = os.path.join(tempfile.mkdtemp(), "carga.sqlite")
+    datos = fake_supabase._datos_iniciales(n_preguntas)
+    with sqlite3.connect(ruta) as conexion:
+        conexion.executescript(ESQUEMA_SQLITE)
+        conexion.executemany("insert into forms (id, title, description, is_active) values (?, ?, ?, ?)",
+                             [(f["id"], f["title"], f["description"], f["is_active"]) for f in datos["forms"]])
+        conexion.executemany(
+            "insert into questions (id, form_id, question_text, order_index, weight, points_for_yes, points_for_no) "
+            "values (?, ?, ?, ?, ?, ?, ?)",
+            [(q["id"], q["form_id"], q["question_text"], q["order_index"], q["weight"],
+              q["points_for_yes"], q["points_for_no"]) for q in datos["questions"]])
+    return ruta
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Medidor:
+    def __init__(self):
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+
+    async def medir(self, nombre: str, peticion):
+        inicio = time.perf_counter()
+        respuesta = await peticion
+        self.latencias[nombre].append(time.perf_counter() - inicio)
+        if respuesta.status_code >= 400:
+            self.errores[nombre] += 1
+        return respuesta
+
+
+async def flujo_usuario(cliente: httpx.AsyncClient, medidor: Medidor, n: int):
+    login = await medidor.medir("POST /auth/login", cliente.post(
+        "/auth/login", json={"email": f"usuario{n}@ejemplo.com", "password": "clave-segura"}))
+    if login.status_code != 200:
+        return
+    cabeceras = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    formularios = await medidor.medir("GET /api/formularios", cliente.get(
+        "/api/formularios/", headers=cabeceras))
+    for formulario in formularios.json().get("formularios", []):
+        form_id = formulario["id"]
+        preguntas = await medidor.medir("GET /api/formularios/{id}/preguntas", cliente.get(
+            f"/api/formularios/{form_id}/preguntas", headers=cabeceras))
+        respuestas = [{"question_id": p["id"], "response_value": random.choice(["yes", "no"])}
+                      for p in preguntas.json().get("preguntas", [])]
+        await medidor.medir("POST /api/termometro/{id}/responder", cliente.post(
+            f"/api/termometro/{form_id}/responder", json={"respuestas": respuestas},
+            headers=cabeceras))
+        await medidor.medir("GET /api/termometro/{id}/estado", cliente.get(
+            f"/api/termometro/{form_id}/estado", headers=cabeceras))
+
+
+async def correr_nivel(app, concurrencia: int, usuarios: int) -> tuple:
+    medidor = Medidor()
+    semaforo = asyncio.Semaphore(concurrencia)
+    transporte = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transporte, base_url="http://api", timeout=120) as cliente:
+        async def con_limite(n):
+            async with semaforo:
+                await flujo_usuario(cliente, medidor, n)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(con_limite(n) for n in range(usuarios)))
+        duracion = time.perf_counter() - inicio
+    return medidor, duracion
+
+
+def reportar(concurrencia: int, usuarios: int, medidor: Medidor, duracion: float):
+    print(f"\nconcurrencia {concurrencia} | {usuarios} flujos en {duracion:.2f} s "
+          f"({usuarios / duracion:.1f} flujos/s)")
+    print(f"  {'endpoint':40} {'n':>6} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for nombre, latencias in medidor.latencias.items():
+        print(f"  {nombre:40} {len(latencias):6d} {medidor.errores[nombre]:5d} "
+              f"{len(latencias) / duracion:8.1f} {percentil(latencias, 50) * 1000:8.1f} "
+              f"{percentil(latencias, 95) * 1000:8.1f} {percentil(latencias, 99) * 1000:8.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga offline de la API")
+    parser.add_argument("--concurrencia", default="10,50,200",
+                        help="niveles separados por coma")
+    parser.add_argument("--usuarios", type=int, default=400, help="flujos por nivel")
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--preguntas", type=int, default=20)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--repositorio", choices=["supabase", "sqlite"], default="supabase")
+    args = parser.parse_args()
+    random.seed(args.semilla)
+
+    url = levantar_fake(args.latencia_ms, args.jitter_ms, args.preguntas)
+    # La configuración se lee al importar la app: tiene que quedar lista antes
+    os.environ.update({
+        "SUPABASE_URL": url,
+        "SUPABASE_KEY": fake_supabase.jwt.encode({"role": "anon"}, fake_supabase.SECRETO_JWT),
+        "SUPABASE_JWT_SECRET": fake_supabase.SECRETO_JWT,
+        # Todos los usuarios virtuales salen de la misma IP
+        "LIMITES_ACTIVOS": "0",
+        "REPOSITORIO": args.repositorio,
+    })
+    if args.repositorio == "sqlite":
+        os.environ["SQLITE_RUTA"] = sembrar_sqlite(args.preguntas)
+    from main import app
+
+    print(f"Supabase simulado en {url}: latencia {args.latencia_ms:.0f}±{args.jitter_ms:.0f} ms, "
+          f"{args.preguntas} preguntas, repositorio {args.repositorio}")
+    async with app.router.lifespan_context(app):
+        for concurrencia in (int(c) for c in args.concurrencia.split(",")):
+            medidor, duracion = await correr_nivel(app, concurrencia, args.usuarios)
+            reportar(concurrencia, args.usuarios, medidor, duracion)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
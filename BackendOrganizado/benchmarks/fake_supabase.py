@@ -0,0 +1,241 @@
+"""Imitación mínima de Supabase (auth + PostgREST) para los benchmarks.
+
+Responde desde memoria y agrega una latencia artificial por petición para
+simular el viaje de red hasta el proyecto real. Se puede levantar sola:
+
+    FAKE_LATENCIA_MS=20 uvicorn fake_supabase:app --app-dir benchmarks --port 54321
+
+o crear instancias con crear_app() dentro del mismo proceso (ver carga.py).
+"""
+from datetime import datetime, timezone
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+import uuid
+
+import jwt
+
+FORM_ID = "0f6c1b2e-5d3a-4e8f-9a71-000000000001"
+# Los tokens emitidos se firman con este secreto; la API debe tenerlo en SUPABASE_JWT_SECRET
+SECRETO_JWT = os.getenv("FAKE_JWT_SECRET", "secreto-benchmark")
+
+
+def _datos_iniciales(n_preguntas: int) -> dict:
+    return {
+        "forms": [{"id": FORM_ID, "title": "Termómetro exportador",
+                   "description": "Formulario de prueba", "is_active": True}],
+        "questions": [{"id": f"q{i}", "form_id": FORM_ID, "question_text": f"Pregunta {i}",
+                       "order_index": i, "weight": 1 + i % 3,
+                       "points_for_yes": 1, "points_for_no": 0}
+                      for i in range(n_preguntas)],
+        "user_form_scores": [],
+        "user_responses": [],
+    }
+
+
+def _claims(request: Request) -> dict:
+    token = request.headers.get("authorization", "").removeprefix("Bearer ")
+    try:
+        carga = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(carga + "=" * (-len(carga) % 4)))
+    except Exception:
+        return {}
+
+
+def _filtrar(filas, params):
+    for columna, valor in params.items():
+        if columna in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            continue
+        operador, _, esperado = valor.partition(".")
+        if operador == "eq":
+            filas = [f for f in filas if str(f.get(columna)).lower() == esperado.lower()]
+        elif operador == "gt":
+            filas = [f for f in filas if str(f.get(columna)) > esperado]
+        elif operador == "in":
+            valores = set(esperado.strip("()").split(","))
+            filas = [f for f in filas if str(f.get(columna)) in valores]
+    for orden in reversed(params.get("order", "").split(",")):
+        if orden:
+            columna, _, sentido = orden.partition(".")
+            filas = sorted(filas, key=lambda f: str(f.get(columna)), reverse=sentido.startswith("desc"))
+    if "limit" in params:
+        filas = filas[:int(params["limit"])]
+    return filas
+
+
+class FakeSupabase:
+    def __init__(self, latencia_ms: float = 20, jitter_ms: float = 0, n_preguntas: int = 20):
+        self.latencia = latencia_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.tablas = _datos_iniciales(n_preguntas)
+        self.funciones = {"guardar_evaluacion": self.guardar_evaluacion,
+                          "guardar_evaluaciones": self.guardar_evaluaciones,
+                          "sincronizar_borrador": self.sincronizar_borrador,
+                          "historial_puntajes": self.historial_puntajes}
+        self.peticiones = 0
+
+    async def _esperar(self):
+        self.peticiones += 1
+        await asyncio.sleep(max(0.0, self.latencia + random.uniform(-self.jitter, self.jitter)))
+
+    # ---------- auth ----------
+    def _sesion(self, email: str) -> dict:
+        usuario = self._usuario(str(uuid.uuid5(uuid.NAMESPACE_URL, email)), email)
+        ahora = int(time.time())
+        access_token = jwt.encode({"sub": usuario["id"], "email": email, "aud": "authenticated",
+                                   "role": "authenticated", "iat": ahora, "exp": ahora + 3600},
+                                  SECRETO_JWT)
+        return {"access_token": access_token, "refresh_token": uuid.uuid4().hex,
+                "token_type": "bearer", "expires_in": 3600, "expires_at": ahora + 3600,
+                "user": usuario}
+
+    @staticmethod
+    def _usuario(user_id: str, email: str) -> dict:
+        return {"id": user_id, "aud": "authenticated", "role": "authenticated",
+                "email": email, "app_metadata": {}, "user_metadata": {},
+                "created_at": "2025-01-01T00:00:00Z"}
+
+    async def token(self, request: Request):
+        await self._esperar()
+        cuerpo = await request.json()
+        if request.query_params.get("grant_type") == "refresh_token":
+            return JSONResponse(self._sesion(cuerpo.get("email") or "refrescado@ejemplo.com"))
+        if not cuerpo.get("password"):
+            return JSONResponse({"error": "invalid_grant"}, status_code=400)
+        return JSONResponse(self._sesion(cuerpo["email"]))
+
+    async def signup(self, request: Request):
+        await self._esperar()
+        cuerpo = await request.json()
+        return JSONResponse(self._sesion(cuerpo["email"]))
+
+    async def usuario(self, request: Request):
+        await self._esperar()
+        claims = _claims(request)
+        if not claims.get("sub"):
+            return JSONResponse({"msg": "invalid JWT"}, status_code=401)
+        return JSONResponse(self._usuario(claims["sub"], claims.get("email")))
+
+    async def logout(self, request: Request):
+        await self._esperar()
+        return JSONResponse({}, status_code=204)
+
+    # ---------- PostgREST ----------
+    def _upsert(self, nombre: str, filas: list, claves: tuple):
+        existentes = {tuple(f.get(c) for c in claves): f for f in self.tablas.setdefault(nombre, [])}
+        for fila in filas:
+            if nombre == "user_responses":
+                # Igual que el trigger de sql/007_borradores.sql
+                fila = {**fila, "updated_at": datetime.now(timezone.utc).isoformat()}
+            existentes.setdefault(tuple(fila.get(c) for c in claves), {}).update(fila)
+        self.tablas[nombre] = list(existentes.values())
+
+    async def tabla(self, request: Request):
+        await self._esperar()
+        nombre = request.path_params["tabla"]
+        filas = self.tablas.setdefault(nombre, [])
+        if request.method == "GET":
+            return JSONResponse(_filtrar(filas, request.query_params))
+        cuerpo = await request.json()
+        nuevas = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+        on_conflict = request.query_params.get("on_conflict")
+        if on_conflict:
+            self._upsert(nombre, nuevas, tuple(on_conflict.split(",")))
+        else:
+            filas.extend(nuevas)
+        return JSONResponse(nuevas, status_code=201)
+
+    async def guardar_evaluacion(self, params: dict):
+        self._upsert("user_responses", params.get("p_respuestas") or [], ("user_id", "question_id"))
+        if params.get("p_puntaje"):
+            self._upsert("user_form_scores", [params["p_puntaje"]], ("user_id", "form_id"))
+        return None
+
+    async def guardar_evaluaciones(self, params: dict):
+        self._upsert("user_responses", params.get("p_respuestas") or [], ("user_id", "question_id"))
+        self._upsert("user_form_scores", params.get("p_puntajes") or [], ("user_id", "form_id"))
+        # Historial append-only, como sql/008_historial.sql
+        ahora = datetime.now(timezone.utc).isoformat()
+        self.tablas.setdefault("user_form_score_history", []).extend(
+            {**p, "completed_at": p.get("completed_at") or ahora}
+            for p in params.get("p_historial") or params.get("p_puntajes") or [])
+        return None
+
+    async def historial_puntajes(self, params: dict):
+        filas = sorted((f for f in self.tablas.get("user_form_score_history", [])
+                        if f["user_id"] == params["p_user_id"] and f["form_id"] == params["p_form_id"]
+                        and (params.get("p_desde") is None or f["completed_at"] >= params["p_desde"])
+                        and (params.get("p_hasta") is None or f["completed_at"] < params["p_hasta"])),
+                       key=lambda f: f["completed_at"])
+        puntos = params.get("p_puntos") or 50
+        columnas = ("completed_at", "percentage", "total_score", "max_possible_score",
+                    "readiness_level", "can_export")
+        # Mismos tramos de tiempo que la función SQL: el último envío de cada uno
+        tramos = {}
+        if filas:
+            marcas = [datetime.fromisoformat(f["completed_at"]).timestamp() for f in filas]
+            ancho = marcas[-1] - marcas[0]
+            for i, (fila, marca) in enumerate(zip(filas, marcas)):
+                if len(filas) <= puntos:
+                    tramo = i
+                else:
+                    tramo = 0 if not ancho else min(puntos - 1, int((marca - marcas[0]) / ancho * puntos))
+                envios = tramos.get(tramo, ({}, 0))[1] + 1
+                tramos[tramo] = ({c: fila.get(c) for c in columnas}, envios)
+        return {"total": len(filas), "puntos": [{**f, "envios": n} for f, n in tramos.values()]}
+
+    async def sincronizar_borrador(self, params: dict):
+        ahora = datetime.now(timezone.utc).isoformat()
+        existentes = {(f["user_id"], f["question_id"]): f for f in self.tablas.setdefault("user_responses", [])}
+        for cambio in params.get("p_cambios") or []:
+            fila = existentes.get((params["p_user_id"], cambio["question_id"]))
+            if fila is None:
+                fila = {"user_id": params["p_user_id"], "form_id": params["p_form_id"], "version": None}
+                self.tablas["user_responses"].append(fila)
+                existentes[(params["p_user_id"], cambio["question_id"])] = fila
+            # Mismo last-writer-wins que sql/007_borradores.sql
+            if fila.get("version") is None or cambio["version"] > fila["version"]:
+                fila.update(cambio, updated_at=ahora)
+        enviadas = {c["question_id"] for c in params.get("p_cambios") or []}
+        filas = sorted((
+            {c: f.get(c) for c in ("question_id", "response_value", "version", "updated_at")}
+            for f in self.tablas["user_responses"]
+            if f["user_id"] == params["p_user_id"] and f["form_id"] == params["p_form_id"]
+            and (params.get("p_desde") is None or (f.get("updated_at") or "") >= params["p_desde"]
+                 or f["question_id"] in enviadas)), key=lambda f: f["updated_at"] or "")
+        return {"cambios": filas, "cursor": max((f["updated_at"] for f in filas if f["updated_at"]), default=None)}
+
+    async def rpc(self, request: Request):
+        await self._esperar()
+        funcion = self.funciones.get(request.path_params["funcion"])
+        if funcion is None:
+            return JSONResponse({"message": "function not found"}, status_code=404)
+        return JSONResponse(await funcion(await request.json()))
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/auth/v1/token", self.token, methods=["POST"]),
+            Route("/auth/v1/signup", self.signup, methods=["POST"]),
+            Route("/auth/v1/user", self.usuario),
+            Route("/auth/v1/logout", self.logout, methods=["POST"]),
+            Route("/rest/v1/rpc/{funcion}", self.rpc, methods=["POST"]),
+            Route("/rest/v1/{tabla}", self.tabla, methods=["GET", "POST", "PATCH"]),
+        ])
+
+
+def crear_app(**opciones) -> Starlette:
+    return FakeSupabase(**opciones).app()
+
+
+app = crear_app(
+    latencia_ms=float(os.getenv("FAKE_LATENCIA_MS", "20")),
+    jitter_ms=float(os.getenv("FAKE_JITTER_MS", "0")),
+    n_preguntas=int(os.getenv("FAKE_N_PREGUNTAS", "20")),
+)
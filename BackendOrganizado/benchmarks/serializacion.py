@@ -0,0 +1,87 @@
+"""Microbenchmark de serialización por endpoint.
+
+Compara, con cargas del tamaño real, el camino anterior (dict suelto ->
+jsonable_encoder -> json.dumps, lo que hace JSONResponse sin response_model)
+con el actual (response_model validado por pydantic-core + orjson) y, para
+los endpoints del catálogo, con el cuerpo ya serializado que se reutiliza.
+
+    cd BackendOrganizado
+    python benchmarks/serializacion.py --preguntas 60 --resultados 20
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.esquemas import (  # noqa: E402
+    RespuestaFormularios, RespuestaPreguntas, RespuestaResultados, RespuestaTermometro)
+
+
+def _cargas(n_preguntas: int, n_resultados: int) -> dict:
+    ahora = datetime.now(timezone.utc).isoformat()
+    formulario = {"id": "3f1c0e9a-0000-4000-8000-000000000001", "title": "Termómetro exportador",
+                  "description": "Capacidades para exportar", "is_active": True,
+                  "created_at": ahora, "updated_at": ahora, "created_by": None}
+    preguntas = [{"id": f"3f1c0e9a-0000-4000-8000-{i:012d}", "form_id": formulario["id"],
+                  "question_text": f"¿La empresa cumple el requisito {i}?",
+                  "question_type": "yes_no", "options": None, "order_index": i,
+                  "weight": 1 + i % 3, "points_for_yes": 1, "points_for_no": 0,
+                  "is_required": True, "created_at": ahora, "updated_at": ahora}
+                 for i in range(n_preguntas)]
+    resultados = [{"id": i, "user_id": "u", "form_id": formulario["id"], "total_score": 30,
+                   "max_possible_score": 40, "percentage": 75.0, "readiness_level": "bueno",
+                   "readiness_color": "light-green", "can_export": True,
+                   "completion_status": "complete", "completed_at": ahora,
+                   "created_at": ahora, "updated_at": ahora,
+                   "forms": {"title": formulario["title"], "description": formulario["description"]}}
+                  for i in range(n_resultados)]
+    termometro = {"puntaje_total": 30, "puntaje_maximo": 40, "porcentaje": 75.0,
+                  "nivel": "bueno", "color": "light-green", "puede_exportar": True}
+    return {
+        "GET /api/formularios": (RespuestaFormularios,
+                                 {"exito": True, "formularios": [formulario] * 3}),
+        "GET /api/formularios/{id}/preguntas": (RespuestaPreguntas,
+                                                {"exito": True, "preguntas": preguntas}),
+        "POST /api/termometro/{id}/responder": (RespuestaTermometro,
+                                                {"exito": True, "termometro": termometro}),
+        "GET /api/termometro/mis-resultados": (RespuestaResultados,
+                                               {"exito": True, "resultados": resultados}),
+    }
+
+
+def antes(contenido):
+    return json.dumps(jsonable_encoder(contenido), ensure_ascii=False).encode()
+
+
+def despues(modelo, contenido):
+    datos = modelo.model_validate(contenido).model_dump(mode="json", exclude_none=True)
+    return orjson.dumps(datos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de serialización")
+    parser.add_argument("--preguntas", type=int, default=60)
+    parser.add_argument("--resultados", type=int, default=20)
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':40} {'antes µs':>9} {'bytes':>7} {'modelo µs':>10} {'bytes':>7} {'cache µs':>9}")
+    for nombre, (modelo, contenido) in _cargas(args.preguntas, args.resultados).items():
+        n = args.repeticiones
+        t_antes = timeit.timeit(lambda: antes(contenido), number=n) / n * 1e6
+        t_despues = timeit.timeit(lambda: despues(modelo, contenido), number=n) / n * 1e6
+        cuerpo = despues(modelo, contenido)
+        t_cache = timeit.timeit(lambda: cuerpo, number=n) / n * 1e6
+        print(f"{nombre:40} {t_antes:9.1f} {len(antes(contenido)):7d} "
+              f"{t_despues:10.1f} {len(cuerpo):7d} {t_cache:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,79 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, formularios, termometro
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from routers import admin, auth, formularios, termometro
+from utils import catalogo, metricas
+from utils.almacen import cerrar_almacen
+from utils.compresion import CompresionMiddleware
+from utils.config import cerrar_supabase
+from utils.repositorio import cerrar_repositorio
+from utils import escritura
+from contextlib import asynccontextmanager
 from datetime import datetime
+import logging
+import os
 
-app = FastAPI(title="API Termómetro Exportador")
 
-# CORS
+@asynccontextmanager
+async def lifespan(app):
+    if escritura.ESCRITURA_DIFERIDA:
+        await escritura.cola.iniciar()
+    yield
+    await escritura.cola.detener()
+    await cerrar_repositorio()
+    await cerrar_supabase()
+    await cerrar_almacen()
+
+
+app = FastAPI(title="API Termómetro Exportador", default_response_class=ORJSONResponse,
+              lifespan=lifespan)
+
+# CORS: orígenes explícitos (con "*" y credenciales cada llamada del frontend
+# paga un preflight). El navegador guarda la respuesta del preflight max_age
+# segundos (Chrome acota a 7200).
+#
+# El frontend (frontend/src/lib/data-api.js) llama a la API desde el navegador
+# con credenciales, así que en producción CORS_ORIGENES debe tener su dominio
+# (ver servidor.py). Sin CORS_ORIGENES ni CORS_ORIGENES_REGEX se acepta
+# cualquier origen, como antes, para que un despliegue sin la variable no deje
+# al frontend sin acceso.
+CORS_ORIGENES = [o.strip() for o in os.getenv("CORS_ORIGENES", "").split(",") if o.strip()]
+CORS_ORIGENES_REGEX = os.getenv("CORS_ORIGENES_REGEX") or None
+if not CORS_ORIGENES and not CORS_ORIGENES_REGEX:
+    logging.getLogger("main").warning(
+        "CORS_ORIGENES no está definido: se acepta cualquier origen; defínelo con el dominio del frontend")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGENES or ([] if CORS_ORIGENES_REGEX else ["*"]),
+    # p. ej. despliegues de vista previa: https://termometro-.*\.vercel\.app
+    allow_origin_regex=CORS_ORIGENES_REGEX,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type", "If-None-Match"],
+    expose_headers=["ETag", "Retry-After", "Server-Timing"],
+    max_age=int(os.getenv("CORS_MAX_AGE", "7200")),
 )
+# gzip/brotli por encima de COMPRESION_MINIMO bytes
+app.add_middleware(CompresionMiddleware)
+# Latencias por ruta y por llamada a Supabase (/metrics y cabecera Server-Timing)
+app.add_middleware(metricas.MetricasMiddleware)
 
 # Routers
 app.include_router(auth.router, prefix="/auth", tags=["Autenticación"])
 app.include_router(formularios.router, prefix="/api/formularios", tags=["Formularios"])
 app.include_router(termometro.router, prefix="/api/termometro", tags=["Termómetro"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Administración"])
 
 @app.get("/api/salud", tags=["Salud"])
 async def verificar_salud():
     return {
         "estado": "OK",
         "mensaje": "API del Termómetro Exportador funcionando",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "coalescencia": catalogo.coalescedor.estadisticas(),
+        "escritura": escritura.cola.estado()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def exportar_metricas():
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+from datetime import datetime
+from utils.repositorio import get_repositorio
+from utils.auth_utils import admin_required
+from utils.cache import CacheTTL
+from utils import exportacion
+from utils.cache_http import politica_cache, POR_USUARIO
+import os
+
+router = APIRouter(route_class=politica_cache(POR_USUARIO))
+
+# El tablero del personal pide lo mismo muchas veces seguidas; un minuto de
+# desfase es aceptable para estadísticas agregadas.
+_cache_analitica = CacheTTL(max_entradas=256, ttl=float(os.getenv("ANALITICA_TTL", "60")))
+
+
+@router.get("/analitica/{form_id}")
+async def analitica_formulario(
+    form_id: str,
+    intervalo: Literal["day", "week", "month"] = "day",
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    current_user: dict = Depends(admin_required),
+):
+    """Histograma de niveles, percentiles de porcentaje, tasa de "yes" por
+    pregunta y completados por periodo (ver sql/011_analitica_rango.sql)."""
+    clave = (form_id, intervalo, desde, hasta)
+    analitica = _cache_analitica.get(clave)
+    try:
+        if analitica is None:
+            analitica = await get_repositorio().analitica(form_id, intervalo, desde, hasta)
+            _cache_analitica.set(clave, analitica)
+        return {"exito": True, "form_id": form_id, "analitica": analitica}
+    except Exception as e:
+        raise HTTPException(500, f"Error al obtener la analítica: {str(e)}")
+
+
+@router.get("/exportar")
+async def exportar_respuestas(
+    formato: Literal["csv", "ndjson", "parquet"] = "csv",
+    form_id: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    nivel: Optional[str] = None,
+    current_user: dict = Depends(admin_required),
+):
+    """Respuestas unidas a preguntas y puntajes, generadas por páginas y
+    enviadas a medida que se leen: la memoria no crece con el tamaño."""
+    if formato == "parquet" and not exportacion.parquet_disponible():
+        raise HTTPException(400, "La exportación a Parquet requiere instalar pyarrow")
+    filtros = exportacion.Filtros(form_id=form_id, desde=desde, hasta=hasta, nivel=nivel)
+    tipo, extension = exportacion.FORMATOS[formato]
+    nombre = f"respuestas_{form_id or 'todos'}_{datetime.utcnow():%Y%m%d}.{extension}"
+    return StreamingResponse(
+        exportacion.exportar(filtros, formato),
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
-from utils.auth_utils import supabase
+from typing import Optional
+from utils import limites, sesiones
+from utils.cache_http import politica_cache, SIN_CACHE
+from utils.esquemas import RespuestaLogin, RespuestaRegistro
 
-router = APIRouter()
+router = APIRouter(route_class=politica_cache(SIN_CACHE, vary=None))
+
+# Bearer opcional: /refresh y /logout también aceptan peticiones sin token
+bearer_opcional = HTTPBearer(auto_error=False)
 
 # 📌 Modelos para recibir JSON en el body
 class AuthRequest(BaseModel):
@@ -10,37 +17,52 @@ class AuthRequest(BaseModel):
     password: str
 
 
-@router.post("/register")
-async def register(data: AuthRequest):
+class RefreshRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+
+@router.post("/register", response_model=RespuestaRegistro, response_model_exclude_none=True)
+async def register(data: AuthRequest, request: Request):
+    await limites.verificar("registro", request, data.email)
     try:
-        resp = supabase.auth.sign_up({"email": data.email, "password": data.password})
-        if resp.user is None:
-            raise HTTPException(400, "No se pudo registrar el usuario")
-        return {"exito": True, "usuario": resp.user}
+        return await sesiones.registrar(data.email, data.password)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Error al registrar: {str(e)}")
 
 
-@router.post("/login")
-async def login(data: AuthRequest):
+@router.post("/login", response_model=RespuestaLogin, response_model_exclude_none=True)
+async def login(data: AuthRequest, request: Request):
+    await limites.verificar("login", request, data.email)
     try:
-        resp = supabase.auth.sign_in_with_password({"email": data.email, "password": data.password})
-        if not resp.session:
-            raise HTTPException(400, "Credenciales inválidas")
-        return {
-            "exito": True,
-            "access_token": resp.session.access_token,
-            "refresh_token": resp.session.refresh_token,
-            "usuario": resp.user
-        }
+        return await sesiones.iniciar(data.email, data.password)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Error al iniciar sesión: {str(e)}")
 
 
+@router.post("/refresh", response_model=RespuestaLogin, response_model_exclude_none=True)
+async def refresh(data: Optional[RefreshRequest] = None,
+                  credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_opcional)):
+    """Renueva el access_token con el refresh_token del body o, si no viene, con
+    el que el servidor guardó para el Bearer actual, que debe ser válido o
+    haber vencido hace menos de RENOVACION_HOLGURA segundos."""
+    try:
+        return await sesiones.renovar(data and data.refresh_token,
+                                      credentials.credentials if credentials else None)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(500, f"Error al renovar la sesión: {str(e)}")
+
+
 @router.post("/logout")
-async def logout():
+async def logout(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_opcional)):
     try:
-        supabase.auth.sign_out()
+        if credentials:
+            await sesiones.cerrar(credentials.credentials)
         return {"exito": True, "mensaje": "Sesión cerrada"}
     except Exception as e:
         raise HTTPException(500, f"Error al cerrar sesión: {str(e)}")
@@ -1,21 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException
-from utils.auth_utils import supabase, token_required
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from utils.auth_utils import token_required, admin_required
+from utils.cache import CacheTTL
+from utils.esquemas import (
+    Formulario, Pregunta, RespuestaFormularios, RespuestaPreguntas, RespuestaPagina)
+from utils.repositorio import IdInvalido, get_repositorio
+from utils import catalogo, paginacion
+from utils.cache_http import politica_cache, CATALOGO, POR_USUARIO
+from typing import Optional
+import hashlib
 
-router = APIRouter()
+router = APIRouter(route_class=politica_cache(CATALOGO))
 
-@router.get("/")
-async def obtener_formularios(current_user: dict = Depends(token_required)):
+# Cuerpos JSON ya serializados por ETag: el catálogo casi no cambia, así que
+# cada versión (y cada combinación de fields/limit/cursor) se valida y
+# serializa una sola vez.
+_cuerpos = CacheTTL(max_entradas=512, ttl=catalogo.CATALOGO_TTL)
+
+
+def _responder_con_etag(request: Request, entrada: catalogo.Entrada, modelo, clave: str,
+                        item, orden, fields: Optional[str], limit: Optional[int], cursor: Optional[str]):
+    etag = entrada.etag
+    if fields or limit or cursor:
+        # Cada vista del mismo catálogo tiene su propio ETag
+        variante = hashlib.sha1(f"{fields}|{limit}|{cursor}".encode()).hexdigest()[:8]
+        etag = f'{etag[:-1]}-{variante}"'
+    if catalogo.etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    cuerpo = _cuerpos.get((clave, etag))
+    if cuerpo is None:
+        columnas = paginacion.campos(fields, list(item.model_fields), obligatorios=("id",))
+        filas, siguiente = paginacion.paginar(entrada.datos, orden, cursor, limit)
+        incluir = None
+        if columnas:
+            incluir = {"exito": True, "siguiente": True, clave: {"__all__": set(columnas)}}
+        cuerpo = modelo.model_validate({"exito": True, clave: filas, "siguiente": siguiente})\
+            .model_dump_json(include=incluir, exclude_none=True).encode()
+        _cuerpos.set((clave, etag), cuerpo)
+    return Response(cuerpo, media_type="application/json", headers={"ETag": etag})
+
+
+def _orden_formulario(formulario: dict) -> tuple:
+    return (formulario["id"],)
+
+
+def _orden_pregunta(pregunta: dict) -> tuple:
+    return (pregunta.get("order_index") or 0, pregunta["id"])
+
+
+@router.get("/", response_model=RespuestaFormularios)
+async def obtener_formularios(request: Request,
+                              fields: Optional[str] = Query(None, description="Columnas separadas por coma"),
+                              limit: Optional[int] = Query(None, ge=1, le=paginacion.LIMITE_MAXIMO),
+                              cursor: Optional[str] = None,
+                              current_user: dict = Depends(token_required)):
     try:
-        respuesta = supabase.table('forms').select('*').eq('is_active', True).execute()
-        return {"exito": True, "formularios": respuesta.data}
+        entrada = await catalogo.formularios_activos()
+        return _responder_con_etag(request, entrada, RespuestaFormularios, "formularios",
+                                   Formulario, _orden_formulario, fields, limit, cursor)
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, f"Error al obtener formularios: {str(e)}")
 
-@router.get("/{form_id}/preguntas")
-async def obtener_preguntas(form_id: str, current_user: dict = Depends(token_required)):
+@router.get("/{form_id}/preguntas", response_model=RespuestaPreguntas)
+async def obtener_preguntas(form_id: str, request: Request,
+                            fields: Optional[str] = Query(None, description="Columnas separadas por coma"),
+                            limit: Optional[int] = Query(None, ge=1, le=paginacion.LIMITE_MAXIMO),
+                            cursor: Optional[str] = None,
+                            current_user: dict = Depends(token_required)):
+    try:
+        entrada = await catalogo.preguntas_formulario(form_id)
+        return _responder_con_etag(request, entrada, RespuestaPreguntas, "preguntas",
+                                   Pregunta, _orden_pregunta, fields, limit, cursor)
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Error al obtener preguntas: {str(e)}")
+
+@router.get("/{form_id}/preguntas/siguiente", response_model=RespuestaPagina, response_model_exclude_none=True)
+async def obtener_siguiente_pagina(form_id: str, response: Response, current_user: dict = Depends(token_required)):
+    """Siguiente sección con preguntas por responder según lo guardado con
+    /progreso, sin las que skip_if omite para este usuario."""
+    response.headers["Cache-Control"] = POR_USUARIO
     try:
-        respuesta = supabase.table('questions')\
-            .select('*').eq('form_id', form_id).order('order_index').execute()
-        return {"exito": True, "preguntas": respuesta.data}
+        motor = await catalogo.motor_puntaje(form_id)
+        preguntas = (await catalogo.preguntas_formulario(form_id)).datos
+        guardadas = await get_repositorio().respuestas(current_user.id, [form_id])
+        seccion, indices, faltantes = motor.siguiente_pagina(guardadas)
+        return {
+            "exito": True,
+            "seccion": seccion,
+            "preguntas": [preguntas[i] for i in indices],
+            "faltantes": faltantes,
+            "completo": not faltantes,
+        }
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, f"Error al obtener preguntas: {str(e)}")
+
+@router.post("/cache/invalidar")
+async def invalidar_cache(current_user: dict = Depends(admin_required)):
+    version = await catalogo.invalidar()
+    return {"exito": True, "mensaje": "Cache de formularios invalidada", "version": version}
@@ -1,109 +1,341 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
-from utils.auth_utils import supabase, token_required
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from utils.repositorio import IdInvalido, get_repositorio
+from utils.auth_utils import token_required
+from utils import catalogo, paginacion
+from utils.cache_http import politica_cache, POR_USUARIO
+from utils.escritura import cola
+from utils.niveles import SIN_EVALUAR
+from utils.esquemas import (
+    RespuestaBorrador, RespuestaHistorial, RespuestaProgreso, RespuestaTermometro,
+    RespuestaTermometros, RespuestaResultados, Resultado)
 from datetime import datetime
+from typing import List, Optional
+import os
+import time
 
-router = APIRouter()
+router = APIRouter(route_class=politica_cache(POR_USUARIO))
 
+MAX_FORMULARIOS_LOTE = int(os.getenv("MAX_FORMULARIOS_LOTE", "20"))
+# Tope de puntos de /historial: más no se distinguen en el gráfico del termómetro
+MAX_PUNTOS_HISTORIAL = int(os.getenv("MAX_PUNTOS_HISTORIAL", "500"))
 
-def calcular_nivel_exportador(porcentaje: float):
-    if porcentaje >= 85:
-        return {"nivel": "excelente", "color": "green", "puede_exportar": True}
-    elif porcentaje >= 70:
-        return {"nivel": "bueno", "color": "light-green", "puede_exportar": True}
-    elif porcentaje >= 50:
-        return {"nivel": "moderado", "color": "yellow", "puede_exportar": False}
-    elif porcentaje >= 30:
-        return {"nivel": "bajo", "color": "orange", "puede_exportar": False}
-    else:
-        return {"nivel": "crítico", "color": "red", "puede_exportar": False}
 
+def _registros_respuestas(user_id: str, form_id: str, detalle) -> list:
+    # Lo enviado entero (/responder, /progreso) lleva como version la hora del
+    # servidor en ms, en la misma escala que las del borrador: un delta offline
+    # anterior al envío ya no lo pisa (sql/010_version_envios.sql)
+    version = int(time.time() * 1000)
+    return [
+        {"user_id": user_id, "form_id": form_id,
+         "question_id": qid, "response_value": val, "score": puntos, "version": version}
+        for qid, val, puntos in detalle
+    ]
 
-@router.post("/{form_id}/responder")
-async def responder_termometro(form_id: str, request: Request, current_user: dict = Depends(token_required)):
+
+async def _persistir(registros: list, puntajes: list):
+    """Con escritura diferida se encola y se responde sin esperar a la base de
+    datos; sin ella, o con la cola llena, se escribe antes de responder."""
+    if not await cola.encolar(registros, puntajes):
+        await get_repositorio().guardar_evaluaciones(registros, puntajes)
+
+
+def _evaluacion(user_id: str, form_id: str, resultado, clasificador) -> tuple:
+    """Fila de user_form_scores y termómetro que se devuelve al usuario."""
+    porcentaje = round(resultado.porcentaje, 2)
+    info_nivel = clasificador.clasificar(resultado.porcentaje).info
+    datos_puntaje = {
+        "user_id": user_id,
+        "form_id": form_id,
+        "total_score": resultado.puntaje_total,
+        "max_possible_score": resultado.puntaje_maximo,
+        "percentage": porcentaje,
+        "readiness_level": info_nivel["nivel"],
+        "readiness_color": info_nivel["color"],
+        "can_export": info_nivel["puede_exportar"],
+        "completion_status": "complete",
+        "completed_at": datetime.utcnow().isoformat()
+    }
+    termometro = {
+        "puntaje_total": resultado.puntaje_total,
+        "puntaje_maximo": resultado.puntaje_maximo,
+        "porcentaje": porcentaje,
+        **info_nivel
+    }
+    return datos_puntaje, termometro
+
+
+def _termometro_guardado(datos: dict, clasificador) -> dict:
+    if not datos:
+        return {"porcentaje": 0, **SIN_EVALUAR.info}
+    # Mensajes de la banda guardada, sin reclasificar el porcentaje
+    nivel = clasificador.por_nombre(datos["readiness_level"])
+    return {
+        "porcentaje": datos["percentage"],
+        "nivel": datos["readiness_level"],
+        "color": datos["readiness_color"],
+        "puede_exportar": datos["can_export"],
+        "puntaje_total": datos["total_score"],
+        "puntaje_maximo": datos["max_possible_score"],
+        "completado_en": datos["completed_at"],
+        "mensaje": nivel and nivel.mensaje,
+        "descripcion": nivel and nivel.descripcion
+    }
+
+
+# Las rutas fijas van antes que las de /{form_id}/...: "batch" no es un formulario
+@router.post("/batch/responder", response_model=RespuestaTermometros, response_model_exclude_none=True)
+async def responder_varios(request: Request, current_user: dict = Depends(token_required)):
+    """Responde varios formularios con una lectura de preguntas y una escritura.
+
+    Cuerpo: {"formularios": [{"form_id": ..., "respuestas": [...]}, ...]}
+    """
     try:
         datos = await request.json()
         user_id = current_user.id
-        respuestas = datos.get("respuestas")
+        envios = {}
+        for envio in datos.get("formularios") or []:
+            if envio.get("form_id"):
+                envios.setdefault(envio["form_id"], []).extend(envio.get("respuestas") or [])
+        if not envios:
+            raise HTTPException(400, "Se requieren los formularios con sus respuestas")
+        if len(envios) > MAX_FORMULARIOS_LOTE:
+            raise HTTPException(400, f"Máximo {MAX_FORMULARIOS_LOTE} formularios por envío")
 
+        motores = await catalogo.motores_puntaje(list(envios))
+        clasificadores = await catalogo.clasificadores(list(envios))
+        sin_preguntas = [form_id for form_id in envios if not len(motores[form_id])]
+        if sin_preguntas:
+            raise HTTPException(404, f"Formularios sin preguntas: {', '.join(sin_preguntas)}")
+        parciales = [form_id for form_id, respuestas in envios.items()
+                     if motores[form_id].faltantes(respuestas)]
+        if parciales:
+            previas = {}
+            for r in await get_repositorio().respuestas(user_id, parciales):
+                previas.setdefault(r["form_id"], []).append(r)
+            for form_id in parciales:
+                envios[form_id] = previas.get(form_id, []) + envios[form_id]
+
+        registros, puntajes, termometros = [], [], {}
+        for form_id, respuestas in envios.items():
+            if not respuestas:
+                raise HTTPException(400, f"Se requieren las respuestas del formulario {form_id}")
+            resultado = motores[form_id].score(respuestas)
+            datos_puntaje, termometros[form_id] = _evaluacion(
+                user_id, form_id, resultado, clasificadores[form_id])
+            registros.extend(_registros_respuestas(user_id, form_id, resultado.detalle))
+            puntajes.append(datos_puntaje)
+
+        await _persistir(registros, puntajes)
+        return {"exito": True, "termometros": termometros}
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Error al procesar respuestas: {str(e)}")
+
+
+@router.get("/estado", response_model=RespuestaTermometros, response_model_exclude_none=True)
+async def ver_estados(form_ids: List[str] = Query(..., description="IDs separados por coma o repetidos"),
+                      current_user: dict = Depends(token_required)):
+    """Estado de varios formularios en una sola consulta."""
+    try:
+        ids = list(dict.fromkeys(i.strip() for valor in form_ids for i in valor.split(",") if i.strip()))
+        if not ids:
+            raise HTTPException(400, "Se requiere al menos un form_id")
+        if len(ids) > MAX_FORMULARIOS_LOTE:
+            raise HTTPException(400, f"Máximo {MAX_FORMULARIOS_LOTE} formularios por consulta")
+        puntajes = await get_repositorio().puntajes(current_user.id, ids)
+        clasificadores = await catalogo.clasificadores(ids)
+        por_formulario = {p["form_id"]: p for p in puntajes}
+        return {"exito": True, "termometros": {
+            form_id: _termometro_guardado(por_formulario.get(form_id), clasificadores[form_id])
+            for form_id in ids
+        }}
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(
+            500, f"Error al obtener estado del termómetro: {str(e)}")
+
+
+@router.post("/{form_id}/progreso", response_model=RespuestaProgreso)
+async def guardar_progreso(form_id: str, request: Request, current_user: dict = Depends(token_required)):
+    """Guarda solo las respuestas que cambiaron, sin calcular el termómetro."""
+    try:
+        datos = await request.json()
+        respuestas = datos.get("respuestas")
         if not respuestas:
             raise HTTPException(400, "Se requieren las respuestas")
 
-        preguntas_resp = supabase.table('questions').select(
-            '*').eq('form_id', form_id).execute()
-        preguntas_dict = {p['id']: p for p in preguntas_resp.data}
+        motor = await catalogo.motor_puntaje(form_id)
+        # Progreso parcial: sin skip_if, que depende de respuestas que quizá aún no llegaron
+        registros = _registros_respuestas(current_user.id, form_id, motor.detalle(respuestas))
+        if registros:
+            await get_repositorio().guardar_evaluaciones(registros, [])
+        return {"exito": True, "guardadas": len(registros), "total_preguntas": len(motor)}
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Error al guardar el progreso: {str(e)}")
+
+
+@router.post("/{form_id}/borrador", response_model=RespuestaBorrador, response_model_exclude_none=True)
+async def sincronizar_borrador(form_id: str, request: Request, current_user: dict = Depends(token_required)):
+    """Sincroniza el borrador del formulario por deltas.
 
-        puntaje_total, puntaje_maximo = 0, 0
-        for respuesta in respuestas:
-            qid = respuesta.get("question_id")
-            val = respuesta.get("response_value")
-            if qid not in preguntas_dict:
+    Cuerpo: {"cambios": [{"question_id", "response_value", "version"}], "cursor": ...}
+    `version` la asigna el cliente al editar (p. ej. Date.now()) y por pregunta
+    gana la mayor. Devuelve qué cambios quedaron, lo que cambió en el servidor
+    desde `cursor` y el cursor para la próxima llamada. POST /responder sin
+    cuerpo puntúa el borrador guardado.
+    """
+    try:
+        datos = await request.json()
+        motor = await catalogo.motor_puntaje(form_id)
+        ultimos = {}
+        for cambio in datos.get("cambios") or []:
+            qid = cambio.get("question_id")
+            if qid not in motor.indice or cambio.get("response_value") is None:
                 continue
-            peso = preguntas_dict[qid].get("weight", 1)
-            puntaje_maximo += peso
-            puntaje_total += peso if str(val).lower() == "yes" else 0
-
-        porcentaje = (puntaje_total / puntaje_maximo *
-                      100) if puntaje_maximo > 0 else 0
-        info_nivel = calcular_nivel_exportador(porcentaje)
-
-        # Guardar resultado en supabase
-        datos_puntaje = {
-            "user_id": user_id,
-            "form_id": form_id,
-            "total_score": puntaje_total,
-            "max_possible_score": puntaje_maximo,
-            "percentage": round(porcentaje, 2),
-            "readiness_level": info_nivel["nivel"],
-            "readiness_color": info_nivel["color"],
-            "can_export": info_nivel["puede_exportar"],
-            "completion_status": "complete",
-            "completed_at": datetime.utcnow().isoformat()
+            version = cambio.get("version")
+            if version is None:
+                version = int(time.time() * 1000)
+            elif not isinstance(version, int):
+                raise HTTPException(400, "version debe ser un entero")
+            if qid not in ultimos or version >= ultimos[qid]["version"]:
+                ultimos[qid] = {"question_id": qid, "response_value": cambio["response_value"], "version": version}
+
+        cambios = [
+            {"question_id": qid, "response_value": val, "score": puntos, "version": ultimos[qid]["version"]}
+            for qid, val, puntos in motor.detalle(list(ultimos.values()))
+        ]
+        desde = paginacion.leer_cursor(datos.get("cursor"))
+        resultado = await get_repositorio().sincronizar_borrador(
+            current_user.id, form_id, cambios, desde[0] if desde else None)
+
+        enviados = {c["question_id"]: (c["version"], c["response_value"]) for c in cambios}
+        # Solo lo que envió este cliente: las filas de /progreso o /responder
+        # deben volver en "cambios", igual que las de otro cliente con la
+        # misma version y otro valor (el empate no pisa)
+        aplicados = {f["question_id"] for f in resultado["cambios"]
+                     if enviados.get(f["question_id"]) == (f["version"], f["response_value"])}
+        return {
+            "exito": True,
+            "aplicados": sorted(aplicados),
+            "cambios": [f for f in resultado["cambios"] if f["question_id"] not in aplicados],
+            "cursor": resultado["cursor"] and paginacion.codificar_cursor(resultado["cursor"]),
         }
-        supabase.table("user_form_scores").upsert(
-            datos_puntaje, on_conflict="user_id,form_id").execute()
-
-        return {"exito": True, "termometro": {
-            "puntaje_total": puntaje_total,
-            "puntaje_maximo": puntaje_maximo,
-            "porcentaje": round(porcentaje, 2),
-            **info_nivel
-        }}
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Error al sincronizar el borrador: {str(e)}")
+
+
+@router.post("/{form_id}/responder", response_model=RespuestaTermometro, response_model_exclude_none=True)
+async def responder_termometro(form_id: str, request: Request, current_user: dict = Depends(token_required)):
+    try:
+        # Sin cuerpo se puntúa lo guardado con /progreso o /borrador
+        datos = await request.json() if await request.body() else {}
+        user_id = current_user.id
+        respuestas = datos.get("respuestas") or []
+
+        motor = await catalogo.motor_puntaje(form_id)
+        if not len(motor):
+            # También un form_id que no existe: su puntaje violaría la FK al escribirse
+            raise HTTPException(404, "Formulario sin preguntas")
+        if motor.faltantes(respuestas):
+            # Envío parcial: se completa con lo guardado vía /progreso
+            # (las preguntas omitidas por skip_if no cuentan como faltantes)
+            respuestas = await get_repositorio().respuestas(user_id, [form_id]) + respuestas
+
+        if not respuestas:
+            raise HTTPException(400, "Se requieren las respuestas")
+
+        resultado = motor.score(respuestas)
+        datos_puntaje, termometro = _evaluacion(
+            user_id, form_id, resultado, await catalogo.clasificador(form_id))
+        await _persistir(_registros_respuestas(user_id, form_id, resultado.detalle), [datos_puntaje])
+        return {"exito": True, "termometro": termometro}
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, f"Error al procesar respuestas: {str(e)}")
 
 
-@router.get("/{form_id}/estado")
+@router.get("/{form_id}/estado", response_model=RespuestaTermometro, response_model_exclude_none=True)
 async def ver_estado_termometro(form_id: str, current_user: dict = Depends(token_required)):
     try:
         user_id = current_user.id
-        puntaje = supabase.table("user_form_scores")\
-            .select("*").eq("user_id", user_id).eq("form_id", form_id).execute()
-        if not puntaje.data:
-            return {"exito": True, "termometro": {
-                "porcentaje": 0, "nivel": "sin_evaluar", "color": "gray",
-                "puede_exportar": False, "mensaje": "Aún no has completado la evaluación"
-            }}
-        datos = puntaje.data[0]
-        return {"exito": True, "termometro": {
-            "porcentaje": datos["percentage"],
-            "nivel": datos["readiness_level"],
-            "color": datos["readiness_color"],
-            "puede_exportar": datos["can_export"],
-            "puntaje_total": datos["total_score"],
-            "puntaje_maximo": datos["max_possible_score"],
-            "completado_en": datos["completed_at"]
-        }}
+        puntaje = await get_repositorio().puntajes(user_id, [form_id])
+        clasificador = await catalogo.clasificador(form_id)
+        return {"exito": True, "termometro": _termometro_guardado(puntaje[0] if puntaje else None, clasificador)}
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(
             500, f"Error al obtener estado del termómetro: {str(e)}")
 
 
-@router.get("/mis-resultados")
-async def ver_mis_resultados(current_user: dict = Depends(token_required)):
+@router.get("/{form_id}/historial", response_model=RespuestaHistorial)
+async def ver_historial(form_id: str,
+                        puntos: int = Query(50, ge=1, le=MAX_PUNTOS_HISTORIAL),
+                        desde: Optional[datetime] = None,
+                        hasta: Optional[datetime] = None,
+                        current_user: dict = Depends(token_required)):
+    """Evolución del puntaje del usuario en el formulario, de más antiguo a más
+    reciente. Con más envíos que `puntos` el rango se parte en tramos iguales y
+    de cada uno sale el último envío (ver sql/008_historial.sql)."""
+    try:
+        historial = await get_repositorio().historial(current_user.id, form_id, puntos, desde, hasta)
+        return {"exito": True, "form_id": form_id, **historial}
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(500, f"Error al obtener el historial: {str(e)}")
+
+
+@router.get("/mis-resultados", response_model=RespuestaResultados)
+async def ver_mis_resultados(fields: Optional[str] = Query(None, description="Columnas separadas por coma"),
+                             limit: Optional[int] = Query(None, ge=1, le=paginacion.LIMITE_MAXIMO),
+                             cursor: Optional[str] = None,
+                             current_user: dict = Depends(token_required)):
+    """Resultados del usuario ordenados por formulario; con limit se pagina por
+    keyset sobre form_id y "siguiente" trae el cursor de la próxima página."""
     try:
         user_id = current_user.id
-        resultados = supabase.table("user_form_scores")\
-            .select("*, forms(title, description)").eq("user_id", user_id).execute()
-        return {"exito": True, "resultados": resultados.data}
+        columnas = paginacion.campos(fields, list(Resultado.model_fields), obligatorios=("form_id",))
+        desde = paginacion.leer_cursor(cursor)
+        con_formulario = columnas is None or "forms" in columnas
+        resultados = await get_repositorio().puntajes(
+            user_id, con_formulario=con_formulario,
+            columnas=columnas and [c for c in columnas if c != "forms"],
+            despues_de=desde[0] if desde else None,
+            limite=limit and limit + 1)
+        siguiente = None
+        if limit and len(resultados) > limit:
+            resultados = resultados[:limit]
+            siguiente = paginacion.codificar_cursor(resultados[-1]["form_id"])
+        if columnas:
+            # Proyección compacta: solo las columnas pedidas, sin validar el modelo completo
+            return ORJSONResponse({"exito": True, "resultados": resultados, "siguiente": siguiente})
+        return {"exito": True, "resultados": resultados, "siguiente": siguiente}
+    except HTTPException:
+        raise
+    except IdInvalido as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, f"Error al obtener resultados: {str(e)}")
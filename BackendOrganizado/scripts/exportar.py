@@ -0,0 +1,44 @@
+"""Exporta respuestas + preguntas + puntajes a CSV, NDJSON o Parquet.
+
+Usa el mismo generador paginado que GET /api/admin/exportar, así que la
+memoria se mantiene constante sin importar cuántas filas haya.
+
+    cd BackendOrganizado
+    python -m scripts.exportar --formato csv --form-id <id> -o respuestas.csv
+    python -m scripts.exportar --formato ndjson --desde 2025-01-01 --nivel excelente > salida.ndjson
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+
+from utils import exportacion
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Exporta respuestas y puntajes")
+    parser.add_argument("--formato", choices=sorted(exportacion.SERIALIZADORES), default="csv")
+    parser.add_argument("--form-id")
+    parser.add_argument("--desde", type=datetime.fromisoformat, help="completed_at >= (ISO 8601)")
+    parser.add_argument("--hasta", type=datetime.fromisoformat, help="completed_at < (ISO 8601)")
+    parser.add_argument("--nivel", help="readiness_level")
+    parser.add_argument("--pagina", type=int, default=200, help="puntajes por página (a lo sumo PGRST_MAX_ROWS)")
+    parser.add_argument("-o", "--salida", help="archivo de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    if args.formato == "parquet" and not exportacion.parquet_disponible():
+        raise SystemExit("La exportación a Parquet requiere instalar pyarrow")
+
+    filtros = exportacion.Filtros(form_id=args.form_id, desde=args.desde,
+                                  hasta=args.hasta, nivel=args.nivel)
+    salida = open(args.salida, "wb") if args.salida else sys.stdout.buffer
+    try:
+        async for bloque in exportacion.exportar(filtros, args.formato, args.pagina):
+            salida.write(bloque)
+    finally:
+        if args.salida:
+            salida.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
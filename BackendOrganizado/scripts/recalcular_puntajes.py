@@ -0,0 +1,154 @@
+"""Recalcula user_form_scores a partir de user_responses.
+
+Se usa después de cambiar el peso de una pregunta o los umbrales de nivel.
+Recorre las respuestas de cada formulario por páginas (keyset sobre user_id),
+las puntúa con las definiciones actuales y escribe los puntajes con upserts
+por lotes. Solo se recalculan usuarios que ya tienen puntaje: un borrador o un
+progreso parcial no es una evaluación. El avance queda en un checkpoint para
+poder retomar.
+
+    cd BackendOrganizado
+    python -m scripts.recalcular_puntajes                  # todos los formularios
+    python -m scripts.recalcular_puntajes --form-id <id> --pagina 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from itertools import groupby
+from typing import Optional
+
+from utils.repositorio import MAX_FILAS, get_repositorio, cerrar_repositorio
+from utils.puntaje import ScoringEngine
+from utils.niveles import Clasificador
+
+
+def _leer_checkpoint(ruta: Optional[str]) -> dict:
+    if not ruta or not os.path.exists(ruta):
+        return {}
+    with open(ruta) as f:
+        return json.load(f)
+
+
+def _guardar_checkpoint(ruta: Optional[str], estado: dict):
+    if not ruta:
+        return
+    temporal = ruta + ".tmp"
+    with open(temporal, "w") as f:
+        json.dump(estado, f)
+    os.replace(temporal, ruta)
+
+
+def _fila_puntaje(user_id: str, form_id: str, resultado, nivel) -> dict:
+    return {
+        "user_id": user_id,
+        "form_id": form_id,
+        "total_score": resultado.puntaje_total,
+        "max_possible_score": resultado.puntaje_maximo,
+        "percentage": round(resultado.porcentaje, 2),
+        "readiness_level": nivel.nivel,
+        "readiness_color": nivel.color,
+        "can_export": nivel.puede_exportar,
+    }
+
+
+async def recalcular_formulario(form_id: str, estado: dict, args) -> tuple:
+    progreso = estado.setdefault(form_id, {"cursor": None, "terminado": False, "filas": 0})
+    if progreso["terminado"]:
+        print(f"[{form_id}] ya recalculado según el checkpoint, se omite")
+        return 0, 0
+
+    repositorio = get_repositorio()
+    motor = ScoringEngine(await repositorio.preguntas([form_id]))
+    clasificador = Clasificador.desde_filas(await repositorio.niveles([form_id]), form_id)
+    # PostgREST devuelve a lo sumo max-rows filas aunque se pidan más: una
+    # página recortada no se distingue de la última, así que no se pide más que
+    # eso y se sigue hasta que una página llega vacía.
+    tam = min(args.pagina, args.max_filas)
+    # Un usuario tiene a lo sumo una fila por pregunta y debe caber en una página
+    if tam <= len(motor):
+        raise SystemExit(f"[{form_id}] {len(motor)} preguntas no caben en páginas de {tam} filas")
+
+    filas_total, usuarios_total, omitidos = 0, 0, 0
+    inicio = time.perf_counter()
+    while True:
+        filas = await repositorio.pagina_respuestas(form_id, progreso["cursor"], tam)
+        if not filas:
+            break
+        # El último usuario puede haber quedado cortado: se relee en la siguiente
+        # página. Si es el único, está completo (sus filas caben en una página).
+        incompleto = filas[-1]["user_id"]
+        filas = [f for f in filas if f["user_id"] != incompleto] or filas
+
+        usuarios = [(uid, list(grupo)) for uid, grupo in groupby(filas, key=lambda f: f["user_id"])]
+        progreso["cursor"] = usuarios[-1][0]
+        progreso["filas"] += len(filas)
+        filas_total += len(filas)
+        evaluados = set(await repositorio.usuarios_con_puntaje(form_id, [uid for uid, _ in usuarios]))
+        leidos = len(usuarios)
+        usuarios = [(uid, respuestas) for uid, respuestas in usuarios if uid in evaluados]
+        omitidos += leidos - len(usuarios)
+        if not usuarios:
+            _guardar_checkpoint(args.checkpoint, estado)
+            continue
+        resultados = motor.score_many(respuestas for _, respuestas in usuarios)
+        niveles = clasificador.clasificar_muchos([r.porcentaje for r in resultados])
+        puntajes = [_fila_puntaje(uid, form_id, r, n)
+                    for (uid, _), r, n in zip(usuarios, resultados, niveles)]
+
+        if not args.simular:
+            for i in range(0, len(puntajes), args.lote):
+                await repositorio.guardar_puntajes(puntajes[i:i + args.lote])
+
+        usuarios_total += len(usuarios)
+        _guardar_checkpoint(args.checkpoint, estado)
+
+        transcurrido = time.perf_counter() - inicio
+        print(f"[{form_id}] {usuarios_total} usuarios, {filas_total} respuestas, "
+              f"{filas_total / transcurrido:,.0f} filas/s")
+
+    if omitidos:
+        print(f"[{form_id}] {omitidos} usuarios sin evaluación completa, no se tocan")
+    progreso["terminado"] = True
+    _guardar_checkpoint(args.checkpoint, estado)
+    return filas_total, usuarios_total
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Recalcula user_form_scores")
+    parser.add_argument("--form-id", action="append", help="repetible; por defecto todos")
+    parser.add_argument("--pagina", type=int, default=5000, help="filas de user_responses por página")
+    parser.add_argument("--max-filas", type=int, default=MAX_FILAS,
+                        help="tope de filas por respuesta del servidor (max-rows de PostgREST)")
+    parser.add_argument("--lote", type=int, default=500, help="filas por upsert")
+    parser.add_argument("--checkpoint", default="recalculo_checkpoint.json")
+    parser.add_argument("--reiniciar", action="store_true", help="ignora el checkpoint existente")
+    parser.add_argument("--simular", action="store_true", help="no escribe en la base de datos")
+    args = parser.parse_args()
+    if args.simular:
+        # Una simulación no escribe nada, tampoco checkpoint: si lo dejara,
+        # la corrida real siguiente omitiría los formularios como ya hechos
+        args.checkpoint = None
+
+    estado = {} if args.reiniciar else _leer_checkpoint(args.checkpoint)
+    form_ids = args.form_id
+    if not form_ids:
+        form_ids = [f["id"] for f in await get_repositorio().formularios(solo_activos=False)]
+
+    inicio = time.perf_counter()
+    filas, usuarios = 0, 0
+    for form_id in form_ids:
+        f, u = await recalcular_formulario(form_id, estado, args)
+        filas, usuarios = filas + f, usuarios + u
+
+    transcurrido = time.perf_counter() - inicio
+    print(f"Listo: {usuarios} puntajes recalculados desde {filas} respuestas en "
+          f"{transcurrido:.1f} s ({filas / max(transcurrido, 1e-9):,.0f} filas/s)")
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    await cerrar_repositorio()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""Arranque de producción: `python servidor.py` (ver Procfile).
+
+Varios workers de uvicorn, por defecto uno por CPU, bajo gunicorn cuando está
+disponible (Linux/macOS): precarga la app en el maestro, reinicia workers
+colgados o que llegan a max_requests y, con SIGTERM, deja terminar las
+peticiones en curso durante GRACEFUL_TIMEOUT segundos. En Windows (sin
+gunicorn) usa el gestor de procesos de uvicorn con el mismo número de workers.
+
+Con más de un worker conviene ALMACEN=redis (utils/almacen.py) para que el
+limitador, los tokens verificados y el catálogo sean los mismos en todos.
+
+Variables del despliegue además de las de Supabase:
+  CORS_ORIGENES   dominio(s) del frontend separados por coma, p. ej.
+                  https://termometro.ejemplo.com,http://localhost:3000 (el
+                  navegador llama a la API con credenciales; sin la variable se
+                  acepta cualquier origen, ver main.py)
+  CONFIAR_PROXY   proxies delante de la API cuya entrada de X-Forwarded-For
+                  se usa como IP del cliente en los límites de login y
+                  registro: 1 en Railway (el valor por defecto allí), 0 sin
+                  proxy (ver utils/limites.py)
+"""
+import logging
+import os
+
+PUERTO = int(os.getenv("PORT", "8000"))
+HOST = os.getenv("HOST", "0.0.0.0")
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+TIMEOUT = int(os.getenv("WORKER_TIMEOUT", "60"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+# Proxies cuyo X-Forwarded-For se acepta para request.client. La IP del proxy
+# de Railway no es fija, así que por defecto se confía en cualquiera; la IP que
+# usa el limitador la elige CONFIAR_PROXY (utils/limites.py).
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "*")
+# Reciclar workers de vez en cuando acota cualquier crecimiento de memoria;
+# el jitter evita que todos se reinicien a la vez
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "10000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+log = logging.getLogger("servidor")
+
+
+def con_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class Aplicacion(BaseApplication):
+        def load_config(self):
+            opciones = {
+                "bind": f"{HOST}:{PUERTO}",
+                "workers": WORKERS,
+                "worker_class": "uvicorn_worker.UvicornWorker",
+                "preload_app": True,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "timeout": TIMEOUT,
+                "keepalive": KEEPALIVE,
+                "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+                "max_requests": MAX_REQUESTS,
+                "max_requests_jitter": MAX_REQUESTS_JITTER,
+                "accesslog": "-" if os.getenv("ACCESS_LOG", "0") == "1" else None,
+            }
+            for clave, valor in opciones.items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            # Con preload_app se importa una vez en el maestro y los workers la
+            # heredan al hacer fork; las conexiones (httpx, pools, Redis) se
+            # abren en el primer uso dentro de cada worker, nunca antes del fork.
+            from main import app
+            return app
+
+    Aplicacion().run()
+
+
+def con_uvicorn():
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PUERTO,
+        workers=WORKERS,
+        timeout_keep_alive=KEEPALIVE,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        limit_max_requests=MAX_REQUESTS or None,
+        access_log=os.getenv("ACCESS_LOG", "0") == "1",
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        import gunicorn  # noqa: F401
+        import uvicorn_worker  # noqa: F401
+    except ImportError:
+        log.info("gunicorn no disponible, usando uvicorn con %d workers", WORKERS)
+        con_uvicorn()
+    else:
+        con_gunicorn()
@@ -0,0 +1,135 @@
+-- Analítica agregada por formulario para el personal del programa
+-- (GET /api/admin/analitica/{form_id}). Todo se calcula en la base de datos:
+-- la API recibe un único JSON, nunca las filas.
+
+-- Índices para agregar user_form_scores de un formulario sin recorrer la tabla
+create index if not exists user_form_scores_form_percentage_idx
+  on public.user_form_scores (form_id, percentage);
+create index if not exists user_form_scores_form_completed_idx
+  on public.user_form_scores (form_id, completed_at);
+
+-- Conteos de respuestas "yes" por pregunta, mantenidos por triggers de
+-- sentencia. Evita agrupar user_responses completa (preguntas x usuarios filas).
+create table if not exists public.question_response_stats (
+  question_id   uuid primary key references public.questions (id) on delete cascade,
+  form_id       uuid not null,
+  respuestas    bigint not null default 0,
+  respuestas_si bigint not null default 0
+);
+create index if not exists question_response_stats_form_idx
+  on public.question_response_stats (form_id);
+
+create or replace function public.acumular_question_response_stats()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    insert into public.question_response_stats as s (question_id, form_id, respuestas, respuestas_si)
+    select question_id, form_id, -count(*), -count(*) filter (where lower(response_value) = 'yes')
+    from viejas
+    group by question_id, form_id
+    on conflict (question_id) do update
+      set respuestas = s.respuestas + excluded.respuestas,
+          respuestas_si = s.respuestas_si + excluded.respuestas_si;
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') then
+    insert into public.question_response_stats as s (question_id, form_id, respuestas, respuestas_si)
+    select question_id, form_id, count(*), count(*) filter (where lower(response_value) = 'yes')
+    from nuevas
+    group by question_id, form_id
+    on conflict (question_id) do update
+      set respuestas = s.respuestas + excluded.respuestas,
+          respuestas_si = s.respuestas_si + excluded.respuestas_si;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists user_responses_stats_insert on public.user_responses;
+create trigger user_responses_stats_insert
+  after insert on public.user_responses
+  referencing new table as nuevas
+  for each statement execute function public.acumular_question_response_stats();
+
+drop trigger if exists user_responses_stats_update on public.user_responses;
+create trigger user_responses_stats_update
+  after update on public.user_responses
+  referencing old table as viejas new table as nuevas
+  for each statement execute function public.acumular_question_response_stats();
+
+drop trigger if exists user_responses_stats_delete on public.user_responses;
+create trigger user_responses_stats_delete
+  after delete on public.user_responses
+  referencing old table as viejas
+  for each statement execute function public.acumular_question_response_stats();
+
+-- Carga inicial a partir de las respuestas existentes
+insert into public.question_response_stats (question_id, form_id, respuestas, respuestas_si)
+select question_id, form_id, count(*), count(*) filter (where lower(response_value) = 'yes')
+from public.user_responses
+group by question_id, form_id
+on conflict (question_id) do update
+  set respuestas = excluded.respuestas,
+      respuestas_si = excluded.respuestas_si;
+
+-- p_intervalo: 'day' | 'week' | 'month'. El rango de fechas filtra los puntajes
+-- por completed_at; las tasas por pregunta son acumuladas desde el inicio.
+create or replace function public.analitica_formulario(
+  p_form_id uuid,
+  p_intervalo text default 'day',
+  p_desde timestamptz default null,
+  p_hasta timestamptz default null
+)
+returns jsonb
+language sql
+stable
+as $$
+  with puntajes as (
+    select readiness_level, percentage, completed_at
+    from public.user_form_scores
+    where form_id = p_form_id
+      and (p_desde is null or completed_at >= p_desde)
+      and (p_hasta is null or completed_at < p_hasta)
+  )
+  select jsonb_build_object(
+    'respondentes', (select count(*) from puntajes),
+    'niveles', (
+      select coalesce(jsonb_object_agg(readiness_level, total), '{}'::jsonb)
+      from (select readiness_level, count(*) as total from puntajes group by readiness_level) n
+    ),
+    'percentiles', (
+      select jsonb_build_object(
+        'p10', percentile_cont(0.10) within group (order by percentage),
+        'p25', percentile_cont(0.25) within group (order by percentage),
+        'p50', percentile_cont(0.50) within group (order by percentage),
+        'p75', percentile_cont(0.75) within group (order by percentage),
+        'p90', percentile_cont(0.90) within group (order by percentage),
+        'promedio', round(avg(percentage)::numeric, 2)
+      )
+      from puntajes
+    ),
+    'preguntas', (
+      select coalesce(jsonb_agg(jsonb_build_object(
+               'question_id', s.question_id,
+               'question_text', q.question_text,
+               'respuestas', s.respuestas,
+               'tasa_si', round(s.respuestas_si::numeric / nullif(s.respuestas, 0), 4)
+             ) order by q.order_index), '[]'::jsonb)
+      from public.question_response_stats s
+      join public.questions q on q.id = s.question_id
+      where s.form_id = p_form_id
+    ),
+    'completados', (
+      select coalesce(jsonb_agg(jsonb_build_object('periodo', periodo, 'total', total)
+                                order by periodo), '[]'::jsonb)
+      from (
+        select date_trunc(p_intervalo, completed_at) as periodo, count(*) as total
+        from puntajes
+        where completed_at is not null
+        group by 1
+      ) c
+    )
+  );
+$$;
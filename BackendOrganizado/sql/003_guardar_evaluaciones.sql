@@ -0,0 +1,35 @@
+-- Variante por lotes de guardar_evaluacion: respuestas y puntajes de varios
+-- formularios en una sola transacción. La usa POST /api/termometro/batch/responder.
+--
+--   p_respuestas: [{user_id, form_id, question_id, response_value, score}, ...]
+--   p_puntajes:   [fila de user_form_scores, ...] (una por formulario)
+
+create or replace function public.guardar_evaluaciones(p_respuestas jsonb, p_puntajes jsonb)
+returns void
+language plpgsql
+as $$
+begin
+  insert into public.user_responses (user_id, form_id, question_id, response_value, score)
+  select r.user_id, r.form_id, r.question_id, r.response_value, r.score
+  from jsonb_populate_recordset(null::public.user_responses, coalesce(p_respuestas, '[]'::jsonb)) as r
+  on conflict (user_id, question_id) do update
+    set response_value = excluded.response_value,
+        score = excluded.score;
+
+  insert into public.user_form_scores (
+    user_id, form_id, total_score, max_possible_score, percentage,
+    readiness_level, readiness_color, can_export, completion_status, completed_at)
+  select p.user_id, p.form_id, p.total_score, p.max_possible_score, p.percentage,
+         p.readiness_level, p.readiness_color, p.can_export, p.completion_status, p.completed_at
+  from jsonb_populate_recordset(null::public.user_form_scores, coalesce(p_puntajes, '[]'::jsonb)) as p
+  on conflict (user_id, form_id) do update
+    set total_score = excluded.total_score,
+        max_possible_score = excluded.max_possible_score,
+        percentage = excluded.percentage,
+        readiness_level = excluded.readiness_level,
+        readiness_color = excluded.readiness_color,
+        can_export = excluded.can_export,
+        completion_status = excluded.completion_status,
+        completed_at = excluded.completed_at;
+end;
+$$;
@@ -0,0 +1,13 @@
+-- Índices para las consultas calientes de la API (catálogo, estado y
+-- respuestas guardadas), sirvan vía PostgREST o con REPOSITORIO=postgres.
+-- user_form_scores (user_id, form_id) y user_responses (user_id, question_id)
+-- ya tienen índice por sus restricciones unique (los usa el on conflict).
+
+create index if not exists questions_form_order_idx
+  on public.questions (form_id, order_index);
+create index if not exists user_responses_user_form_idx
+  on public.user_responses (user_id, form_id);
+create index if not exists user_responses_form_user_idx
+  on public.user_responses (form_id, user_id, question_id);
+create index if not exists user_form_scores_form_user_idx
+  on public.user_form_scores (form_id, user_id);
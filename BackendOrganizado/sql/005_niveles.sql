@@ -0,0 +1,29 @@
+-- Bandas del termómetro como datos. form_id nulo = bandas globales; un
+-- formulario con filas propias usa solo esas. Cada banda aplica desde
+-- min_percentage (inclusive) hasta la siguiente. La API las carga una vez por
+-- formulario y las cachea con el catálogo (POST /api/formularios/cache/invalidar
+-- las recarga).
+
+create table if not exists public.readiness_levels (
+  id             bigint generated always as identity primary key,
+  form_id        uuid references public.forms (id) on delete cascade,
+  min_percentage numeric not null check (min_percentage >= 0 and min_percentage <= 100),
+  level          text not null,
+  color          text not null,
+  can_export     boolean not null default false,
+  message        text,
+  description    text
+);
+create unique index if not exists readiness_levels_form_min_idx
+  on public.readiness_levels (coalesce(form_id, '00000000-0000-0000-0000-000000000000'::uuid), min_percentage);
+
+insert into public.readiness_levels (form_id, min_percentage, level, color, can_export, message, description)
+select null, v.min_percentage, v.level, v.color, v.can_export, v.message, v.description
+from (values
+  (85, 'excelente', 'green',       true,  '¡Listo para exportar! Tienes todas las capacidades', 'Cuentas con todos los requisitos necesarios'),
+  (70, 'bueno',     'light-green', true,  'Casi listo - Solo algunos detalles por mejorar',     'Tienes la mayoría de requisitos cubiertos'),
+  (50, 'moderado',  'yellow',      false, 'Necesitas mejorar varias áreas',                     'Estás en buen camino pero faltan cosas importantes'),
+  (30, 'bajo',      'orange',      false, 'Te falta bastante preparación',                      'Necesitas trabajar en muchos aspectos básicos'),
+  (0,  'crítico',   'red',         false, 'No estás preparado para exportar',                   'Te faltan la mayoría de requisitos fundamentales')
+) as v (min_percentage, level, color, can_export, message, description)
+where not exists (select 1 from public.readiness_levels where form_id is null);
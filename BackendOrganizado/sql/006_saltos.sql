@@ -0,0 +1,15 @@
+-- Formularios con ramificaciones. Las preguntas se agrupan en secciones
+-- (páginas) y cada una puede llevar una condición skip_if que la omite según
+-- respuestas anteriores, por ejemplo saltar la sección de logística cuando
+-- "¿Ya exporta?" es "no":
+--
+--   update public.questions
+--      set skip_if = '{"question_id": "<id de ¿Ya exporta?>", "equals": "no"}'
+--    where form_id = '<form>' and section = 'logistica';
+--
+-- Formas: equals / not_equals / in / answered sobre una pregunta anterior,
+-- combinables con all / any / not (ver utils/puntaje.py). La API compila el
+-- grafo una vez por formulario; las preguntas omitidas no suman al puntaje.
+
+alter table public.questions add column if not exists section text;
+alter table public.questions add column if not exists skip_if jsonb;
@@ -0,0 +1,66 @@
+-- Borradores con sincronización por deltas (POST /api/termometro/{form_id}/borrador).
+-- El borrador son las mismas filas de user_responses: cada cambio trae la
+-- version que le puso el cliente al editar y gana la más alta por pregunta
+-- (last-writer-wins). updated_at permite devolver solo lo que cambió desde la
+-- última sincronización del dispositivo.
+
+alter table public.user_responses add column if not exists version bigint;
+alter table public.user_responses add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists user_responses_user_form_updated_idx
+  on public.user_responses (user_id, form_id, updated_at);
+
+-- Cualquier escritura (guardar_evaluacion(es), upserts de PostgREST) mueve updated_at
+create or replace function public.tocar_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists user_responses_updated_at on public.user_responses;
+create trigger user_responses_updated_at
+  before update on public.user_responses
+  for each row execute function public.tocar_updated_at();
+
+--   p_cambios: [{question_id, response_value, score, version}, ...]
+--   p_desde:   updated_at de la sincronización anterior (null = borrador completo)
+-- Devuelve {"cambios": [...], "cursor": max(updated_at)}: las filas tocadas
+-- desde p_desde más las de las preguntas enviadas, para que el cliente vea qué
+-- versión quedó en cada una.
+create or replace function public.sincronizar_borrador(
+  p_user_id uuid, p_form_id uuid, p_cambios jsonb, p_desde timestamptz default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+  v_filas jsonb;
+begin
+  insert into public.user_responses (user_id, form_id, question_id, response_value, score, version)
+  select p_user_id, p_form_id, c.question_id, c.response_value, c.score, c.version
+  from jsonb_to_recordset(coalesce(p_cambios, '[]'::jsonb))
+    as c (question_id uuid, response_value text, score numeric, version bigint)
+  on conflict (user_id, question_id) do update
+    set response_value = excluded.response_value,
+        score = excluded.score,
+        version = excluded.version
+    where public.user_responses.version is null
+       or excluded.version > public.user_responses.version;
+
+  select coalesce(jsonb_agg(jsonb_build_object(
+           'question_id', r.question_id, 'response_value', r.response_value,
+           'version', r.version, 'updated_at', r.updated_at) order by r.updated_at), '[]'::jsonb)
+    into v_filas
+  from public.user_responses r
+  where r.user_id = p_user_id and r.form_id = p_form_id
+    and (p_desde is null or r.updated_at >= p_desde
+         or r.question_id in (select (c ->> 'question_id')::uuid
+                              from jsonb_array_elements(coalesce(p_cambios, '[]'::jsonb)) c));
+
+  return jsonb_build_object('cambios', v_filas, 'cursor', (
+    select max((f ->> 'updated_at')::timestamptz) from jsonb_array_elements(v_filas) f));
+end;
+$$;
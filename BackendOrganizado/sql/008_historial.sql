@@ -0,0 +1,146 @@
+-- Historial de puntajes: user_form_scores guarda solo el último resultado de
+-- cada (usuario, formulario); cada envío deja además una fila aquí, que nunca
+-- se actualiza. Lo lee GET /api/termometro/{form_id}/historial.
+--
+-- Los recálculos masivos (scripts/recalcular_puntajes.py) no agregan filas:
+-- el historial refleja lo que el usuario vio al responder.
+
+create table if not exists public.user_form_score_history (
+  id                 bigint generated always as identity primary key,
+  user_id            uuid not null,
+  form_id            uuid not null references public.forms (id) on delete cascade,
+  total_score        numeric,
+  max_possible_score numeric,
+  percentage         numeric,
+  readiness_level    text,
+  can_export         boolean,
+  completed_at       timestamptz not null default now()
+);
+-- La serie de un usuario en un formulario es un rango de este índice
+create index if not exists user_form_score_history_user_form_completed_idx
+  on public.user_form_score_history (user_id, form_id, completed_at);
+
+-- Punto de partida: el resultado actual de cada usuario
+insert into public.user_form_score_history (
+  user_id, form_id, total_score, max_possible_score, percentage,
+  readiness_level, can_export, completed_at)
+select s.user_id, s.form_id, s.total_score, s.max_possible_score, s.percentage,
+       s.readiness_level, s.can_export, s.completed_at
+from public.user_form_scores s
+where s.completed_at is not null
+  and not exists (select 1 from public.user_form_score_history h
+                  where h.user_id = s.user_id and h.form_id = s.form_id);
+
+-- Igual que en sql/003 más el historial, en la misma transacción.
+--   p_historial: filas para el historial si no son las mismas de p_puntajes
+--                (la escritura diferida une envíos repetidos en p_puntajes,
+--                pero cada envío debe quedar en el historial)
+drop function if exists public.guardar_evaluaciones(jsonb, jsonb);
+create or replace function public.guardar_evaluaciones(
+  p_respuestas jsonb, p_puntajes jsonb, p_historial jsonb default null)
+returns void
+language plpgsql
+as $$
+begin
+  insert into public.user_responses (user_id, form_id, question_id, response_value, score)
+  select r.user_id, r.form_id, r.question_id, r.response_value, r.score
+  from jsonb_populate_recordset(null::public.user_responses, coalesce(p_respuestas, '[]'::jsonb)) as r
+  on conflict (user_id, question_id) do update
+    set response_value = excluded.response_value,
+        score = excluded.score;
+
+  insert into public.user_form_scores (
+    user_id, form_id, total_score, max_possible_score, percentage,
+    readiness_level, readiness_color, can_export, completion_status, completed_at)
+  select p.user_id, p.form_id, p.total_score, p.max_possible_score, p.percentage,
+         p.readiness_level, p.readiness_color, p.can_export, p.completion_status, p.completed_at
+  from jsonb_populate_recordset(null::public.user_form_scores, coalesce(p_puntajes, '[]'::jsonb)) as p
+  on conflict (user_id, form_id) do update
+    set total_score = excluded.total_score,
+        max_possible_score = excluded.max_possible_score,
+        percentage = excluded.percentage,
+        readiness_level = excluded.readiness_level,
+        readiness_color = excluded.readiness_color,
+        can_export = excluded.can_export,
+        completion_status = excluded.completion_status,
+        completed_at = excluded.completed_at;
+
+  insert into public.user_form_score_history (
+    user_id, form_id, total_score, max_possible_score, percentage,
+    readiness_level, can_export, completed_at)
+  select p.user_id, p.form_id, p.total_score, p.max_possible_score, p.percentage,
+         p.readiness_level, p.can_export, coalesce(p.completed_at, now())
+  from jsonb_populate_recordset(null::public.user_form_scores,
+                                coalesce(p_historial, p_puntajes, '[]'::jsonb)) as p;
+end;
+$$;
+
+-- La variante de un formulario (sql/001) pasa por la misma función, así que
+-- también deja historial
+create or replace function public.guardar_evaluacion(p_respuestas jsonb, p_puntaje jsonb default null)
+returns void
+language sql
+as $$
+  select public.guardar_evaluaciones(
+    p_respuestas,
+    case when p_puntaje is null then '[]'::jsonb else jsonb_build_array(p_puntaje) end);
+$$;
+
+-- Serie de un usuario reducida a lo sumo p_puntos puntos: el rango de fechas
+-- se parte en p_puntos tramos iguales y de cada tramo sale el último envío
+-- (el estado del termómetro al cerrar el tramo) con cuántos envíos resume.
+-- Con p_puntos o menos envíos se devuelven todos.
+create or replace function public.historial_puntajes(
+  p_user_id uuid,
+  p_form_id uuid,
+  p_puntos int default 50,
+  p_desde timestamptz default null,
+  p_hasta timestamptz default null
+)
+returns jsonb
+language sql
+stable
+as $$
+  with filas as (
+    select percentage, total_score, max_possible_score, readiness_level, can_export, completed_at
+    from public.user_form_score_history
+    where user_id = p_user_id
+      and form_id = p_form_id
+      and (p_desde is null or completed_at >= p_desde)
+      and (p_hasta is null or completed_at < p_hasta)
+  ),
+  rango as (
+    select count(*) as total,
+           extract(epoch from min(completed_at)) as inicio,
+           extract(epoch from max(completed_at)) - extract(epoch from min(completed_at)) as ancho
+    from filas
+  ),
+  tramos as (
+    select f.*,
+           case when r.total <= p_puntos then row_number() over (order by f.completed_at)
+                when r.ancho = 0 then 0
+                else least(p_puntos - 1,
+                           floor((extract(epoch from f.completed_at) - r.inicio) / r.ancho * p_puntos))
+           end as tramo
+    from filas f cross join rango r
+  ),
+  ultimos as (
+    select distinct on (tramo) *, count(*) over (partition by tramo) as envios
+    from tramos
+    order by tramo, completed_at desc
+  )
+  select jsonb_build_object(
+    'total', (select total from rango),
+    'puntos', coalesce((
+      select jsonb_agg(jsonb_build_object(
+               'completed_at', completed_at,
+               'percentage', percentage,
+               'total_score', total_score,
+               'max_possible_score', max_possible_score,
+               'readiness_level', readiness_level,
+               'can_export', can_export,
+               'envios', envios
+             ) order by completed_at)
+      from ultimos), '[]'::jsonb)
+  );
+$$;
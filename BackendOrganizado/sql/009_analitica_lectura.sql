@@ -0,0 +1,86 @@
+-- Las tasas por pregunta de la analítica se calculan al leer, en lugar de los
+-- contadores de sql/002 mantenidos por triggers:
+--   * cada envío actualizaba las mismas filas de question_response_stats (una
+--     por pregunta), así que en los picos de un taller todos los envíos del
+--     formulario se serializaban en esos bloqueos y podían interbloquearse;
+--   * los triggers contaban también borradores y progreso parcial.
+-- Ahora solo cuentan las respuestas de usuarios con una evaluación completa
+-- del formulario. El endpoint guarda el resultado en cache (ANALITICA_TTL).
+
+drop trigger if exists user_responses_stats_insert on public.user_responses;
+drop trigger if exists user_responses_stats_update on public.user_responses;
+drop trigger if exists user_responses_stats_delete on public.user_responses;
+drop function if exists public.acumular_question_response_stats();
+drop table if exists public.question_response_stats;
+
+-- Evaluaciones completas de un formulario, para unir con user_responses por
+-- (form_id, user_id) con el índice user_responses_form_user_idx (sql/004)
+create index if not exists user_form_scores_form_status_user_idx
+  on public.user_form_scores (form_id, completion_status, user_id);
+
+create or replace function public.analitica_formulario(
+  p_form_id uuid,
+  p_intervalo text default 'day',
+  p_desde timestamptz default null,
+  p_hasta timestamptz default null
+)
+returns jsonb
+language sql
+stable
+as $$
+  with puntajes as (
+    select readiness_level, percentage, completed_at
+    from public.user_form_scores
+    where form_id = p_form_id
+      and (p_desde is null or completed_at >= p_desde)
+      and (p_hasta is null or completed_at < p_hasta)
+  ),
+  respuestas as (
+    select r.question_id,
+           count(*) as respuestas,
+           count(*) filter (where lower(r.response_value) = 'yes') as respuestas_si
+    from public.user_responses r
+    join public.user_form_scores s
+      on s.form_id = r.form_id and s.user_id = r.user_id and s.completion_status = 'complete'
+    where r.form_id = p_form_id
+    group by r.question_id
+  )
+  select jsonb_build_object(
+    'respondentes', (select count(*) from puntajes),
+    'niveles', (
+      select coalesce(jsonb_object_agg(readiness_level, total), '{}'::jsonb)
+      from (select readiness_level, count(*) as total from puntajes group by readiness_level) n
+    ),
+    'percentiles', (
+      select jsonb_build_object(
+        'p10', percentile_cont(0.10) within group (order by percentage),
+        'p25', percentile_cont(0.25) within group (order by percentage),
+        'p50', percentile_cont(0.50) within group (order by percentage),
+        'p75', percentile_cont(0.75) within group (order by percentage),
+        'p90', percentile_cont(0.90) within group (order by percentage),
+        'promedio', round(avg(percentage)::numeric, 2)
+      )
+      from puntajes
+    ),
+    'preguntas', (
+      select coalesce(jsonb_agg(jsonb_build_object(
+               'question_id', a.question_id,
+               'question_text', q.question_text,
+               'respuestas', a.respuestas,
+               'tasa_si', round(a.respuestas_si::numeric / nullif(a.respuestas, 0), 4)
+             ) order by q.order_index), '[]'::jsonb)
+      from respuestas a
+      join public.questions q on q.id = a.question_id
+    ),
+    'completados', (
+      select coalesce(jsonb_agg(jsonb_build_object('periodo', periodo, 'total', total)
+                                order by periodo), '[]'::jsonb)
+      from (
+        select date_trunc(p_intervalo, completed_at) as periodo, count(*) as total
+        from puntajes
+        where completed_at is not null
+        group by 1
+      ) c
+    )
+  );
+$$;
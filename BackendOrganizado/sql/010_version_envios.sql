@@ -0,0 +1,48 @@
+-- Last-writer-wins entre borradores y envíos completos: /responder y
+-- /progreso pisaban response_value pero dejaban la version del último delta
+-- de borrador, así que un delta offline que llegaba tarde con una version
+-- mayor sobrescribía una respuesta enviada después. Ahora toda escritura que
+-- no es de borrador deja su version: la que trae la fila (hora del servidor
+-- en ms al recibir el envío, ver routers/termometro.py) o, si no trae, la
+-- hora de la escritura en la misma escala.
+
+create or replace function public.guardar_evaluaciones(
+  p_respuestas jsonb, p_puntajes jsonb, p_historial jsonb default null)
+returns void
+language plpgsql
+as $$
+begin
+  insert into public.user_responses (user_id, form_id, question_id, response_value, score, version)
+  select r.user_id, r.form_id, r.question_id, r.response_value, r.score,
+         coalesce(r.version, (extract(epoch from clock_timestamp()) * 1000)::bigint)
+  from jsonb_populate_recordset(null::public.user_responses, coalesce(p_respuestas, '[]'::jsonb)) as r
+  on conflict (user_id, question_id) do update
+    set response_value = excluded.response_value,
+        score = excluded.score,
+        version = excluded.version;
+
+  insert into public.user_form_scores (
+    user_id, form_id, total_score, max_possible_score, percentage,
+    readiness_level, readiness_color, can_export, completion_status, completed_at)
+  select p.user_id, p.form_id, p.total_score, p.max_possible_score, p.percentage,
+         p.readiness_level, p.readiness_color, p.can_export, p.completion_status, p.completed_at
+  from jsonb_populate_recordset(null::public.user_form_scores, coalesce(p_puntajes, '[]'::jsonb)) as p
+  on conflict (user_id, form_id) do update
+    set total_score = excluded.total_score,
+        max_possible_score = excluded.max_possible_score,
+        percentage = excluded.percentage,
+        readiness_level = excluded.readiness_level,
+        readiness_color = excluded.readiness_color,
+        can_export = excluded.can_export,
+        completion_status = excluded.completion_status,
+        completed_at = excluded.completed_at;
+
+  insert into public.user_form_score_history (
+    user_id, form_id, total_score, max_possible_score, percentage,
+    readiness_level, can_export, completed_at)
+  select p.user_id, p.form_id, p.total_score, p.max_possible_score, p.percentage,
+         p.readiness_level, p.can_export, coalesce(p.completed_at, now())
+  from jsonb_populate_recordset(null::public.user_form_scores,
+                                coalesce(p_historial, p_puntajes, '[]'::jsonb)) as p;
+end;
+$$;
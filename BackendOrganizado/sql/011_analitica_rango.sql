@@ -0,0 +1,77 @@
+-- Tasas por pregunta de analitica_formulario (sql/009) acotadas al rango:
+--   * respetan p_desde/p_hasta, igual que los demás números de la respuesta;
+--   * se parte de las filas de user_form_scores del formulario con evaluación
+--     completa en el rango (índice parcial de abajo) y de cada una se llega a
+--     sus respuestas por user_responses_form_user_idx (sql/004), en lugar de
+--     unir todas las respuestas del formulario en cada lectura.
+
+drop index if exists public.user_form_scores_form_status_user_idx;
+create index if not exists user_form_scores_completos_idx
+  on public.user_form_scores (form_id, completed_at, user_id)
+  where completion_status = 'complete';
+
+create or replace function public.analitica_formulario(
+  p_form_id uuid,
+  p_intervalo text default 'day',
+  p_desde timestamptz default null,
+  p_hasta timestamptz default null
+)
+returns jsonb
+language sql
+stable
+as $$
+  with puntajes as (
+    select user_id, readiness_level, percentage, completion_status, completed_at
+    from public.user_form_scores
+    where form_id = p_form_id
+      and (p_desde is null or completed_at >= p_desde)
+      and (p_hasta is null or completed_at < p_hasta)
+  ),
+  respuestas as (
+    select r.question_id,
+           count(*) as respuestas,
+           count(*) filter (where lower(r.response_value) = 'yes') as respuestas_si
+    from puntajes s
+    join public.user_responses r on r.form_id = p_form_id and r.user_id = s.user_id
+    where s.completion_status = 'complete'
+    group by r.question_id
+  )
+  select jsonb_build_object(
+    'respondentes', (select count(*) from puntajes),
+    'niveles', (
+      select coalesce(jsonb_object_agg(readiness_level, total), '{}'::jsonb)
+      from (select readiness_level, count(*) as total from puntajes group by readiness_level) n
+    ),
+    'percentiles', (
+      select jsonb_build_object(
+        'p10', percentile_cont(0.10) within group (order by percentage),
+        'p25', percentile_cont(0.25) within group (order by percentage),
+        'p50', percentile_cont(0.50) within group (order by percentage),
+        'p75', percentile_cont(0.75) within group (order by percentage),
+        'p90', percentile_cont(0.90) within group (order by percentage),
+        'promedio', round(avg(percentage)::numeric, 2)
+      )
+      from puntajes
+    ),
+    'preguntas', (
+      select coalesce(jsonb_agg(jsonb_build_object(
+               'question_id', a.question_id,
+               'question_text', q.question_text,
+               'respuestas', a.respuestas,
+               'tasa_si', round(a.respuestas_si::numeric / nullif(a.respuestas, 0), 4)
+             ) order by q.order_index), '[]'::jsonb)
+      from respuestas a
+      join public.questions q on q.id = a.question_id
+    ),
+    'completados', (
+      select coalesce(jsonb_agg(jsonb_build_object('periodo', periodo, 'total', total)
+                                order by periodo), '[]'::jsonb)
+      from (
+        select date_trunc(p_intervalo, completed_at) as periodo, count(*) as total
+        from puntajes
+        where completed_at is not null
+        group by 1
+      ) c
+    )
+  );
+$$;
@@ -0,0 +1,53 @@
+-- guardar_evaluaciones no pisa datos más nuevos. La escritura diferida
+-- (utils/escritura.py) puede escribir una evaluación vieja después de otra más
+-- nueva del mismo usuario: un lote que falla se parte y la mitad devuelta al
+-- spool se reintenta más tarde, y /progreso escribe directo mientras hay
+-- envíos en cola. Ahora:
+--   * una respuesta solo se reemplaza por otra de version igual o mayor;
+--   * un puntaje solo se reemplaza por otro de completed_at igual o posterior
+--     (o sin completed_at, como los recálculos masivos).
+-- El historial sigue recibiendo cada envío con su completed_at.
+
+create or replace function public.guardar_evaluaciones(
+  p_respuestas jsonb, p_puntajes jsonb, p_historial jsonb default null)
+returns void
+language plpgsql
+as $$
+begin
+  insert into public.user_responses as u (user_id, form_id, question_id, response_value, score, version)
+  select r.user_id, r.form_id, r.question_id, r.response_value, r.score,
+         coalesce(r.version, (extract(epoch from clock_timestamp()) * 1000)::bigint)
+  from jsonb_populate_recordset(null::public.user_responses, coalesce(p_respuestas, '[]'::jsonb)) as r
+  on conflict (user_id, question_id) do update
+    set response_value = excluded.response_value,
+        score = excluded.score,
+        version = excluded.version
+    where u.version is null or excluded.version >= u.version;
+
+  insert into public.user_form_scores as s (
+    user_id, form_id, total_score, max_possible_score, percentage,
+    readiness_level, readiness_color, can_export, completion_status, completed_at)
+  select p.user_id, p.form_id, p.total_score, p.max_possible_score, p.percentage,
+         p.readiness_level, p.readiness_color, p.can_export, p.completion_status, p.completed_at
+  from jsonb_populate_recordset(null::public.user_form_scores, coalesce(p_puntajes, '[]'::jsonb)) as p
+  on conflict (user_id, form_id) do update
+    set total_score = excluded.total_score,
+        max_possible_score = excluded.max_possible_score,
+        percentage = excluded.percentage,
+        readiness_level = excluded.readiness_level,
+        readiness_color = excluded.readiness_color,
+        can_export = excluded.can_export,
+        completion_status = coalesce(excluded.completion_status, s.completion_status),
+        completed_at = coalesce(excluded.completed_at, s.completed_at)
+    where excluded.completed_at is null or s.completed_at is null
+       or excluded.completed_at >= s.completed_at;
+
+  insert into public.user_form_score_history (
+    user_id, form_id, total_score, max_possible_score, percentage,
+    readiness_level, can_export, completed_at)
+  select p.user_id, p.form_id, p.total_score, p.max_possible_score, p.percentage,
+         p.readiness_level, p.can_export, coalesce(p.completed_at, now())
+  from jsonb_populate_recordset(null::public.user_form_scores,
+                                coalesce(p_historial, p_puntajes, '[]'::jsonb)) as p;
+end;
+$$;
@@ -0,0 +1,55 @@
+"""La API contra un SQLite temporal (REPOSITORIO=sqlite) y tokens HS256 firmados
+aquí: no hace falta Supabase ni red."""
+import os
+import sqlite3
+import tempfile
+import time
+
+import jwt
+import pytest
+
+SECRETO = "secreto-pruebas"
+FORM_ID = "9b2f6c1e-0000-4000-8000-000000000001"
+PREGUNTAS = [f"9b2f6c1e-0000-4000-8000-0000000001{i:02d}" for i in range(3)]
+
+_ruta = os.path.join(tempfile.mkdtemp(), "pruebas.sqlite")
+os.environ.update({
+    "REPOSITORIO": "sqlite",
+    "SQLITE_RUTA": _ruta,
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "anon",
+    "SUPABASE_JWT_SECRET": SECRETO,
+    "LIMITES_ACTIVOS": "0",
+    "ESCRITURA_DIFERIDA": "0",
+})
+
+
+def _sembrar():
+    from utils.repositorio_sql import ESQUEMA_SQLITE
+
+    with sqlite3.connect(_ruta) as conexion:
+        conexion.executescript(ESQUEMA_SQLITE)
+        conexion.execute("insert into forms (id, title, is_active) values (?, ?, 1)", (FORM_ID, "Prueba"))
+        conexion.executemany(
+            "insert into questions (id, form_id, question_text, order_index, weight, points_for_yes, points_for_no) "
+            "values (?, ?, ?, ?, 1, 1, 0)",
+            [(qid, FORM_ID, f"Pregunta {i}", i) for i, qid in enumerate(PREGUNTAS)])
+
+
+def token(sub: str, email: str = None, exp: float = None) -> str:
+    return jwt.encode({"sub": sub, "email": email or f"{sub}@ejemplo.com", "aud": "authenticated",
+                       "role": "authenticated", "exp": int(exp or time.time() + 600)}, SECRETO)
+
+
+def encabezados(sub: str) -> dict:
+    return {"Authorization": "Bearer " + token(sub)}
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    from fastapi.testclient import TestClient
+
+    _sembrar()
+    from main import app
+    with TestClient(app) as cliente:
+        yield cliente
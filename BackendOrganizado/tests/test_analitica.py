@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from conftest import FORM_ID, PREGUNTAS, encabezados
+from utils.repositorio import get_repositorio
+
+
+def _respuestas_por_pregunta() -> dict:
+    analitica = asyncio.run(get_repositorio().analitica(FORM_ID, "day"))
+    return {p["question_id"]: p["respuestas"] for p in analitica["preguntas"]}
+
+
+def test_solo_cuentan_evaluaciones_completas(cliente):
+    usuario = encabezados("analitica-parcial")
+    antes = _respuestas_por_pregunta()
+
+    # Progreso y borrador no son evaluaciones: no cambian las tasas
+    cliente.post(f"/api/termometro/{FORM_ID}/progreso", headers=usuario,
+                 json={"respuestas": [{"question_id": PREGUNTAS[0], "response_value": "yes"}]})
+    cliente.post(f"/api/termometro/{FORM_ID}/borrador", headers=usuario,
+                 json={"cambios": [{"question_id": PREGUNTAS[1], "response_value": "yes", "version": 1}]})
+    assert _respuestas_por_pregunta() == antes
+
+    r = cliente.post(f"/api/termometro/{FORM_ID}/responder", headers=usuario,
+                     json={"respuestas": [{"question_id": q, "response_value": "yes"} for q in PREGUNTAS]})
+    assert r.status_code == 200
+    despues = _respuestas_por_pregunta()
+    assert all(despues[q] == antes.get(q, 0) + 1 for q in PREGUNTAS)
+
+
+def test_las_tasas_respetan_el_rango_de_fechas(cliente):
+    r = cliente.post(f"/api/termometro/{FORM_ID}/responder", headers=encabezados("analitica-rango"),
+                     json={"respuestas": [{"question_id": q, "response_value": "no"} for q in PREGUNTAS]})
+    assert r.status_code == 200
+
+    antiguo = asyncio.run(get_repositorio().analitica(FORM_ID, "day", hasta=datetime(2000, 1, 1)))
+    assert antiguo["respondentes"] == 0
+    assert antiguo["preguntas"] == []
+
+    reciente = asyncio.run(get_repositorio().analitica(
+        FORM_ID, "day", desde=datetime.utcnow() - timedelta(minutes=5)))
+    assert all(p["respuestas"] <= reciente["respondentes"] for p in reciente["preguntas"])
+    assert reciente["percentiles"]["p50"] is not None
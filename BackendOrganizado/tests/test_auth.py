@@ -0,0 +1,84 @@
+import time
+
+import jwt
+
+from conftest import token
+from utils import auth_utils, sesiones
+from utils.cache import ConjuntoVencible
+
+
+def _refrescar(cliente, bearer: str):
+    return cliente.post("/auth/refresh", headers={"Authorization": "Bearer " + bearer})
+
+
+def test_refresh_con_bearer_falsificado(cliente):
+    falso = jwt.encode({"sub": "x", "aud": "authenticated", "exp": int(time.time()) + 600}, "otro-secreto")
+    assert _refrescar(cliente, falso).status_code == 401
+
+
+def test_refresh_con_bearer_vencido_fuera_de_la_holgura(cliente):
+    viejo = token("viejo", exp=time.time() - 24 * 3600)
+    assert _refrescar(cliente, viejo).status_code == 401
+
+
+def test_refresh_con_bearer_recien_vencido_busca_su_sesion(cliente):
+    # Dentro de la holgura pasa la verificación; sin sesión guardada no hay refresh_token
+    reciente = token("reciente", exp=time.time() - 30)
+    assert _refrescar(cliente, reciente).status_code == 400
+
+
+def test_token_revocado_se_rechaza(cliente):
+    bearer = token("revocado")
+    encabezado = {"Authorization": "Bearer " + bearer}
+    assert cliente.get("/api/termometro/mis-resultados", headers=encabezado).status_code == 200
+    assert cliente.post("/auth/logout", headers=encabezado).status_code == 200
+    assert cliente.get("/api/termometro/mis-resultados", headers=encabezado).status_code == 401
+    assert _refrescar(cliente, bearer).status_code == 401
+
+
+def test_revocaciones_no_se_descartan_por_tamano():
+    revocados = ConjuntoVencible()
+    ahora = time.time()
+    for i in range(50000):
+        revocados.agregar(i, ahora + 600)
+    revocados.agregar("vencido", ahora - 1)
+    assert 0 in revocados and 49999 in revocados
+    assert "vencido" not in revocados
+
+
+def test_revocaciones_vencidas_se_purgan():
+    revocados = ConjuntoVencible()
+    revocados.agregar("a", time.time() + 0.05)
+    time.sleep(0.06)
+    revocados.agregar("b", time.time() + 600)
+    assert len(revocados) == 1
+
+
+def test_refresh_con_bearer_lejos_de_vencer_se_rechaza(cliente):
+    # Un token vigente no se cambia por otro: robado valdría como refresh_token
+    vigente = token("vigente", exp=time.time() + 3600)
+    r = _refrescar(cliente, vigente)
+    assert r.status_code == 400
+    assert "aún no está por vencer" in r.json()["detail"]
+
+
+def test_refresh_con_bearer_por_vencer_busca_su_sesion(cliente):
+    por_vencer = token("por-vencer", exp=time.time() + 60)
+    r = _refrescar(cliente, por_vencer)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Se requiere el refresh_token"
+
+
+def test_logout_sin_almacen_cierra_igual(cliente, monkeypatch):
+    class AlmacenCaido:
+        compartido = True
+
+        async def obtener(self, *args):
+            raise ConnectionError("redis caído")
+
+        borrar = guardar = obtener
+
+    monkeypatch.setattr(sesiones, "get_almacen", lambda: AlmacenCaido())
+    monkeypatch.setattr(auth_utils, "get_almacen", lambda: AlmacenCaido())
+    r = cliente.post("/auth/logout", headers={"Authorization": "Bearer " + token("sin-almacen")})
+    assert r.status_code == 200
@@ -0,0 +1,101 @@
+import time
+
+from conftest import FORM_ID, PREGUNTAS, encabezados
+
+
+def test_sincronizar_devuelve_lo_guardado_con_progreso(cliente):
+    usuario = encabezados("borrador-progreso")
+    r = cliente.post(f"/api/termometro/{FORM_ID}/progreso", headers=usuario,
+                     json={"respuestas": [{"question_id": PREGUNTAS[0], "response_value": "yes"}]})
+    assert r.status_code == 200
+
+    # Primera sincronización completa: la fila de /progreso (version nula) debe
+    # llegar en "cambios", no contarse como aplicada
+    r = cliente.post(f"/api/termometro/{FORM_ID}/borrador", headers=usuario,
+                     json={"cambios": [{"question_id": PREGUNTAS[1], "response_value": "no", "version": 5}]})
+    assert r.status_code == 200
+    cuerpo = r.json()
+    assert cuerpo["aplicados"] == [PREGUNTAS[1]]
+    assert [c["question_id"] for c in cuerpo["cambios"]] == [PREGUNTAS[0]]
+    assert cuerpo["cambios"][0]["response_value"] == "yes"
+
+
+def test_gana_la_version_mayor(cliente):
+    usuario = encabezados("borrador-lww")
+    url = f"/api/termometro/{FORM_ID}/borrador"
+    cliente.post(url, headers=usuario,
+                 json={"cambios": [{"question_id": PREGUNTAS[0], "response_value": "yes", "version": 10}]})
+
+    r = cliente.post(url, headers=usuario,
+                     json={"cambios": [{"question_id": PREGUNTAS[0], "response_value": "no", "version": 3}]})
+    cuerpo = r.json()
+    assert cuerpo["aplicados"] == []
+    assert cuerpo["cambios"][0]["response_value"] == "yes"
+    assert cuerpo["cambios"][0]["version"] == 10
+
+    r = cliente.post(url, headers=usuario,
+                     json={"cambios": [{"question_id": PREGUNTAS[0], "response_value": "no", "version": 11}]})
+    assert r.json()["aplicados"] == [PREGUNTAS[0]]
+
+
+
+def test_empate_de_version_no_pisa_ni_se_da_por_aplicado(cliente):
+    url = f"/api/termometro/{FORM_ID}/borrador"
+    cliente.post(url, headers=encabezados("borrador-empate"),
+                 json={"cambios": [{"question_id": PREGUNTAS[0], "response_value": "yes", "version": 7}]})
+
+    # Otro dispositivo del mismo usuario con la misma version y otro valor
+    r = cliente.post(url, headers=encabezados("borrador-empate"),
+                     json={"cambios": [{"question_id": PREGUNTAS[0], "response_value": "no", "version": 7}]})
+    cuerpo = r.json()
+    assert cuerpo["aplicados"] == []
+    assert cuerpo["cambios"][0]["response_value"] == "yes"
+
+
+def test_borrador_posterior_pisa_progreso_y_en_un_envio_gana_el_ultimo_con_igual_version(cliente):
+    usuario = encabezados("borrador-mezcla")
+    cliente.post(f"/api/termometro/{FORM_ID}/progreso", headers=usuario,
+                 json={"respuestas": [{"question_id": PREGUNTAS[0], "response_value": "no"}]})
+
+    # La fila de /progreso lleva la hora del servidor: la pisa un borrador editado después
+    despues = int(time.time() * 1000) + 1000
+    r = cliente.post(f"/api/termometro/{FORM_ID}/borrador", headers=usuario, json={"cambios": [
+        {"question_id": PREGUNTAS[0], "response_value": "yes", "version": despues},
+        {"question_id": PREGUNTAS[1], "response_value": "yes", "version": 4},
+        {"question_id": PREGUNTAS[1], "response_value": "no", "version": 4},
+        {"question_id": PREGUNTAS[2], "response_value": "yes", "version": 9},
+        {"question_id": PREGUNTAS[2], "response_value": "no", "version": 2},
+    ]})
+    assert r.json()["aplicados"] == sorted(PREGUNTAS)
+
+    r = cliente.post(f"/api/termometro/{FORM_ID}/borrador", headers=usuario, json={"cambios": []})
+    guardado = {c["question_id"]: c["response_value"] for c in r.json()["cambios"]}
+    assert guardado == {PREGUNTAS[0]: "yes", PREGUNTAS[1]: "no", PREGUNTAS[2]: "yes"}
+
+
+def test_version_no_entera_es_400(cliente):
+    r = cliente.post(f"/api/termometro/{FORM_ID}/borrador", headers=encabezados("borrador-400"),
+                     json={"cambios": [{"question_id": PREGUNTAS[0], "response_value": "yes", "version": "7"}]})
+    assert r.status_code == 400
+
+
+def test_delta_viejo_no_pisa_un_envio_posterior(cliente):
+    usuario = encabezados("borrador-envio")
+    url = f"/api/termometro/{FORM_ID}/borrador"
+    antes = int(time.time() * 1000) - 5000
+    cliente.post(url, headers=usuario,
+                 json={"cambios": [{"question_id": PREGUNTAS[0], "response_value": "no", "version": antes}]})
+
+    r = cliente.post(f"/api/termometro/{FORM_ID}/responder", headers=usuario,
+                     json={"respuestas": [{"question_id": q, "response_value": "yes"} for q in PREGUNTAS]})
+    assert r.status_code == 200
+
+    # El mismo delta reenviado, o uno posterior pero editado antes del envío,
+    # llega tarde desde un dispositivo offline
+    for version in (antes, antes + 1):
+        r = cliente.post(url, headers=usuario,
+                         json={"cambios": [{"question_id": PREGUNTAS[0], "response_value": "no", "version": version}]})
+        cuerpo = r.json()
+        assert cuerpo["aplicados"] == []
+        guardado = {c["question_id"]: c["response_value"] for c in cuerpo["cambios"]}
+        assert guardado[PREGUNTAS[0]] == "yes"
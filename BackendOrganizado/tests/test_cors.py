@@ -0,0 +1,12 @@
+def test_preflight_sin_cors_origenes_acepta_el_frontend_con_credenciales(cliente):
+    origen = "https://frontend.ejemplo.com"
+    r = cliente.options("/api/formularios/", headers={
+        "Origin": origen,
+        "Access-Control-Request-Method": "GET",
+        "Access-Control-Request-Headers": "authorization,content-type",
+    })
+    assert r.status_code == 200
+    # Con credenciales el navegador exige el origen exacto, no "*"
+    assert r.headers["access-control-allow-origin"] == origen
+    assert r.headers["access-control-allow-credentials"] == "true"
+    assert r.headers["access-control-max-age"] == "7200"
@@ -0,0 +1,116 @@
+import asyncio
+
+from conftest import FORM_ID, PREGUNTAS
+
+from utils import escritura
+from utils.escritura import ColaEscritura
+from utils.repositorio import get_repositorio
+
+
+class RepositorioQueRechaza:
+    """guardar_evaluaciones falla si el lote incluye un form_id marcado."""
+
+    def __init__(self, rechazados=(), caido=False):
+        self.rechazados = set(rechazados)
+        self.caido = caido
+        self.guardados = []
+        self.llamadas = 0
+
+    async def guardar_evaluaciones(self, respuestas, puntajes, historial=None):
+        self.llamadas += 1
+        if self.caido:
+            raise ConnectionError("sin conexión")
+        if any(p["form_id"] in self.rechazados for p in puntajes):
+            raise ValueError("violates foreign key constraint")
+        self.guardados.extend(puntajes)
+
+
+def _carga(i: int, form_id: str = "f") -> dict:
+    return {"respuestas": [], "puntajes": [{"user_id": f"u{i}", "form_id": form_id}]}
+
+
+async def _vaciar_con(repositorio, cargas, tmp_path, monkeypatch):
+    if repositorio is not None:
+        monkeypatch.setattr(escritura, "get_repositorio", lambda: repositorio)
+    cola = ColaEscritura()
+    cola.spool = await asyncio.to_thread(escritura.Spool, str(tmp_path / "spool.sqlite"))
+    for carga in cargas:
+        cola.spool.agregar(carga)
+    await cola._vaciar()
+    return cola
+
+
+def test_una_evaluacion_invalida_no_arrastra_al_lote(tmp_path, monkeypatch):
+    cargas = [_carga(i) for i in range(20)]
+    cargas[13] = _carga(13, form_id="no-existe")
+    repositorio = RepositorioQueRechaza(rechazados={"no-existe"})
+
+    cola = asyncio.run(_vaciar_con(repositorio, cargas, tmp_path, monkeypatch))
+
+    assert len(repositorio.guardados) == 19
+    assert cola.enviadas == 19
+    assert cola.pendientes == 1
+
+
+def test_con_la_base_caida_se_deja_de_partir(tmp_path, monkeypatch):
+    repositorio = RepositorioQueRechaza(caido=True)
+
+    cola = asyncio.run(_vaciar_con(repositorio, [_carga(i) for i in range(200)], tmp_path, monkeypatch))
+
+    assert repositorio.llamadas == escritura.FALLOS_SEGUIDOS
+    assert cola.pendientes == 200 and cola.enviadas == 0
+
+
+def test_cada_envio_del_lote_queda_en_el_historial(cliente, tmp_path, monkeypatch):
+    def puntaje(porcentaje):
+        return {"user_id": "historial-lote", "form_id": FORM_ID, "total_score": porcentaje,
+                "max_possible_score": 100, "percentage": porcentaje, "readiness_level": "x",
+                "readiness_color": "#000", "can_export": False, "completion_status": "complete",
+                "completed_at": f"2026-01-01T00:00:0{porcentaje // 10}"}
+    cargas = [{"respuestas": [], "puntajes": [puntaje(p)]} for p in (10, 40, 70)]
+
+    asyncio.run(_vaciar_con(None, cargas, tmp_path, monkeypatch))
+
+    historial = asyncio.run(get_repositorio().historial("historial-lote", FORM_ID, 50))
+    assert [p["percentage"] for p in historial["puntos"]] == [10, 40, 70]
+    actual = asyncio.run(get_repositorio().puntajes("historial-lote", [FORM_ID]))
+    assert [p["percentage"] for p in actual] == [70]
+
+
+def test_un_reintento_atrasado_no_pisa_una_evaluacion_mas_nueva(cliente, tmp_path, monkeypatch):
+    def carga(porcentaje, valor, version, segundo):
+        user_id = "reintento-atrasado"
+        return {
+            "respuestas": [{"user_id": user_id, "form_id": FORM_ID, "question_id": PREGUNTAS[0],
+                            "response_value": valor, "score": 1, "version": version}],
+            "puntajes": [{"user_id": user_id, "form_id": FORM_ID, "total_score": porcentaje,
+                          "max_possible_score": 100, "percentage": porcentaje, "readiness_level": "x",
+                          "readiness_color": "#000", "can_export": False, "completion_status": "complete",
+                          "completed_at": f"2026-01-01T00:00:{segundo:02d}"}],
+        }
+    nueva, vieja = carga(80, "yes", 2000, 20), carga(30, "no", 1000, 10)
+
+    # La mitad con la evaluación nueva se escribió; la vieja vuelve del spool después
+    asyncio.run(_vaciar_con(None, [nueva], tmp_path, monkeypatch))
+    asyncio.run(_vaciar_con(None, [vieja], tmp_path, monkeypatch))
+
+    repositorio = get_repositorio()
+    actual = asyncio.run(repositorio.puntajes("reintento-atrasado", [FORM_ID]))
+    assert [p["percentage"] for p in actual] == [80]
+    respuestas = asyncio.run(repositorio.respuestas("reintento-atrasado", [FORM_ID]))
+    assert [r["response_value"] for r in respuestas] == ["yes"]
+    historial = asyncio.run(repositorio.historial("reintento-atrasado", FORM_ID, 50))
+    assert [p["percentage"] for p in historial["puntos"]] == [30, 80]
+
+
+def test_combinar_se_queda_con_lo_mas_nuevo():
+    viejo = {"user_id": "u", "form_id": "f", "completed_at": "2026-01-01T00:00:10"}
+    nuevo = {"user_id": "u", "form_id": "f", "completed_at": "2026-01-01T00:00:20"}
+    r_vieja = {"user_id": "u", "question_id": "q", "version": 1}
+    r_nueva = {"user_id": "u", "question_id": "q", "version": 2}
+    respuestas, puntajes, historial = escritura._combinar([
+        {"respuestas": [r_nueva], "puntajes": [nuevo]},
+        {"respuestas": [r_vieja], "puntajes": [viejo]},
+    ])
+    assert respuestas == [r_nueva] and puntajes == [nuevo]
+    assert historial == [nuevo, viejo]
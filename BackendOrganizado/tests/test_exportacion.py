@@ -0,0 +1,33 @@
+import asyncio
+
+from conftest import FORM_ID, PREGUNTAS
+from utils import exportacion
+
+
+class RepositorioConTope:
+    """Como PostgREST: cada consulta devuelve a lo sumo `tope` filas."""
+
+    def __init__(self, usuarios: int, tope: int):
+        self.usuarios = [f"u{i:03d}" for i in range(usuarios)]
+        self.tope = tope
+
+    async def pagina_puntajes(self, filtros, cursor, tam):
+        restantes = [u for u in self.usuarios if cursor is None or u > cursor[1]]
+        return [{"form_id": FORM_ID, "user_id": u} for u in restantes[:min(tam, self.tope)]]
+
+    async def respuestas_usuarios(self, form_id, user_ids):
+        filas = [{"user_id": u, "question_id": q, "response_value": "yes", "score": 1}
+                 for u in user_ids for q in PREGUNTAS]
+        return filas[:self.tope]
+
+
+def test_exportacion_no_pierde_respuestas_por_el_tope_del_servidor(cliente, monkeypatch):
+    repositorio = RepositorioConTope(usuarios=50, tope=10)
+    monkeypatch.setattr(exportacion, "get_repositorio", lambda: repositorio)
+    monkeypatch.setattr(exportacion, "MAX_FILAS", 10)
+
+    async def exportar():
+        return [f async for f in exportacion.filas(exportacion.Filtros(form_id=FORM_ID), tam_pagina=20)]
+    filas = asyncio.run(exportar())
+
+    assert len(filas) == 50 * len(PREGUNTAS)
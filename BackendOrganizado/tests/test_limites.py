@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from utils import limites
+from utils.almacen import AlmacenMemoria
+
+
+def _peticion(reenviada: str = None) -> Request:
+    encabezados = [(b"x-forwarded-for", reenviada.encode())] if reenviada else []
+    return Request({"type": "http", "headers": encabezados, "client": ("10.0.0.9", 1234)})
+
+
+def test_sin_proxy_se_ignora_x_forwarded_for(monkeypatch):
+    monkeypatch.setattr(limites, "CONFIAR_PROXY", 0)
+    assert limites.ip_cliente(_peticion("1.2.3.4")) == "10.0.0.9"
+
+
+def test_un_proxy_usa_la_entrada_que_agrego(monkeypatch):
+    monkeypatch.setattr(limites, "CONFIAR_PROXY", 1)
+    # "6.6.6.6" lo inventó el cliente; 203.0.113.7 lo agregó el proxy
+    assert limites.ip_cliente(_peticion("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+
+
+def test_dos_proxies(monkeypatch):
+    monkeypatch.setattr(limites, "CONFIAR_PROXY", 2)
+    assert limites.ip_cliente(_peticion("6.6.6.6, 203.0.113.7, 10.1.1.1")) == "203.0.113.7"
+    assert limites.ip_cliente(_peticion("203.0.113.7")) == "203.0.113.7"
+
+
+def test_el_email_limita_antes_que_la_ip(monkeypatch):
+    monkeypatch.setattr(limites, "LIMITES_ACTIVOS", True)
+    monkeypatch.setattr(limites, "get_almacen", lambda almacen=AlmacenMemoria(): almacen)
+    peticion = _peticion()
+
+    async def intentos():
+        # Una cohorte entera desde la misma IP (el servidor del frontend) pasa...
+        for i in range(50):
+            await limites.verificar("login", peticion, f"persona{i}@ejemplo.com")
+        # ...pero un mismo email se corta a los 5 intentos
+        for _ in range(5):
+            await limites.verificar("login", peticion, "persona0@ejemplo.com")
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(intentos())
+    assert error.value.status_code == 429
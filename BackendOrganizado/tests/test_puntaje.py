@@ -0,0 +1,165 @@
+"""Motor de puntaje y niveles. Backend/ (la API anterior) tiene su propia copia
+de puntaje.py y niveles.py; las pruebas corren contra las dos."""
+import importlib.util
+import os
+
+import pytest
+
+from utils import niveles as niveles_organizado
+from utils import puntaje as puntaje_organizado
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _cargar(nombre: str, archivo: str):
+    spec = importlib.util.spec_from_file_location(nombre, os.path.join(_RAIZ, "Backend", archivo))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.mark.parametrize("archivo", ["puntaje.py", "niveles.py"])
+def test_las_copias_de_backend_son_identicas(archivo):
+    with open(os.path.join(_RAIZ, "Backend", archivo), encoding="utf-8") as f:
+        anterior = f.read()
+    with open(os.path.join(_RAIZ, "BackendOrganizado", "utils", archivo), encoding="utf-8") as f:
+        organizado = f.read()
+    assert anterior == organizado, f"Backend/{archivo} difiere de BackendOrganizado/utils/{archivo}"
+
+
+@pytest.fixture(params=["BackendOrganizado", "Backend"])
+def puntaje(request):
+    if request.param == "BackendOrganizado":
+        return puntaje_organizado
+    return _cargar("puntaje_backend", "puntaje.py")
+
+
+@pytest.fixture(params=["BackendOrganizado", "Backend"])
+def niveles(request):
+    if request.param == "BackendOrganizado":
+        return niveles_organizado
+    return _cargar("niveles_backend", "niveles.py")
+
+
+def _preguntas(*saltos):
+    """q0 sin condición y luego una pregunta por cada skip_if dado."""
+    return [{"id": "q0"}] + [{"id": f"q{i}", "skip_if": s} for i, s in enumerate(saltos, 1)]
+
+
+def _responder(**valores):
+    return [{"question_id": qid, "response_value": v} for qid, v in valores.items()]
+
+
+def test_all_vacio_siempre_omite_y_any_vacio_nunca(puntaje):
+    motor = puntaje.ScoringEngine(_preguntas({"all": []}, {"any": []}))
+    resultado = motor.score(_responder(q0="yes", q1="yes", q2="yes"))
+    assert [d[0] for d in resultado.detalle] == ["q0", "q2"]
+    assert resultado.puntaje_maximo == 2
+
+
+def test_all_any_y_not_combinados(puntaje):
+    motor = puntaje.ScoringEngine(_preguntas(
+        {"all": [{"question_id": "q0", "equals": "no"}, {"not": {"question_id": "q0", "answered": False}}]},
+        {"any": [{"question_id": "q0", "in": ["yes", "n/a"]}, {"question_id": "q1", "answered": True}]},
+    ))
+
+    def puntuadas(**valores):
+        return [d[0] for d in motor.score(_responder(**valores)).detalle]
+
+    # q1 omitida: su respuesta ya no cuenta para la condición de q2
+    assert puntuadas(q0="no", q1="yes", q2="yes") == ["q0", "q2"]
+    assert puntuadas(q0="yes", q1="yes", q2="yes") == ["q0", "q1"]
+    assert puntuadas(q0="maybe", q1="yes", q2="yes") == ["q0", "q1"]
+    assert puntuadas(q0="maybe", q2="yes") == ["q0", "q2"]
+
+
+@pytest.mark.parametrize("condicion", [
+    {"all": [], "any": []},
+    {"all": {"question_id": "q0", "equals": "no"}},
+    {"any": None},
+    {"question_id": "q0", "mayor_que": 3},
+    {"not": "q0"},
+    ["q0"],
+])
+def test_rechaza_condiciones_no_reconocidas(puntaje, condicion):
+    with pytest.raises(ValueError):
+        puntaje.ScoringEngine(_preguntas(condicion))
+
+
+def test_rechaza_referencias_a_preguntas_posteriores(puntaje):
+    with pytest.raises(ValueError):
+        puntaje.ScoringEngine(_preguntas({"question_id": "q1", "equals": "no"}))
+
+
+def test_puntaje_con_pesos_y_puntos(puntaje):
+    motor = puntaje.ScoringEngine([
+        {"id": "a", "weight": 2, "points_for_yes": 3, "points_for_no": 1},
+        {"id": "b"},
+        {"id": "c", "weight": 0.5, "points_for_yes": 0, "points_for_no": 4},
+    ])
+    resultado = motor.score(_responder(a="YES", b="no", c="yes"))
+    assert resultado.puntaje_total == 6
+    assert resultado.puntaje_maximo == 6 + 1 + 2
+    assert resultado.porcentaje == pytest.approx(6 / 9 * 100)
+    assert resultado.detalle == (("a", "YES", 6), ("b", "no", 0), ("c", "yes", 0))
+
+
+def test_sin_respuestas_validas_el_porcentaje_es_cero(puntaje):
+    motor = puntaje.ScoringEngine([{"id": "a"}, {"id": "b"}])
+    resultado = motor.score(_responder(otra="yes"))
+    assert (resultado.puntaje_total, resultado.puntaje_maximo, resultado.porcentaje) == (0, 0, 0)
+    assert resultado.detalle == ()
+
+
+def test_respuesta_repetida_gana_la_ultima(puntaje):
+    motor = puntaje.ScoringEngine([{"id": "a"}])
+    envio = [{"question_id": "a", "response_value": "yes"}, {"question_id": "a", "response_value": "no"}]
+    assert motor.score(envio).puntaje_total == 0
+    assert [r.puntaje_total for r in motor.score_many([envio, envio[:1]])] == [0, 1]
+
+
+def test_faltantes_y_siguiente_pagina_respetan_saltos(puntaje):
+    motor = puntaje.ScoringEngine([
+        {"id": "q0", "section": "A"},
+        {"id": "q1", "section": "A", "skip_if": {"question_id": "q0", "equals": "no"}},
+        {"id": "q2", "section": "B"},
+        {"id": "q3", "section": "B"},
+    ])
+    assert motor.faltantes([]) == 4
+    assert motor.siguiente_pagina([]) == ("A", (0, 1), 4)
+    assert motor.faltantes(_responder(q0="no")) == 2
+    assert motor.siguiente_pagina(_responder(q0="no")) == ("B", (2, 3), 2)
+    assert motor.siguiente_pagina(_responder(q0="no", q2="yes", q3="yes")) == (None, (), 0)
+
+
+@pytest.mark.parametrize("porcentaje, esperado", [
+    (-5, "crítico"), (0, "crítico"), (29.999, "crítico"), (30, "bajo"), (49.99, "bajo"),
+    (50, "moderado"), (69.99, "moderado"), (70, "bueno"), (84.99, "bueno"),
+    (85, "excelente"), (100, "excelente"),
+])
+def test_bandas_incluyen_el_minimo(niveles, porcentaje, esperado):
+    clasificador = niveles.PREDETERMINADO
+    assert clasificador.clasificar(porcentaje).nivel == esperado
+    assert [n.nivel for n in clasificador.clasificar_muchos([porcentaje])] == [esperado]
+
+
+def test_exportar_solo_desde_bueno(niveles):
+    clasificador = niveles.PREDETERMINADO
+    assert not clasificador.clasificar(69.99).puede_exportar
+    assert clasificador.clasificar(70).puede_exportar
+
+
+def test_bandas_del_formulario_antes_que_las_globales(niveles):
+    def fila(minimo, nivel, form_id=None):
+        return {"min_percentage": minimo, "level": nivel, "color": "gray", "can_export": False,
+                "form_id": form_id}
+
+    filas = [fila(0, "global-bajo"), fila(60, "global-alto"),
+             fila(0, "propio-bajo", "f1"), fila(40, "propio-alto", "f1")]
+    assert niveles.Clasificador.desde_filas(filas, "f1").clasificar(50).nivel == "propio-alto"
+    assert niveles.Clasificador.desde_filas(filas, "f2").clasificar(50).nivel == "global-bajo"
+    assert niveles.Clasificador.desde_filas([], "f1") is niveles.PREDETERMINADO
+    # Por debajo de la banda menor se usa esa misma banda
+    assert niveles.Clasificador([niveles.Nivel(20, "unica", "gray", False)]).clasificar(5).nivel == "unica"
+    with pytest.raises(ValueError):
+        niveles.Clasificador([])
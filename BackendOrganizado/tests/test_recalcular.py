@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import os
+
+import pytest
+
+from conftest import FORM_ID, PREGUNTAS, encabezados
+from scripts import recalcular_puntajes
+from utils.repositorio import get_repositorio
+
+
+def _args(tmp_path, pagina: int):
+    return argparse.Namespace(pagina=pagina, max_filas=1000, lote=500, simular=False,
+                              checkpoint=os.path.join(tmp_path, "checkpoint.json"))
+
+
+def test_recalcula_solo_evaluados_y_recorre_todas_las_paginas(cliente, tmp_path):
+    completos = [f"recalculo-{i}" for i in range(7)]
+    for user_id in completos:
+        r = cliente.post(f"/api/termometro/{FORM_ID}/responder", headers=encabezados(user_id),
+                         json={"respuestas": [{"question_id": q, "response_value": "yes"} for q in PREGUNTAS]})
+        assert r.status_code == 200
+    # Solo progreso parcial: no es una evaluación y no debe recibir puntaje
+    parcial = "recalculo-parcial"
+    cliente.post(f"/api/termometro/{FORM_ID}/progreso", headers=encabezados(parcial),
+                 json={"respuestas": [{"question_id": PREGUNTAS[0], "response_value": "yes"}]})
+
+    # Páginas de 4 filas (una por usuario y algo): obliga a releer al usuario cortado
+    estado = {}
+    _, usuarios = asyncio.run(recalcular_puntajes.recalcular_formulario(FORM_ID, estado, _args(tmp_path, 4)))
+
+    assert usuarios >= len(completos)
+    assert estado[FORM_ID]["terminado"]
+
+    async def leer():
+        repositorio = get_repositorio()
+        con_puntaje = await repositorio.usuarios_con_puntaje(FORM_ID, completos + [parcial])
+        return set(con_puntaje)
+    assert asyncio.run(leer()) == set(completos)
+
+
+def test_pagina_menor_que_un_usuario_falla(tmp_path):
+    with pytest.raises(SystemExit, match="no caben"):
+        asyncio.run(recalcular_puntajes.recalcular_formulario(FORM_ID, {}, _args(tmp_path, 3)))
+
+
+def test_simular_no_deja_checkpoint_para_la_corrida_real(cliente, tmp_path, monkeypatch, capsys):
+    cliente.post(f"/api/termometro/{FORM_ID}/responder", headers=encabezados("recalculo-simulado"),
+                 json={"respuestas": [{"question_id": q, "response_value": "no"} for q in PREGUNTAS]})
+    checkpoint = os.path.join(tmp_path, "checkpoint.json")
+
+    async def no_cerrar():
+        pass
+    monkeypatch.setattr(recalcular_puntajes, "cerrar_repositorio", no_cerrar)
+
+    for extra in (["--simular"], []):
+        monkeypatch.setattr("sys.argv", ["recalcular_puntajes", "--form-id", FORM_ID,
+                                         "--checkpoint", checkpoint, *extra])
+        asyncio.run(recalcular_puntajes.main())
+        assert not os.path.exists(checkpoint)
+
+    salida = capsys.readouterr().out
+    assert "ya recalculado" not in salida
+    assert salida.count("Listo: 0 puntajes") == 0
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from conftest import FORM_ID, encabezados
+from utils import catalogo
+from utils.repositorio import IdInvalido, RepositorioSupabase, get_repositorio
+from utils.repositorio_sql import RepositorioSQL
+
+
+@pytest.mark.parametrize("form_id", [f"{FORM_ID}),form_id.not.is.null", "otro,form_id.is.null", ""])
+def test_niveles_rechaza_ids_que_no_son_uuid(form_id):
+    with pytest.raises(IdInvalido):
+        asyncio.run(RepositorioSupabase().niveles([FORM_ID, form_id]))
+
+
+def test_cursor_de_puntajes_rechaza_ids_que_no_son_uuid():
+    class Filtros:
+        form_id = desde = hasta = nivel = None
+
+    with pytest.raises(IdInvalido):
+        asyncio.run(RepositorioSupabase().pagina_puntajes(Filtros(), (FORM_ID, "x,form_id.gt.0"), 10))
+
+
+def test_motor_sql_sin_consultas_es_abstracto():
+    with pytest.raises(TypeError):
+        RepositorioSQL()
+
+
+def test_los_routers_responden_400_a_un_id_invalido(cliente, monkeypatch):
+    async def invalido(*args, **kwargs):
+        raise IdInvalido("Identificador inválido: x,y")
+
+    monkeypatch.setattr(catalogo, "clasificador", invalido)
+    monkeypatch.setattr(catalogo, "motor_puntaje", invalido)
+    monkeypatch.setattr(get_repositorio(), "historial", invalido)
+    usuario = encabezados("id-invalido")
+    for ruta in ("/api/termometro/x,y/estado", "/api/termometro/x,y/historial",
+                 "/api/formularios/x,y/preguntas/siguiente"):
+        r = cliente.get(ruta, headers=usuario)
+        assert r.status_code == 400, ruta
+        assert "Identificador inválido" in r.json()["detail"]
@@ -0,0 +1,8 @@
+from conftest import PREGUNTAS, encabezados
+
+
+def test_responder_formulario_inexistente(cliente):
+    r = cliente.post("/api/termometro/9b2f6c1e-0000-4000-8000-00000000dead/responder",
+                     headers=encabezados("sin-formulario"),
+                     json={"respuestas": [{"question_id": PREGUNTAS[0], "response_value": "yes"}]})
+    assert r.status_code == 404
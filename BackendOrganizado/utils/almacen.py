@@ -0,0 +1,183 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+from utils.cache import CacheTTL
+import os
+import threading
+import time
+
+# Estado compartido entre workers: tokens verificados y revocados, catálogo y
+# baldes del limitador. Con un solo proceso basta la memoria; con varios
+# workers (ver servidor.py) cada uno tendría su propia copia y las tasas de
+# acierto caerían, así que se apunta a un Redis (o Valkey, KeyDB...) local:
+#
+#   ALMACEN=memoria   (por defecto) dentro del proceso
+#   ALMACEN=redis     REDIS_URL, p. ej. redis://localhost:6379/0
+#
+# Los valores viajan como JSON; los objetos compilados (ScoringEngine,
+# Clasificador) se siguen armando en cada worker a partir de estos datos.
+ALMACEN = os.getenv("ALMACEN", "memoria")
+PREFIJO = os.getenv("ALMACEN_PREFIJO", "termometro:")
+
+
+class Almacen(ABC):
+    # True si otros procesos ven lo que se guarda aquí
+    compartido = False
+
+    @abstractmethod
+    async def obtener(self, clave: str) -> Optional[Any]:
+        """Valor guardado o None si no existe o venció."""
+
+    @abstractmethod
+    async def guardar(self, clave: str, valor: Any, ttl: float):
+        """Guarda un valor serializable a JSON por `ttl` segundos."""
+
+    @abstractmethod
+    async def borrar(self, clave: str):
+        pass
+
+    @abstractmethod
+    async def incrementar(self, clave: str) -> int:
+        """Contador atómico sin vencimiento; devuelve el valor nuevo."""
+
+    @abstractmethod
+    async def consumir(self, clave: str, capacidad: float, por_segundo: float) -> float:
+        """Token bucket: toma un token; devuelve 0 si lo había o los segundos
+        que faltan para el próximo."""
+
+    async def cerrar(self):
+        pass
+
+
+class AlmacenMemoria(Almacen):
+    """Todo en el proceso, acotado (se descartan las entradas más viejas)."""
+
+    def __init__(self, max_entradas: int = 100000):
+        self.max_entradas = max_entradas
+        self._valores = CacheTTL(max_entradas=max_entradas, ttl=60)
+        self._contadores = {}
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def obtener(self, clave: str) -> Optional[Any]:
+        return self._valores.get(clave)
+
+    async def guardar(self, clave: str, valor: Any, ttl: float):
+        self._valores.set(clave, valor, ttl=ttl)
+
+    async def borrar(self, clave: str):
+        self._valores.delete(clave)
+
+    async def incrementar(self, clave: str) -> int:
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + 1
+            return self._contadores[clave]
+
+    async def consumir(self, clave: str, capacidad: float, por_segundo: float) -> float:
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, ultimo = self._baldes.pop(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - ultimo) * por_segundo)
+            if tokens >= 1:
+                tokens, espera = tokens - 1, 0.0
+            else:
+                espera = (1 - tokens) / por_segundo
+            self._baldes[clave] = (tokens, ahora)
+            while len(self._baldes) > self.max_entradas:
+                self._baldes.popitem(last=False)
+        return espera
+
+    def __len__(self):
+        return len(self._baldes)
+
+
+# Mismo algoritmo que AlmacenMemoria.consumir, atómico dentro de Redis y con su
+# reloj (los workers pueden no estar sincronizados). El balde vence cuando ya
+# se habría llenado de nuevo.
+_SCRIPT_BALDE = """
+local capacidad = tonumber(ARGV[1])
+local por_segundo = tonumber(ARGV[2])
+local reloj = redis.call('TIME')
+local ahora = tonumber(reloj[1]) + tonumber(reloj[2]) / 1000000
+local balde = redis.call('HMGET', KEYS[1], 'tokens', 'ultimo')
+local tokens = tonumber(balde[1]) or capacidad
+local ultimo = tonumber(balde[2]) or ahora
+tokens = math.min(capacidad, tokens + (ahora - ultimo) * por_segundo)
+local espera = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  espera = (1 - tokens) / por_segundo
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ultimo', ahora)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / por_segundo * 1000))
+return tostring(espera)
+"""
+
+
+class AlmacenRedis(Almacen):
+    """Redis (o compatible) vía redis.asyncio, con su propio pool de conexiones."""
+
+    compartido = True
+
+    def __init__(self, url: str):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("ALMACEN=redis requiere instalar redis")
+        import orjson
+
+        self._json = orjson
+        self._redis = redis_asyncio.from_url(
+            url, max_connections=int(os.getenv("REDIS_MAX_CONEXIONES", "50")))
+        self._balde = self._redis.register_script(_SCRIPT_BALDE)
+
+    async def obtener(self, clave: str) -> Optional[Any]:
+        valor = await self._redis.get(PREFIJO + clave)
+        return None if valor is None else self._json.loads(valor)
+
+    async def guardar(self, clave: str, valor: Any, ttl: float):
+        milisegundos = int(ttl * 1000)
+        if milisegundos > 0:
+            await self._redis.set(PREFIJO + clave, self._json.dumps(valor), px=milisegundos)
+
+    async def borrar(self, clave: str):
+        await self._redis.delete(PREFIJO + clave)
+
+    async def incrementar(self, clave: str) -> int:
+        return await self._redis.incr(PREFIJO + clave)
+
+    async def consumir(self, clave: str, capacidad: float, por_segundo: float) -> float:
+        return float(await self._balde(keys=[PREFIJO + "balde:" + clave], args=[capacidad, por_segundo]))
+
+    async def cerrar(self):
+        await self._redis.aclose()
+
+
+_almacen = None
+
+
+def get_almacen() -> Almacen:
+    """Almacén compartido, creado en el primer uso según ALMACEN."""
+    global _almacen
+    if _almacen is None:
+        if ALMACEN == "memoria":
+            _almacen = AlmacenMemoria()
+        elif ALMACEN == "redis":
+            _almacen = AlmacenRedis(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        else:
+            raise RuntimeError(f"ALMACEN desconocido: {ALMACEN}")
+    return _almacen
+
+
+def configurar_almacen(nuevo: Almacen):
+    """Reemplaza el almacén (p. ej. en benchmarks)."""
+    global _almacen
+    _almacen = nuevo
+
+
+async def cerrar_almacen():
+    global _almacen
+    if _almacen is not None:
+        await _almacen.cerrar()
+    _almacen = None
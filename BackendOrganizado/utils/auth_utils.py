@@ -1,35 +1,265 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import create_client, Client
-from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from dataclasses import asdict, dataclass, field
+from utils.almacen import get_almacen
+from utils.cache import CacheTTL, ConjuntoVencible
+from utils.config import get_supabase
+from utils import metricas
+import hashlib
+import logging
+import math
+import time
+import jwt
 import os
 
-# Cargar .env
-dotenv_path = os.path.join(os.path.dirname(__file__), "..", ".env")
-load_dotenv(dotenv_path=dotenv_path)
+security = HTTPBearer()
 
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY")
+# ==============================
+# VERIFICACIÓN LOCAL DE JWT
+# ==============================
+# Con SUPABASE_JWT_SECRET (HS256) o SUPABASE_JWKS_URL (RS256/ES256) el token se
+# valida sin llamar al servidor de auth. Sin ninguno de los dos se usa el modo
+# remoto de siempre (supabase.auth.get_user), pero igual se cachea el resultado.
+JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+JWKS_URL = os.getenv("SUPABASE_JWKS_URL")
+JWT_AUDIENCIA = os.getenv("SUPABASE_JWT_AUD", "authenticated")
+AUTH_MODO = os.getenv("AUTH_MODO", "local" if (JWT_SECRET or JWKS_URL) else "remoto")
 
-if not url or not key:
-    raise RuntimeError("No se cargaron las variables de entorno de Supabase")
+_cache_tokens = CacheTTL(
+    max_entradas=int(os.getenv("AUTH_CACHE_MAX", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "300")),
+)
+_jwks_client = jwt.PyJWKClient(JWKS_URL, cache_keys=True) if JWKS_URL else None
+# Tokens cerrados con /auth/logout: un JWT sigue siendo válido por firma hasta
+# que expira, así que se rechazan aquí hasta entonces. Sin tope de tamaño: una
+# revocación descartada antes de su exp volvería a aceptar el token.
+_revocados = ConjuntoVencible()
+# Con un almacén compartido (varios workers) los tokens verificados y los
+# revocados también se guardan ahí; la copia local dura a lo sumo esto, que es
+# lo que puede tardar un logout en verse en los demás workers.
+AUTH_CACHE_LOCAL_TTL = float(os.getenv("AUTH_CACHE_LOCAL_TTL", "30"))
+# Vigencia en el almacén compartido de la revocación de un token sin exp
+REVOCACION_MAXIMA = 365 * 24 * 3600
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UsuarioToken:
+    """Usuario reconstruido a partir de los claims del JWT."""
+    id: str
+    email: str = None
+    role: str = None
+    app_metadata: dict = field(default_factory=dict)
+    user_metadata: dict = field(default_factory=dict)
+
+    @classmethod
+    def desde_claims(cls, claims: dict):
+        return cls(
+            id=claims["sub"],
+            email=claims.get("email"),
+            role=claims.get("role"),
+            app_metadata=claims.get("app_metadata") or {},
+            user_metadata=claims.get("user_metadata") or {},
+        )
+
+    @classmethod
+    def desde_usuario(cls, usuario):
+        """Desde el User de supabase (modo remoto), para guardarlo en el almacén compartido."""
+        if isinstance(usuario, cls):
+            return usuario
+        return cls(
+            id=str(usuario.id),
+            email=usuario.email,
+            role=getattr(usuario, "role", None),
+            app_metadata=getattr(usuario, "app_metadata", None) or {},
+            user_metadata=getattr(usuario, "user_metadata", None) or {},
+        )
+
+
+def _token_invalido():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token inválido"
+    )
+
+
+def _clave_cache(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _ttl_restante(claims: dict) -> float:
+    exp = claims.get("exp")
+    if exp is None:
+        return _cache_tokens.ttl
+    return min(_cache_tokens.ttl, exp - time.time())
+
+
+async def verificar_jwt_local(token: str, holgura: float = 0) -> dict:
+    """Valida firma, expiración (con `holgura` segundos de tolerancia) y
+    audiencia del token. Lanza jwt.InvalidTokenError."""
+    if JWT_SECRET:
+        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"], audience=JWT_AUDIENCIA,
+                          leeway=holgura)
+    # PyJWKClient descarga el JWKS con urllib (bloqueante) cuando no lo tiene en cache
+    clave = (await run_in_threadpool(_jwks_client.get_signing_key_from_jwt, token)).key
+    return jwt.decode(token, clave, algorithms=["RS256", "ES256"], audience=JWT_AUDIENCIA,
+                      leeway=holgura)
+
+
+async def verificar_remoto(token: str):
+    user = await get_supabase().auth.get_user(token)
+    if not user or not user.user:
+        raise _token_invalido()
+    return user.user
 
-supabase: Client = create_client(url, key)
-security = HTTPBearer()
 
 async def token_required(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    with metricas.etapa("token"):
+        return await _verificar_token(credentials.credentials)
+
+
+async def _leer_compartido(clave: str):
+    """(revocado, usuario) desde el almacén compartido; sin él o si falla, (False, None)."""
+    almacen = get_almacen()
+    if not almacen.compartido:
+        return False, None
+    try:
+        if await almacen.obtener(f"revocado:{clave}"):
+            return True, None
+        guardado = await almacen.obtener(f"token:{clave}")
+    except Exception as e:
+        log.warning("Almacén compartido no disponible para auth: %s", e)
+        return False, None
+    if not guardado or guardado["expira"] <= time.time():
+        return False, None
+    usuario = UsuarioToken(**guardado["usuario"])
+    _cache_tokens.set(clave, usuario, ttl=min(AUTH_CACHE_LOCAL_TTL, guardado["expira"] - time.time()))
+    return False, usuario
+
+
+async def _recordar(clave: str, usuario, ttl: float):
+    almacen = get_almacen()
+    if not almacen.compartido:
+        _cache_tokens.set(clave, usuario, ttl=ttl)
+        return
+    _cache_tokens.set(clave, usuario, ttl=min(ttl, AUTH_CACHE_LOCAL_TTL))
+    try:
+        await almacen.guardar(f"token:{clave}", {
+            "usuario": asdict(UsuarioToken.desde_usuario(usuario)),
+            "expira": time.time() + ttl,
+        }, ttl)
+    except Exception as e:
+        log.warning("No se pudo compartir el token verificado: %s", e)
+
+
+async def _verificar_token(token: str):
+    clave = _clave_cache(token)
+    if clave in _revocados:
+        raise _token_invalido()
+    usuario = _cache_tokens.get(clave)
+    if usuario is not None:
+        return usuario
+    revocado, usuario = await _leer_compartido(clave)
+    if revocado:
+        raise _token_invalido()
+    if usuario is not None:
+        return usuario
+
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+        if AUTH_MODO == "local":
+            try:
+                claims = await verificar_jwt_local(token)
+                usuario = UsuarioToken.desde_claims(claims)
+            except jwt.PyJWKClientError:
+                # No se pudo obtener la clave pública: se delega en el servidor de auth
+                usuario = await verificar_remoto(token)
+        else:
+            usuario = await verificar_remoto(token)
+    except Exception:
+        raise _token_invalido()
+
+    await _recordar(clave, usuario, _ttl_restante(claims))
+    return usuario
+
+
+async def verificar_para_renovar(token: str, holgura: float):
+    """Bearer presentado en /auth/refresh sin refresh_token: debe ser auténtico,
+    no estar revocado y vencer dentro de `holgura` segundos o haber vencido
+    hace a lo sumo eso. Sin verificación local solo se acepta si el servidor
+    de auth aún lo da por válido."""
+    clave = _clave_cache(token)
+    if clave in _revocados or (await _leer_compartido(clave))[0]:
+        raise _token_invalido()
+    try:
+        if AUTH_MODO == "local":
+            claims = await verificar_jwt_local(token, holgura)
+        else:
+            await verificar_remoto(token)
+            claims = jwt.decode(token, options={"verify_signature": False})
+    except Exception:
+        raise _token_invalido()
+    # Lejos de vencer no se renueva: si no, un access_token robado se podría
+    # cambiar por otro una y otra vez, como si fuera un refresh_token
+    exp = claims.get("exp")
+    if exp is None or exp - time.time() > holgura:
+        raise HTTPException(400, "El token aún no está por vencer; renueva con el refresh_token")
+
+
+async def token_required_estricto(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Para rutas sensibles a revocación: siempre consulta al servidor de auth."""
     token = credentials.credentials
+    if _clave_cache(token) in _revocados or (await _leer_compartido(_clave_cache(token)))[0]:
+        raise _token_invalido()
     try:
-        user = supabase.auth.get_user(token)
-        if not user or not user.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido"
-            )
-        return user.user
+        usuario = await verificar_remoto(token)
     except Exception:
+        _cache_tokens.delete(_clave_cache(token))
+        raise _token_invalido()
+    return usuario
+
+
+async def registrar_sesion(token: str):
+    """Token recién emitido por el servidor de auth (login o refresh): se deja
+    verificado en cache y la primera petición del usuario no repite la validación."""
+    claims = jwt.decode(token, options={"verify_signature": False})
+    await _recordar(_clave_cache(token), UsuarioToken.desde_claims(claims), _ttl_restante(claims))
+
+
+async def revocar(token: str):
+    """Rechaza el token hasta que expire, en este proceso y en el almacén compartido."""
+    clave = _clave_cache(token)
+    _cache_tokens.delete(clave)
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.InvalidTokenError:
+        return
+    # Un token sin exp no vence nunca por sí solo: se rechaza para siempre
+    vence = exp or math.inf
+    if vence <= time.time():
+        return
+    _revocados.agregar(clave, vence)
+    almacen = get_almacen()
+    if almacen.compartido:
+        try:
+            await almacen.borrar(f"token:{clave}")
+            await almacen.guardar(f"revocado:{clave}", True, min(vence - time.time(), REVOCACION_MAXIMA))
+        except Exception as e:
+            log.warning("No se pudo compartir la revocación: %s", e)
+
+
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+
+async def admin_required(usuario=Depends(token_required_estricto)):
+    """Personal del programa: rol 'admin' en app_metadata o email en ADMIN_EMAILS."""
+    app_metadata = getattr(usuario, "app_metadata", None) or {}
+    email = (getattr(usuario, "email", None) or "").lower()
+    if app_metadata.get("role") != "admin" and email not in ADMIN_EMAILS:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Se requieren permisos de administrador"
         )
-
+    return usuario
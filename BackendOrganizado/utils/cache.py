@@ -0,0 +1,84 @@
+import heapq
+import time
+import threading
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """Cache en memoria acotado (LRU) con expiración por entrada."""
+
+    def __init__(self, max_entradas: int = 1024, ttl: float = 60.0):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave, default=None):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return default
+            valor, expira = entrada
+            if expira <= time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class ConjuntoVencible:
+    """Conjunto sin tope cuyas claves se descartan solas al llegar a su
+    vencimiento (epoch). Para lo que no puede perderse antes de tiempo por
+    falta de espacio, como los tokens revocados."""
+
+    def __init__(self):
+        self._vencimientos = {}
+        self._orden = []  # heap de (vence, clave)
+        self._lock = threading.Lock()
+
+    def _purgar(self, ahora: float):
+        while self._orden and self._orden[0][0] <= ahora:
+            vence, clave = heapq.heappop(self._orden)
+            if self._vencimientos.get(clave) == vence:
+                del self._vencimientos[clave]
+
+    def agregar(self, clave, vence: float):
+        with self._lock:
+            self._purgar(time.time())
+            if vence > self._vencimientos.get(clave, 0):
+                self._vencimientos[clave] = vence
+                heapq.heappush(self._orden, (vence, clave))
+
+    def __contains__(self, clave) -> bool:
+        with self._lock:
+            vence = self._vencimientos.get(clave)
+            return vence is not None and vence > time.time()
+
+    def clear(self):
+        with self._lock:
+            self._vencimientos.clear()
+            self._orden.clear()
+
+    def __len__(self):
+        return len(self._vencimientos)
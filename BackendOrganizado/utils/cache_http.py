@@ -0,0 +1,35 @@
+from fastapi import Request
+from fastapi.routing import APIRoute
+import os
+
+# Cache-Control por router. El catálogo lleva ETag, así que el navegador puede
+# reutilizarlo un rato y después revalidar con un 304 barato; lo que depende del
+# usuario o cambia al responder no se guarda en caches compartidas.
+CATALOGO_MAX_AGE = int(os.getenv("CACHE_CATALOGO_MAX_AGE", "60"))
+
+CATALOGO = f"private, max-age={CATALOGO_MAX_AGE}, stale-while-revalidate={CATALOGO_MAX_AGE * 5}"
+POR_USUARIO = "private, no-cache"
+SIN_CACHE = "no-store"
+
+
+def politica_cache(cache_control: str, vary: str = "Authorization"):
+    """route_class para un APIRouter: las respuestas GET de sus rutas que no
+    fijaron su propio Cache-Control salen con `cache_control`; el resto de los
+    métodos, con no-store."""
+
+    class RutaConPolitica(APIRoute):
+        def get_route_handler(self):
+            original = super().get_route_handler()
+
+            async def handler(request: Request):
+                response = await original(request)
+                if "cache-control" not in response.headers:
+                    response.headers["Cache-Control"] = (
+                        cache_control if request.method in ("GET", "HEAD") else SIN_CACHE)
+                if vary:
+                    response.headers.add_vary_header(vary)
+                return response
+
+            return handler
+
+    return RutaConPolitica
@@ -0,0 +1,226 @@
+from dataclasses import asdict, dataclass
+from utils.almacen import get_almacen
+from utils.repositorio import get_repositorio
+from utils.cache import CacheTTL
+from utils.coalescer import SingleFlight
+from utils.puntaje import ScoringEngine
+from utils.niveles import Clasificador
+from utils import metricas
+import hashlib
+import json
+import logging
+import os
+import time
+
+# Formularios y preguntas casi nunca cambian: se leen una vez y se sirven desde
+# memoria hasta que vence el TTL o alguien llama a invalidar().
+CATALOGO_TTL = float(os.getenv("CATALOGO_TTL", "600"))
+
+_cache = CacheTTL(max_entradas=int(os.getenv("CATALOGO_MAX", "512")), ttl=CATALOGO_TTL)
+_version = 0
+# Con un almacén compartido la versión es un contador en él: invalidar() en un
+# worker lo sube y los demás lo notan en a lo sumo CATALOGO_VERSION_INTERVALO
+# segundos. Las filas también se guardan ahí, así que un worker recién
+# arrancado no vuelve a consultar la base de datos.
+CATALOGO_VERSION_INTERVALO = float(os.getenv("CATALOGO_VERSION_INTERVALO", "2"))
+_version_revisada = 0.0
+
+log = logging.getLogger(__name__)
+# En un fallo de cache (arranque, TTL vencido, invalidación) muchos usuarios piden
+# lo mismo a la vez; solo uno consulta Supabase y el resto espera ese resultado.
+coalescedor = SingleFlight()
+
+
+def _metricas_coalescedor() -> list:
+    return [
+        "# HELP catalogo_consultas_total Lecturas del catálogo por desenlace en el coalescedor",
+        "# TYPE catalogo_consultas_total counter",
+        f'catalogo_consultas_total{{resultado="ejecutada"}} {coalescedor.ejecutadas}',
+        f'catalogo_consultas_total{{resultado="coalescida"}} {coalescedor.coalescidas}',
+    ]
+
+
+metricas.colectores.append(_metricas_coalescedor)
+
+
+@dataclass(frozen=True)
+class Entrada:
+    datos: list
+    etag: str
+
+
+def _etag(datos) -> str:
+    contenido = json.dumps(datos, sort_keys=True, default=str).encode()
+    return '"' + hashlib.sha1(contenido).hexdigest()[:20] + '"'
+
+
+async def _sincronizar_version() -> int:
+    """Versión vigente; con almacén compartido adopta la de los demás workers."""
+    global _version, _version_revisada
+    almacen = get_almacen()
+    ahora = time.monotonic()
+    if not almacen.compartido or ahora - _version_revisada < CATALOGO_VERSION_INTERVALO:
+        return _version
+    _version_revisada = ahora
+    try:
+        compartida = int(await almacen.obtener("catalogo:version") or 0)
+    except Exception as e:
+        log.warning("Almacén compartido no disponible para el catálogo: %s", e)
+        return _version
+    if compartida != _version:
+        _version = compartida
+        _cache.clear()
+    return _version
+
+
+async def _obtener_compartido(version: int, clave: str):
+    almacen = get_almacen()
+    if not almacen.compartido:
+        return None
+    try:
+        return await almacen.obtener(f"catalogo:{version}:{clave}")
+    except Exception as e:
+        log.warning("Almacén compartido no disponible para el catálogo: %s", e)
+        return None
+
+
+async def _guardar_compartido(version: int, clave: str, datos):
+    almacen = get_almacen()
+    if not almacen.compartido:
+        return
+    try:
+        await almacen.guardar(f"catalogo:{version}:{clave}", datos, CATALOGO_TTL)
+    except Exception as e:
+        log.warning("No se pudo compartir %s del catálogo: %s", clave, e)
+
+
+async def _compartido(version: int, clave: str, cargar):
+    """Datos del almacén compartido o, si no están, de `cargar()` (y se guardan)."""
+    datos = await _obtener_compartido(version, clave)
+    if datos is None:
+        datos = await cargar()
+        await _guardar_compartido(version, clave, datos)
+    return datos
+
+
+async def _leer(clave: str, cargar) -> Entrada:
+    # La versión va en la clave: una carga que empezó antes de invalidar()
+    # guarda su resultado bajo una versión que ya nadie consulta.
+    version = await _sincronizar_version()
+    entrada = _cache.get((version, clave))
+    if entrada is None:
+        async def cargar_entrada():
+            async def cargar_con_etag():
+                datos = await cargar()
+                return asdict(Entrada(datos, _etag(datos)))
+            entrada = Entrada(**await _compartido(version, clave, cargar_con_etag))
+            _cache.set((version, clave), entrada)
+            return entrada
+        entrada = await coalescedor.hacer((version, clave), cargar_entrada)
+    return entrada
+
+
+async def formularios_activos() -> Entrada:
+    async def cargar():
+        return await get_repositorio().formularios()
+    return await _leer("forms", cargar)
+
+
+async def preguntas_formulario(form_id: str) -> Entrada:
+    async def cargar():
+        return await get_repositorio().preguntas([form_id])
+    return await _leer(f"questions:{form_id}", cargar)
+
+
+async def motor_puntaje(form_id: str) -> ScoringEngine:
+    """ScoringEngine del formulario, compilado una vez por versión del catálogo."""
+    clave = (await _sincronizar_version(), f"motor:{form_id}")
+    motor = _cache.get(clave)
+    if motor is None:
+        entrada = await preguntas_formulario(form_id)
+        motor = ScoringEngine(entrada.datos)
+        _cache.set(clave, motor)
+    return motor
+
+
+async def motores_puntaje(form_ids: list) -> dict:
+    """Motores de varios formularios; los que no están en cache se cargan con
+    una sola consulta (in_) en lugar de una por formulario."""
+    version = await _sincronizar_version()
+    motores = {}
+    faltantes = []
+    for form_id in form_ids:
+        motor = _cache.get((version, f"motor:{form_id}"))
+        if motor is None:
+            faltantes.append(form_id)
+        else:
+            motores[form_id] = motor
+    if faltantes:
+        entradas = {}
+        for form_id in faltantes:
+            entrada = _cache.get((version, f"questions:{form_id}"))
+            if entrada is None:
+                guardada = await _obtener_compartido(version, f"questions:{form_id}")
+                entrada = Entrada(**guardada) if guardada else None
+            if entrada is not None:
+                entradas[form_id] = entrada
+        pendientes = [form_id for form_id in faltantes if form_id not in entradas]
+        if pendientes:
+            por_formulario = {form_id: [] for form_id in pendientes}
+            for pregunta in await get_repositorio().preguntas(pendientes):
+                por_formulario[pregunta["form_id"]].append(pregunta)
+            for form_id, preguntas in por_formulario.items():
+                entradas[form_id] = Entrada(preguntas, _etag(preguntas))
+                await _guardar_compartido(version, f"questions:{form_id}", asdict(entradas[form_id]))
+        for form_id, entrada in entradas.items():
+            motores[form_id] = ScoringEngine(entrada.datos)
+            _cache.set((version, f"questions:{form_id}"), entrada)
+            _cache.set((version, f"motor:{form_id}"), motores[form_id])
+    return motores
+
+
+async def clasificadores(form_ids: list) -> dict:
+    """Bandas del termómetro por formulario (ver utils/niveles.py); las que no
+    están en cache se leen con una sola consulta."""
+    version = await _sincronizar_version()
+    resultado = {}
+    faltantes = []
+    for form_id in form_ids:
+        clasificador = _cache.get((version, f"niveles:{form_id}"))
+        if clasificador is None:
+            faltantes.append(form_id)
+        else:
+            resultado[form_id] = clasificador
+    if faltantes:
+        async def cargar():
+            return await get_repositorio().niveles(faltantes)
+        # Las filas se comparten por conjunto pedido; casi siempre es un solo formulario
+        filas = await _compartido(version, "niveles:" + ",".join(sorted(faltantes)), cargar)
+        for form_id in faltantes:
+            resultado[form_id] = Clasificador.desde_filas(filas, form_id)
+            _cache.set((version, f"niveles:{form_id}"), resultado[form_id])
+    return resultado
+
+
+async def clasificador(form_id: str) -> Clasificador:
+    return (await clasificadores([form_id]))[form_id]
+
+
+async def invalidar():
+    """Descarta todo el catálogo, en todos los workers si el almacén es
+    compartido; la siguiente lectura va a la base de datos."""
+    global _version
+    almacen = get_almacen()
+    if almacen.compartido:
+        _version = await almacen.incrementar("catalogo:version")
+    else:
+        _version += 1
+    _cache.clear()
+    return _version
+
+
+def etag_coincide(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos
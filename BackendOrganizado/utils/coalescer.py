@@ -0,0 +1,37 @@
+import asyncio
+
+
+class SingleFlight:
+    """Une lecturas idénticas concurrentes: mientras una consulta con la misma
+    clave está en vuelo, las demás esperan su resultado en lugar de repetirla."""
+
+    def __init__(self):
+        self._en_vuelo = {}
+        self.ejecutadas = 0
+        self.coalescidas = 0
+
+    async def hacer(self, clave, funcion):
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            # La consulta corre en su propia tarea: si el request que la inició
+            # se cancela, los que esperan el mismo resultado no se ven afectados.
+            tarea = asyncio.ensure_future(funcion())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._terminar(clave, t))
+            self.ejecutadas += 1
+        else:
+            self.coalescidas += 1
+        return await asyncio.shield(tarea)
+
+    def _terminar(self, clave, tarea):
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        if not tarea.cancelled():
+            tarea.exception()  # evita el aviso "exception was never retrieved"
+
+    def estadisticas(self) -> dict:
+        return {
+            "ejecutadas": self.ejecutadas,
+            "coalescidas": self.coalescidas,
+            "en_vuelo": len(self._en_vuelo),
+        }
@@ -0,0 +1,84 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import os
+
+try:
+    import brotli
+except ImportError:  # sin el paquete Brotli se ofrece solo gzip
+    brotli = None
+
+# Respuestas por debajo de este tamaño salen sin comprimir: el ahorro no
+# compensa la CPU y los encabezados extra.
+COMPRESION_MINIMO = int(os.getenv("COMPRESION_MINIMO", "800"))
+# Niveles pensados para contenido dinámico (rápidos, casi la misma tasa que el máximo)
+NIVEL_GZIP = int(os.getenv("COMPRESION_NIVEL_GZIP", "6"))
+NIVEL_BROTLI = int(os.getenv("COMPRESION_NIVEL_BROTLI", "4"))
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, calidad: int):
+        super().__init__(app, minimum_size)
+        self.compresor = brotli.Compressor(quality=calidad)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        # flush por trozo: un CSV en streaming sigue llegando de a poco
+        salida = self.compresor.process(body)
+        return salida + (self.compresor.flush() if more_body else self.compresor.finish())
+
+
+def _codificacion(aceptadas: str) -> str:
+    """br si el cliente lo acepta y está instalado; si no gzip; si no nada."""
+    valores = {}
+    for parte in aceptadas.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                q = float(parametros.strip()[2:])
+            except ValueError:
+                q = 0.0
+        valores[nombre.strip()] = q
+    if brotli is not None and valores.get("br", 0) > 0:
+        return "br"
+    if valores.get("gzip", 0) > 0:
+        return "gzip"
+    return ""
+
+
+class CompresionMiddleware:
+    """gzip/brotli según Accept-Encoding, con umbral de tamaño.
+
+    Igual que GZipMiddleware de Starlette (agrega Vary: Accept-Encoding y no
+    toca text/event-stream), más brotli y ETag débil en lo comprimido: los
+    bytes ya no son los de la representación original.
+    """
+
+    def __init__(self, app: ASGIApp, minimo: int = COMPRESION_MINIMO):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = _codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion == "br":
+            responder = BrotliResponder(self.app, self.minimo, NIVEL_BROTLI)
+        elif codificacion == "gzip":
+            responder = GZipResponder(self.app, self.minimo, compresslevel=NIVEL_GZIP)
+        else:
+            responder = IdentityResponder(self.app, self.minimo)
+
+        async def enviar(message: Message):
+            if message["type"] == "http.response.start" and codificacion:
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/") and headers.get("content-encoding") == codificacion:
+                    headers["ETag"] = "W/" + etag
+            await send(message)
+
+        await responder(scope, receive, enviar)
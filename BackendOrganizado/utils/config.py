@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+import os
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+# Único lugar donde se lee el .env; el resto de módulos usa os.getenv o get_ajustes()
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+
+
+@dataclass(frozen=True)
+class Ajustes:
+    supabase_url: Optional[str]
+    supabase_key: Optional[str]
+    max_conexiones: int = 100
+    timeout: float = 30
+    http2: bool = True
+
+    @classmethod
+    def desde_entorno(cls):
+        return cls(
+            supabase_url=os.getenv("SUPABASE_URL"),
+            supabase_key=os.getenv("SUPABASE_KEY"),
+            max_conexiones=int(os.getenv("SUPABASE_MAX_CONEXIONES", "100")),
+            timeout=float(os.getenv("SUPABASE_TIMEOUT", "30")),
+            http2=os.getenv("SUPABASE_HTTP2", "1") != "0",
+        )
+
+
+@lru_cache(maxsize=1)
+def get_ajustes() -> Ajustes:
+    return Ajustes.desde_entorno()
+
+
+_cliente = None
+_http = None
+
+
+def get_supabase() -> "AsyncClient":
+    """Cliente de Supabase compartido por todos los routers, creado en el primer uso.
+
+    El SDK de supabase y httpx se importan aquí y no al arrancar: el proceso
+    queda escuchando antes y la falta de credenciales solo falla en la primera
+    llamada real, no al importar la app.
+    """
+    global _cliente, _http
+    if _cliente is not None:
+        return _cliente
+
+    ajustes = get_ajustes()
+    if not ajustes.supabase_url or not ajustes.supabase_key:
+        raise RuntimeError("No se cargaron las variables de entorno de Supabase")
+
+    import httpx
+    from supabase import AsyncClient, AsyncClientOptions
+    from utils import metricas
+
+    # PostgREST y auth comparten un único pool httpx cuyo tamaño acota las
+    # peticiones en vuelo hacia Supabase y mantiene vivas las conexiones.
+    _http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=ajustes.max_conexiones,
+                            max_keepalive_connections=ajustes.max_conexiones),
+        timeout=ajustes.timeout,
+        follow_redirects=True,
+        http2=ajustes.http2,
+        event_hooks=metricas.hooks_httpx,
+    )
+    _cliente = AsyncClient(ajustes.supabase_url, ajustes.supabase_key, options=AsyncClientOptions(
+        httpx_client=_http, auto_refresh_token=False))
+    return _cliente
+
+
+def cliente_auth():
+    """Cliente de auth desechable para una sola petición (login, registro, refresh).
+
+    sign_in y refresh guardan la sesión en el cliente que los ejecuta; en el
+    cliente compartido eso cambiaría el token con el que PostgREST atiende a
+    todos los usuarios. Este objeto es barato: reutiliza el pool de httpx.
+    """
+    from supabase_auth import AsyncGoTrueClient
+
+    get_supabase()
+    ajustes = get_ajustes()
+    return AsyncGoTrueClient(
+        url=f"{ajustes.supabase_url.rstrip('/')}/auth/v1",
+        headers={"apiKey": ajustes.supabase_key, "Authorization": f"Bearer {ajustes.supabase_key}"},
+        http_client=_http,
+        auto_refresh_token=False,
+        persist_session=False,
+    )
+
+
+async def cerrar_supabase():
+    """Cierra el pool de conexiones (al apagar la app)."""
+    global _cliente, _http
+    if _http is not None:
+        await _http.aclose()
+    _cliente = _http = None
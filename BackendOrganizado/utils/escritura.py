@@ -0,0 +1,266 @@
+from utils.repositorio import get_repositorio
+from utils import metricas
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Escritura diferida (write-behind) de las evaluaciones. Con ESCRITURA_DIFERIDA=1
+# /responder devuelve el termómetro apenas lo calcula y las filas quedan en un
+# spool SQLite local; una tarea de fondo las envía por lotes a la base de datos
+# (guardar_evaluaciones del repositorio) y solo las borra del spool cuando se
+# confirmaron.
+# Si el proceso se reinicia, lo pendiente se envía al arrancar de nuevo.
+#
+# Un lote partido tras un fallo puede escribir una evaluación vieja después de
+# otra más nueva del mismo usuario, y /progreso escribe sin pasar por la cola:
+# los upserts solo pisan respuestas de version menor y puntajes de completed_at
+# anterior (sql/012_escrituras_ordenadas.sql), así que el orden no importa.
+#
+# Mientras un lote está en cola, /estado y /mis-resultados todavía muestran el
+# valor anterior (normalmente durante menos de ESCRITURA_INTERVALO segundos).
+ESCRITURA_DIFERIDA = os.getenv("ESCRITURA_DIFERIDA", "0") == "1"
+SPOOL = os.getenv("ESCRITURA_SPOOL", os.path.join(os.path.dirname(__file__), "..", "spool_escrituras.sqlite"))
+MAX_PENDIENTES = int(os.getenv("ESCRITURA_MAX_PENDIENTES", "10000"))
+TAM_LOTE = int(os.getenv("ESCRITURA_LOTE", "200"))
+INTERVALO = float(os.getenv("ESCRITURA_INTERVALO", "0.5"))
+MAX_INTENTOS = int(os.getenv("ESCRITURA_MAX_INTENTOS", "8"))
+# Un lote tomado por un proceso que murió vuelve a estar disponible tras este plazo
+PLAZO_TOMA = 120
+# Un lote que falla se parte en mitades hasta aislar las evaluaciones que no
+# entran (p. ej. una violación de FK); el resto se escribe. Tantos fallos
+# seguidos sin ningún éxito se toman como caída de la base de datos y se deja
+# de partir hasta la próxima pasada.
+FALLOS_SEGUIDOS = int(os.getenv("ESCRITURA_FALLOS_SEGUIDOS", "8"))
+
+log = logging.getLogger(__name__)
+
+
+class Spool:
+    """Cola durable en SQLite; varios workers pueden compartir el archivo."""
+
+    def __init__(self, ruta: str):
+        self._db = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("pragma journal_mode=wal")
+            self._db.execute("pragma synchronous=normal")
+            self._db.execute("""create table if not exists pendientes (
+                id integer primary key autoincrement,
+                carga text not null,
+                intentos integer not null default 0,
+                tomado_hasta real not null default 0)""")
+            self._db.execute("""create table if not exists fallidas (
+                id integer primary key, carga text not null, error text, fallida_en real)""")
+
+    def agregar(self, carga: dict):
+        with self._lock:
+            self._db.execute("insert into pendientes (carga) values (?)", (json.dumps(carga),))
+
+    def tomar(self, limite: int) -> list:
+        """Reserva hasta `limite` filas por PLAZO_TOMA segundos y las devuelve en orden."""
+        ahora = time.time()
+        with self._lock:
+            self._db.execute("begin immediate")
+            try:
+                filas = self._db.execute(
+                    "select id, carga, intentos from pendientes where tomado_hasta < ? order by id limit ?",
+                    (ahora, limite)).fetchall()
+                self._db.executemany("update pendientes set tomado_hasta = ? where id = ?",
+                                     [(ahora + PLAZO_TOMA, f[0]) for f in filas])
+                self._db.execute("commit")
+            except Exception:
+                self._db.execute("rollback")
+                raise
+        return [(id_, json.loads(carga), intentos) for id_, carga, intentos in filas]
+
+    def confirmar(self, ids: list):
+        with self._lock:
+            self._db.executemany("delete from pendientes where id = ?", [(i,) for i in ids])
+
+    def reintentar(self, filas: list, error: str, espera: float):
+        """Libera el lote para otro intento; lo que agotó los intentos pasa a 'fallidas'."""
+        ahora = time.time()
+        with self._lock:
+            self._db.execute("begin immediate")
+            for id_, carga, intentos in filas:
+                if intentos + 1 >= MAX_INTENTOS:
+                    self._db.execute("insert or replace into fallidas values (?, ?, ?, ?)",
+                                     (id_, json.dumps(carga), error, ahora))
+                    self._db.execute("delete from pendientes where id = ?", (id_,))
+                else:
+                    self._db.execute("update pendientes set intentos = ?, tomado_hasta = ? where id = ?",
+                                     (intentos + 1, ahora + espera, id_))
+            self._db.execute("commit")
+
+    def contar(self) -> tuple:
+        with self._lock:
+            pendientes = self._db.execute("select count(*) from pendientes").fetchone()[0]
+            fallidas = self._db.execute("select count(*) from fallidas").fetchone()[0]
+        return pendientes, fallidas
+
+
+def _combinar(cargas: list) -> tuple:
+    """Une varias evaluaciones en una llamada; ante duplicados gana la más reciente
+    por version o completed_at (un mismo upsert no puede tocar dos veces la misma
+    fila). El historial conserva todos los envíos."""
+    respuestas, puntajes, historial = {}, {}, []
+    for carga in cargas:
+        for r in carga["respuestas"]:
+            clave = (r["user_id"], r["question_id"])
+            if clave not in respuestas or (r.get("version") or 0) >= (respuestas[clave].get("version") or 0):
+                respuestas[clave] = r
+        for p in carga["puntajes"]:
+            clave = (p["user_id"], p["form_id"])
+            if clave not in puntajes or (p.get("completed_at") or "") >= (puntajes[clave].get("completed_at") or ""):
+                puntajes[clave] = p
+            historial.append(p)
+    return list(respuestas.values()), list(puntajes.values()), historial
+
+
+class ColaEscritura:
+    def __init__(self):
+        self.spool = None
+        self.pendientes = 0
+        self.fallidas = 0
+        self.enviadas = 0
+        self.ultimo_error = None
+        self._tarea = None
+        self._aviso = None
+
+    @property
+    def activa(self) -> bool:
+        return self._tarea is not None
+
+    async def iniciar(self, ruta: str = SPOOL):
+        # El spool es SQLite síncrono: sus llamadas van a un hilo, no al event loop
+        self.spool = await asyncio.to_thread(Spool, ruta)
+        self.pendientes, self.fallidas = await asyncio.to_thread(self.spool.contar)
+        self._aviso = asyncio.Event()
+        self._tarea = asyncio.create_task(self._trabajar())
+
+    async def detener(self, espera: float = 5):
+        """Intenta vaciar la cola antes de apagar; lo que quede sigue en el spool."""
+        if self._tarea is None:
+            return
+        limite = time.monotonic() + espera
+        while self.pendientes and time.monotonic() < limite and not self.ultimo_error:
+            self._aviso.set()
+            await asyncio.sleep(0.05)
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+
+    async def encolar(self, respuestas: list, puntajes: list) -> bool:
+        """Deja la evaluación en el spool. Devuelve False si la cola está llena
+        (el llamador debe escribir de forma síncrona)."""
+        if not self.activa or self.pendientes >= MAX_PENDIENTES:
+            return False
+        await asyncio.to_thread(self.spool.agregar, {"respuestas": respuestas, "puntajes": puntajes})
+        self.pendientes += 1
+        if self.pendientes >= TAM_LOTE:
+            self._aviso.set()
+        return True
+
+    async def _trabajar(self):
+        espera = INTERVALO
+        while True:
+            try:
+                await asyncio.wait_for(self._aviso.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+            self._aviso.clear()
+            try:
+                espera = await self._vaciar()
+            except Exception as e:
+                # Un fallo del propio spool no debe matar la tarea
+                espera = INTERVALO
+                self.ultimo_error = str(e)
+                log.exception("Error en la cola de escritura")
+
+    async def _escribir(self, filas: list) -> bool:
+        try:
+            await get_repositorio().guardar_evaluaciones(*_combinar([f[1] for f in filas]))
+        except Exception as e:
+            self.ultimo_error = str(e)
+            return False
+        await asyncio.to_thread(self.spool.confirmar, [f[0] for f in filas])
+        self.enviadas += len(filas)
+        self.ultimo_error = None
+        return True
+
+    async def _devolver(self, filas: list) -> float:
+        """Devuelve las filas al spool con backoff exponencial según sus intentos."""
+        espera = min(60, INTERVALO * 2 ** max(f[2] for f in filas))
+        await asyncio.to_thread(self.spool.reintentar, filas, self.ultimo_error, espera)
+        return espera
+
+    async def _enviar(self, filas: list) -> Optional[float]:
+        """Escribe el lote; si falla lo parte en mitades y devuelve al spool solo
+        las evaluaciones que fallan solas. Devuelve la espera antes de la próxima
+        pasada si la base de datos parece caída, o None."""
+        partes, fallos = [filas], 0
+        while partes:
+            parte = partes.pop(0)
+            if await self._escribir(parte):
+                fallos = 0
+                continue
+            fallos += 1
+            if fallos >= FALLOS_SEGUIDOS:
+                log.warning("La base de datos rechaza todo (%s); se reintenta en la próxima pasada",
+                            self.ultimo_error)
+                return await self._devolver([f for p in [parte, *partes] for f in p])
+            if len(parte) > 1:
+                mitad = len(parte) // 2
+                partes[:0] = [parte[:mitad], parte[mitad:]]
+            else:
+                log.warning("Evaluación %s del spool rechazada: %s", parte[0][0], self.ultimo_error)
+                await self._devolver(parte)
+        return None
+
+    async def _vaciar(self) -> float:
+        """Envía lotes hasta agotar la cola; devuelve cuánto esperar antes de la próxima pasada."""
+        espera = INTERVALO
+        while True:
+            filas = await asyncio.to_thread(self.spool.tomar, TAM_LOTE)
+            if not filas:
+                break
+            reintento = await self._enviar(filas)
+            if reintento is not None:
+                espera = reintento
+                break
+        self.pendientes, self.fallidas = await asyncio.to_thread(self.spool.contar)
+        return espera
+
+    def estado(self) -> dict:
+        return {
+            "activa": self.activa,
+            "pendientes": self.pendientes,
+            "fallidas": self.fallidas,
+            "enviadas": self.enviadas,
+            "ultimo_error": self.ultimo_error,
+        }
+
+    def metricas(self) -> list:
+        return [
+            "# HELP escritura_pendientes Evaluaciones en el spool esperando ser escritas",
+            "# TYPE escritura_pendientes gauge",
+            f"escritura_pendientes {self.pendientes}",
+            "# HELP escritura_fallidas Evaluaciones que agotaron los reintentos",
+            "# TYPE escritura_fallidas gauge",
+            f"escritura_fallidas {self.fallidas}",
+            "# HELP escritura_enviadas_total Evaluaciones escritas desde la cola",
+            "# TYPE escritura_enviadas_total counter",
+            f"escritura_enviadas_total {self.enviadas}",
+        ]
+
+
+cola = ColaEscritura()
+metricas.colectores.append(cola.metricas)
@@ -0,0 +1,162 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Union
+
+# Modelos de respuesta: definen exactamente qué campos salen de la API. Con un
+# response_model FastAPI serializa con pydantic-core (en Rust) en lugar de
+# jsonable_encoder, y lo que no está aquí no viaja al cliente.
+
+# int | float: los puntajes enteros se siguen enviando como 3 y no como 3.0
+Numero = Union[int, float]
+
+
+class Usuario(BaseModel):
+    id: str
+    email: Optional[str] = None
+    created_at: Optional[str] = None
+
+    @classmethod
+    def desde_supabase(cls, user):
+        creado = getattr(user, "created_at", None)
+        return cls(id=str(user.id), email=user.email,
+                   created_at=creado.isoformat() if hasattr(creado, "isoformat") else creado)
+
+
+class RespuestaRegistro(BaseModel):
+    exito: bool
+    usuario: Usuario
+    # Solo si el proyecto no pide confirmar el correo (la sesión queda abierta)
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    expires_at: Optional[int] = None
+
+
+class RespuestaLogin(BaseModel):
+    exito: bool
+    access_token: str
+    refresh_token: str
+    # Epoch en segundos: el cliente llama a /auth/refresh antes de esa hora
+    expires_at: Optional[int] = None
+    usuario: Usuario
+
+
+class Formulario(BaseModel):
+    id: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+
+
+class RespuestaFormularios(BaseModel):
+    exito: bool
+    formularios: List[Formulario]
+    siguiente: Optional[str] = None
+
+
+class Pregunta(BaseModel):
+    id: str
+    question_text: Optional[str] = None
+    question_type: Optional[str] = None
+    options: Optional[Any] = None
+    order_index: Optional[int] = None
+    section: Optional[str] = None
+    skip_if: Optional[Any] = None
+
+
+class RespuestaPreguntas(BaseModel):
+    exito: bool
+    preguntas: List[Pregunta]
+    siguiente: Optional[str] = None
+
+
+class RespuestaPagina(BaseModel):
+    exito: bool
+    seccion: Optional[str] = None
+    preguntas: List[Pregunta]
+    faltantes: int
+    completo: bool
+
+
+class Termometro(BaseModel):
+    porcentaje: Numero
+    nivel: str
+    color: str
+    puede_exportar: bool
+    puntaje_total: Optional[Numero] = None
+    puntaje_maximo: Optional[Numero] = None
+    mensaje: Optional[str] = None
+    descripcion: Optional[str] = None
+    completado_en: Optional[str] = None
+
+
+class RespuestaTermometro(BaseModel):
+    exito: bool
+    termometro: Termometro
+
+
+class RespuestaTermometros(BaseModel):
+    exito: bool
+    termometros: Dict[str, Termometro]
+
+
+class CambioBorrador(BaseModel):
+    question_id: str
+    response_value: Optional[str] = None
+    version: Optional[int] = None
+    updated_at: Optional[str] = None
+
+
+class RespuestaBorrador(BaseModel):
+    exito: bool
+    aplicados: List[str]
+    # Lo que cambió en el servidor desde el cursor enviado (otro dispositivo o
+    # una versión más nueva que la del cliente)
+    cambios: List[CambioBorrador]
+    cursor: Optional[str] = None
+
+
+class RespuestaProgreso(BaseModel):
+    exito: bool
+    guardadas: int
+    total_preguntas: int
+
+
+class FormularioResumen(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+
+
+class Resultado(BaseModel):
+    form_id: str
+    total_score: Numero
+    max_possible_score: Numero
+    percentage: Numero
+    readiness_level: str
+    readiness_color: Optional[str] = None
+    can_export: bool
+    completion_status: Optional[str] = None
+    completed_at: Optional[str] = None
+    forms: Optional[FormularioResumen] = None
+
+
+class RespuestaResultados(BaseModel):
+    exito: bool
+    resultados: List[Resultado]
+    siguiente: Optional[str] = None
+
+
+class PuntoHistorial(BaseModel):
+    completed_at: str
+    percentage: Numero
+    total_score: Optional[Numero] = None
+    max_possible_score: Optional[Numero] = None
+    readiness_level: Optional[str] = None
+    can_export: Optional[bool] = None
+    # Envíos que resume el punto (1 si la serie no se redujo)
+    envios: int = 1
+
+
+class RespuestaHistorial(BaseModel):
+    exito: bool
+    form_id: str
+    # Envíos en el rango, antes de reducir la serie
+    total: int
+    puntos: List[PuntoHistorial]
@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import groupby
+from typing import Optional
+from utils.repositorio import MAX_FILAS, get_repositorio
+from utils import catalogo
+import csv
+import io
+import json
+
+COLUMNAS = (
+    "user_id", "form_id", "question_id", "question_text", "order_index",
+    "response_value", "score", "total_score", "max_possible_score",
+    "percentage", "readiness_level", "can_export", "completed_at",
+)
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+@dataclass(frozen=True)
+class Filtros:
+    form_id: Optional[str] = None
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+    nivel: Optional[str] = None
+
+
+async def filas(filtros: Filtros, tam_pagina: int = 200):
+    """Genera las filas exportadas (una por respuesta) página a página; en
+    memoria solo vive la página actual."""
+    # Una página más grande que el max-rows de PostgREST volvería recortada y
+    # parecería la última: la exportación terminaría sin error
+    tam_pagina = min(tam_pagina, MAX_FILAS)
+    cursor = None
+    while True:
+        puntajes = await get_repositorio().pagina_puntajes(filtros, cursor, tam_pagina)
+        if not puntajes:
+            return
+        for form_id, grupo in groupby(puntajes, key=lambda p: p["form_id"]):
+            grupo = list(grupo)
+            preguntas = {p["id"]: p for p in (await catalogo.preguntas_formulario(form_id)).datos}
+            # Cada usuario tiene a lo sumo una respuesta por pregunta: se piden
+            # tantos usuarios por consulta como quepan en MAX_FILAS filas
+            por_consulta = max(1, MAX_FILAS // max(1, len(preguntas)))
+            user_ids = [p["user_id"] for p in grupo]
+            por_usuario = {}
+            for i in range(0, len(user_ids), por_consulta):
+                for r in await get_repositorio().respuestas_usuarios(form_id, user_ids[i:i + por_consulta]):
+                    por_usuario.setdefault(r["user_id"], []).append(r)
+            for puntaje in grupo:
+                for r in por_usuario.get(puntaje["user_id"], []):
+                    pregunta = preguntas.get(r["question_id"], {})
+                    yield {
+                        **puntaje,
+                        "question_id": r["question_id"],
+                        "question_text": pregunta.get("question_text"),
+                        "order_index": pregunta.get("order_index"),
+                        "response_value": r["response_value"],
+                        "score": r["score"],
+                    }
+        if len(puntajes) < tam_pagina:
+            return
+        cursor = (puntajes[-1]["form_id"], puntajes[-1]["user_id"])
+
+
+async def _en_lotes(generador, tam: int):
+    lote = []
+    async for fila in generador:
+        lote.append(fila)
+        if len(lote) >= tam:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+async def a_csv(generador, tam_lote: int = 1000):
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUMNAS, extrasaction="ignore")
+    escritor.writeheader()
+    async for lote in _en_lotes(generador, tam_lote):
+        escritor.writerows(lote)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+async def a_ndjson(generador, tam_lote: int = 1000):
+    async for lote in _en_lotes(generador, tam_lote):
+        yield "".join(json.dumps({c: f.get(c) for c in COLUMNAS}, default=str) + "\n"
+                      for f in lote).encode()
+
+
+class _Sumidero(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que se vacía."""
+
+    def __init__(self):
+        self.partes = []
+        self.posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def vaciar(self) -> bytes:
+        datos, self.partes = b"".join(self.partes), []
+        return datos
+
+
+def parquet_disponible() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def a_parquet(generador, tam_lote: int = 10000):
+    """Un row group por lote; cada uno se envía apenas se escribe."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([
+        ("user_id", pa.string()), ("form_id", pa.string()), ("question_id", pa.string()),
+        ("question_text", pa.string()), ("order_index", pa.int64()),
+        ("response_value", pa.string()), ("score", pa.float64()),
+        ("total_score", pa.float64()), ("max_possible_score", pa.float64()),
+        ("percentage", pa.float64()), ("readiness_level", pa.string()),
+        ("can_export", pa.bool_()), ("completed_at", pa.string()),
+    ])
+    sumidero = _Sumidero()
+    escritor = pq.ParquetWriter(sumidero, esquema)
+    async for lote in _en_lotes(generador, tam_lote):
+        escritor.write_table(pa.Table.from_pylist(lote, schema=esquema))
+        yield sumidero.vaciar()
+    escritor.close()
+    yield sumidero.vaciar()
+
+
+SERIALIZADORES = {"csv": a_csv, "ndjson": a_ndjson, "parquet": a_parquet}
+
+
+def exportar(filtros: Filtros, formato: str, tam_pagina: int = 200):
+    return SERIALIZADORES[formato](filas(filtros, tam_pagina))
@@ -0,0 +1,106 @@
+from fastapi import HTTPException, Request, status
+from utils import metricas
+from utils.almacen import get_almacen
+import logging
+import math
+import os
+
+# Token bucket por clave (IP, email): cada intento consume un token y los
+# tokens se reponen a ritmo constante hasta la capacidad. Un intento sin token
+# se corta aquí con 429 y nunca llega al servidor de auth de Supabase. Los
+# baldes viven en el almacén compartido (utils/almacen.py): con varios workers
+# el límite es del servicio y no de cada proceso.
+LIMITES_ACTIVOS = os.getenv("LIMITES_ACTIVOS", "1") != "0"
+
+log = logging.getLogger(__name__)
+# Detrás de proxies (Railway, Nginx) la IP real viene en X-Forwarded-For.
+# CONFIAR_PROXY es cuántos proxies de confianza hay delante (0 = ninguno): cada
+# uno agrega a la derecha la IP de quien le habló, así que la del cliente es la
+# N-ésima desde la derecha. Las de más a la izquierda las escribe el cliente y
+# no sirven para limitar. En Railway (RAILWAY_ENVIRONMENT definido) hay un
+# proxy delante de la API; fuera de él, por defecto ninguno.
+CONFIAR_PROXY = int(os.getenv("CONFIAR_PROXY", "1" if os.getenv("RAILWAY_ENVIRONMENT") else "0"))
+
+
+class Limitador:
+    def __init__(self, nombre: str, intentos: int, segundos: float):
+        self.nombre = nombre
+        self.capacidad = intentos
+        self.por_segundo = intentos / segundos
+        self.permitidos = 0
+        self.rechazados = 0
+
+    @classmethod
+    def desde_entorno(cls, nombre: str, variable: str, defecto: str):
+        """Lee límites con formato 'intentos/segundos', p. ej. LIMITE_LOGIN_IP=20/60."""
+        intentos, _, segundos = os.getenv(variable, defecto).partition("/")
+        return cls(nombre, int(intentos), float(segundos))
+
+    async def consumir(self, clave: str) -> float:
+        try:
+            espera = await get_almacen().consumir(f"{self.nombre}:{clave}", self.capacidad, self.por_segundo)
+        except Exception as e:
+            # Sin almacén no se bloquea el login: se deja pasar y se avisa
+            log.warning("Limitador %s sin almacén: %s", self.nombre, e)
+            return 0.0
+        if espera:
+            self.rechazados += 1
+        else:
+            self.permitidos += 1
+        return espera
+
+
+# El control principal es por email. El de IP solo frena ráfagas de un mismo
+# origen: el login y el registro del frontend pasan por su servidor Next.js
+# (app/api/auth/*/route.js), así que todos sus usuarios llegan con la misma IP,
+# igual que un taller completo detrás de un NAT; su límite debe quedar muy por
+# encima del tráfico de una cohorte.
+LIMITADORES = {
+    "login": (
+        Limitador.desde_entorno("login_email", "LIMITE_LOGIN_EMAIL", "5/60"),
+        Limitador.desde_entorno("login_ip", "LIMITE_LOGIN_IP", "600/60"),
+    ),
+    "registro": (
+        Limitador.desde_entorno("registro_email", "LIMITE_REGISTRO_EMAIL", "3/300"),
+        Limitador.desde_entorno("registro_ip", "LIMITE_REGISTRO_IP", "300/300"),
+    ),
+}
+
+
+def ip_cliente(request: Request) -> str:
+    if CONFIAR_PROXY:
+        reenviada = [ip.strip() for ip in request.headers.get("x-forwarded-for", "").split(",") if ip.strip()]
+        if reenviada:
+            return reenviada[-min(CONFIAR_PROXY, len(reenviada))]
+    return request.client.host if request.client else "desconocida"
+
+
+async def verificar(accion: str, request: Request, email: str):
+    """Lanza 429 con Retry-After si el email o la IP agotaron sus intentos."""
+    if not LIMITES_ACTIVOS:
+        return
+    por_email, por_ip = LIMITADORES[accion]
+    espera = await por_email.consumir(email.strip().lower())
+    if not espera:
+        espera = await por_ip.consumir(ip_cliente(request))
+    if espera:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos, espera un momento antes de volver a intentar",
+            headers={"Retry-After": str(math.ceil(espera))},
+        )
+
+
+def _metricas_limites() -> list:
+    lineas = [
+        "# HELP limite_intentos_total Intentos evaluados por el limitador y su desenlace",
+        "# TYPE limite_intentos_total counter",
+    ]
+    for limitadores in LIMITADORES.values():
+        for limitador in limitadores:
+            lineas.append(f'limite_intentos_total{{limitador="{limitador.nombre}",resultado="permitido"}} {limitador.permitidos}')
+            lineas.append(f'limite_intentos_total{{limitador="{limitador.nombre}",resultado="rechazado"}} {limitador.rechazados}')
+    return lineas
+
+
+metricas.colectores.append(_metricas_limites)
@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlparse
+import bisect
+import threading
+import time
+
+# Límites de los buckets en segundos (los mismos que usa el cliente de Prometheus)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+# Tiempos (servicio, segundos) acumulados durante el request actual, para Server-Timing
+_tiempos_request: ContextVar = ContextVar("tiempos_request", default=None)
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valores: tuple, segundos: float):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * len(BUCKETS), 0.0, 0]
+            i = bisect.bisect_left(BUCKETS, segundos)
+            if i < len(BUCKETS):
+                serie[0][i] += 1
+            serie[1] += segundos
+            serie[2] += 1
+
+    def exportar(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = [(v, list(b), s, c) for v, (b, s, c) in self._series.items()]
+        for valores, buckets, suma, cuenta in sorted(series):
+            etiquetas = ",".join(f'{k}="{_escapar(v)}"' for k, v in zip(self.etiquetas, valores))
+            acumulado = 0
+            for limite, n in zip(BUCKETS, buckets):
+                acumulado += n
+                lineas.append(f'{self.nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'{self.nombre}_bucket{{{etiquetas},le="+Inf"}} {cuenta}')
+            lineas.append(f"{self.nombre}_sum{{{etiquetas}}} {suma}")
+            lineas.append(f"{self.nombre}_count{{{etiquetas}}} {cuenta}")
+        return lineas
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+duracion_requests = Histograma(
+    "http_request_duration_seconds", "Duración de los requests por ruta",
+    ("method", "route", "status"))
+duracion_upstream = Histograma(
+    "upstream_request_duration_seconds", "Duración de las llamadas a Supabase",
+    ("servicio", "operacion"))
+duracion_etapas = Histograma(
+    "etapa_duration_seconds", "Duración de etapas internas del request",
+    ("etapa",))
+
+# Otras fuentes (p. ej. contadores del coalescedor) agregan aquí funciones que
+# devuelven líneas ya formateadas en texto Prometheus.
+colectores = []
+
+
+def _anotar(servicio: str, segundos: float):
+    tiempos = _tiempos_request.get()
+    if tiempos is not None:
+        tiempos.append((servicio, segundos))
+
+
+@contextmanager
+def etapa(nombre: str):
+    """Mide un bloque del request (p. ej. la verificación del token)."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        duracion_etapas.observar((nombre,), segundos)
+        _anotar(nombre, segundos)
+
+
+def _operacion_supabase(request) -> tuple:
+    """('postgrest', 'GET questions'), ('auth', 'GET user'), ('postgrest', 'POST rpc/guardar_evaluacion')."""
+    partes = urlparse(str(request.url)).path.strip("/").split("/")
+    if len(partes) >= 3 and partes[1] == "v1":
+        servicio = {"rest": "postgrest"}.get(partes[0], partes[0])
+        return servicio, f"{request.method} {'/'.join(partes[2:4])}"
+    return "otro", request.method
+
+
+async def _inicio_upstream(request):
+    request.extensions["inicio_metricas"] = time.perf_counter()
+
+
+async def _fin_upstream(response):
+    inicio = response.request.extensions.get("inicio_metricas")
+    if inicio is None:
+        return
+    segundos = time.perf_counter() - inicio
+    servicio, operacion = _operacion_supabase(response.request)
+    duracion_upstream.observar((servicio, operacion), segundos)
+    _anotar(servicio, segundos)
+
+
+# Se pasan al httpx.AsyncClient que comparte el cliente de Supabase
+hooks_httpx = {"request": [_inicio_upstream], "response": [_fin_upstream]}
+
+
+def _server_timing(tiempos: list, total: float) -> str:
+    agrupado = {}
+    for servicio, segundos in tiempos:
+        suma, cuenta = agrupado.get(servicio, (0.0, 0))
+        agrupado[servicio] = (suma + segundos, cuenta + 1)
+    partes = [f'{s};desc="{c}x";dur={d * 1000:.1f}' for s, (d, c) in agrupado.items()]
+    partes.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(partes)
+
+
+class MetricasMiddleware:
+    """Middleware ASGI: histograma por ruta y cabecera Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        inicio = time.perf_counter()
+        tiempos = []
+        token = _tiempos_request.set(tiempos)
+        estado = {"codigo": 500}
+
+        async def send_con_timing(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+                cabecera = _server_timing(tiempos, time.perf_counter() - inicio)
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [
+                    (b"server-timing", cabecera.encode())]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_timing)
+        finally:
+            _tiempos_request.reset(token)
+            ruta = scope.get("route")
+            duracion_requests.observar(
+                (scope["method"], getattr(ruta, "path", "sin_ruta"), str(estado["codigo"])),
+                time.perf_counter() - inicio)
+
+
+def exportar() -> str:
+    lineas = []
+    for histograma in (duracion_requests, duracion_upstream, duracion_etapas):
+        lineas.extend(histograma.exportar())
+    for colector in colectores:
+        lineas.extend(colector())
+    return "\n".join(lineas) + "\n"
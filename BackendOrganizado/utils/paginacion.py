@@ -0,0 +1,58 @@
+from fastapi import HTTPException
+from typing import Optional
+import base64
+import json
+import os
+
+# Paginación por keyset y selección de campos para los listados de la API:
+#
+#   ?fields=id,title        solo esas columnas (más las que necesita el cursor)
+#   ?limit=20               tamaño de página, hasta LIMITE_MAXIMO
+#   ?cursor=...             valor "siguiente" de la página anterior
+#
+# El cursor es opaco para el cliente: la clave de orden de la última fila en
+# base64. Sin limit se devuelve todo, como antes.
+LIMITE_MAXIMO = int(os.getenv("LIMITE_MAXIMO", "200"))
+
+
+def campos(fields: Optional[str], permitidos, obligatorios=()) -> Optional[list]:
+    """fields=a,b -> columnas en el orden del modelo; None si no se pidió proyección."""
+    if not fields:
+        return None
+    pedidos = {c.strip() for c in fields.split(",") if c.strip()}
+    desconocidos = pedidos - set(permitidos)
+    if desconocidos:
+        raise HTTPException(400, f"Campos desconocidos: {', '.join(sorted(desconocidos))}")
+    pedidos.update(obligatorios)
+    return [c for c in permitidos if c in pedidos]
+
+
+def codificar_cursor(*valores) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valores, default=str).encode()).decode().rstrip("=")
+
+
+def leer_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    if not cursor:
+        return None
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))))
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Cursor inválido")
+
+
+def paginar(filas: list, clave, cursor: Optional[str], limite: Optional[int]) -> tuple:
+    """Keyset en memoria para listas ya cargadas (catálogo): ordena por `clave`
+    y devuelve (página, cursor siguiente o None)."""
+    if not limite and not cursor:
+        return filas, None
+    ordenadas = sorted(filas, key=clave)
+    desde = leer_cursor(cursor)
+    if desde is not None:
+        try:
+            ordenadas = [f for f in ordenadas if tuple(clave(f)) > desde]
+        except TypeError:
+            raise HTTPException(400, "Cursor inválido")
+    if not limite or len(ordenadas) <= limite:
+        return ordenadas, None
+    pagina = ordenadas[:limite]
+    return pagina, codificar_cursor(*clave(pagina[-1]))
@@ -0,0 +1,183 @@
+# Backend/puntaje.py y BackendOrganizado/utils/puntaje.py deben ser idénticos (la API
+# anterior se despliega sola y no puede importar el otro paquete);
+# BackendOrganizado/tests/test_puntaje.py falla si difieren.
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Resultado:
+    puntaje_total: float
+    puntaje_maximo: float
+    porcentaje: float
+    # (question_id, response_value, puntos) por cada respuesta válida
+    detalle: tuple
+
+
+def _numero(valor, defecto):
+    return defecto if valor is None else valor
+
+
+def _texto(valor) -> str:
+    return str(valor).lower()
+
+
+def _compilar_condicion(condicion: dict, indice: dict, posicion: int, qid: str):
+    """skip_if de una pregunta -> función(marcadas) -> bool.
+
+    Formas admitidas (combinables):
+      {"question_id": "q1", "equals": "no"}      también "not_equals" e "in": [...]
+      {"question_id": "q1", "answered": false}
+      {"all": [...]}, {"any": [...]}, {"not": {...}}
+    Solo puede referirse a preguntas anteriores, así el grafo no tiene ciclos.
+    """
+    if not isinstance(condicion, dict):
+        raise ValueError(f"Condición no reconocida en {qid}: {condicion!r}")
+    combinadores = [clave for clave in ("all", "any", "not") if clave in condicion]
+    if len(combinadores) > 1:
+        raise ValueError(f"Condición ambigua en {qid}: usa {', '.join(combinadores)} a la vez")
+    if "all" in condicion or "any" in condicion:
+        clave = combinadores[0]
+        if not isinstance(condicion[clave], list):
+            raise ValueError(f"En la condición de {qid}, '{clave}' debe ser una lista")
+        # Lista vacía: "all" siempre se cumple y "any" nunca
+        partes = [_compilar_condicion(c, indice, posicion, qid) for c in condicion[clave]]
+        if clave == "all":
+            return lambda marcadas: all(parte(marcadas) for parte in partes)
+        return lambda marcadas: any(parte(marcadas) for parte in partes)
+    if "not" in condicion:
+        parte = _compilar_condicion(condicion["not"], indice, posicion, qid)
+        return lambda marcadas: not parte(marcadas)
+
+    referencia = condicion.get("question_id")
+    i = indice.get(referencia)
+    if i is None or i >= posicion:
+        raise ValueError(f"La condición de {qid} usa {referencia}, que no es una pregunta anterior del formulario")
+    if "equals" in condicion:
+        esperado = _texto(condicion["equals"])
+        return lambda marcadas: i in marcadas and marcadas[i].lower() == esperado
+    if "not_equals" in condicion:
+        esperado = _texto(condicion["not_equals"])
+        return lambda marcadas: i in marcadas and marcadas[i].lower() != esperado
+    if "in" in condicion:
+        esperados = frozenset(_texto(v) for v in condicion["in"])
+        return lambda marcadas: i in marcadas and marcadas[i].lower() in esperados
+    if "answered" in condicion:
+        respondida = bool(condicion["answered"])
+        return lambda marcadas: (i in marcadas) == respondida
+    raise ValueError(f"Condición no reconocida en {qid}: {condicion}")
+
+
+class ScoringEngine:
+    """Preguntas de un formulario compiladas una sola vez para puntuar envíos.
+
+    Cada pregunta vale weight * points_for_yes si la respuesta es "yes" y
+    weight * points_for_no en otro caso; el máximo posible de la pregunta es
+    weight * max(points_for_yes, points_for_no).
+
+    Una pregunta con skip_if se omite cuando la condición se cumple con las
+    respuestas anteriores; las omitidas no suman al puntaje ni al máximo.
+    """
+
+    def __init__(self, preguntas: list):
+        self.ids = tuple(p['id'] for p in preguntas)
+        self.indice = {qid: i for i, qid in enumerate(self.ids)}
+        self.pesos = tuple(_numero(p.get('weight'), 1) for p in preguntas)
+        self.puntos_si = tuple(_numero(p.get('points_for_yes'), 1) for p in preguntas)
+        self.puntos_no = tuple(_numero(p.get('points_for_no'), 0) for p in preguntas)
+        # Valores ya multiplicados por el peso: puntuar es solo indexar y sumar
+        self._valor = (
+            tuple(w * n for w, n in zip(self.pesos, self.puntos_no)),
+            tuple(w * s for w, s in zip(self.pesos, self.puntos_si)),
+        )
+        self._maximo = tuple(w * max(s, n) for w, s, n in
+                             zip(self.pesos, self.puntos_si, self.puntos_no))
+        self.secciones = tuple(p.get('section') for p in preguntas)
+        # (índice, condición) en orden: al evaluar la i, las anteriores ya se resolvieron
+        self._saltos = tuple(
+            (i, _compilar_condicion(p['skip_if'], self.indice, i, p['id']))
+            for i, p in enumerate(preguntas) if p.get('skip_if')
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _marcar(self, respuestas) -> dict:
+        """Índice de pregunta -> respuesta; ignora ids ajenos al formulario.
+        Si una pregunta viene repetida, gana la última respuesta."""
+        indice = self.indice
+        marcadas = {}
+        for respuesta in respuestas:
+            i = indice.get(respuesta.get("question_id"))
+            if i is not None:
+                marcadas[i] = str(respuesta.get("response_value"))
+        return marcadas
+
+    def _omitidas(self, marcadas: dict) -> set:
+        omitidas = set()
+        if not self._saltos:
+            return omitidas
+        # La respuesta a una pregunta omitida no cuenta para las condiciones siguientes
+        vigentes = dict(marcadas)
+        for i, condicion in self._saltos:
+            if condicion(vigentes):
+                omitidas.add(i)
+                vigentes.pop(i, None)
+        return omitidas
+
+    def _detalle(self, marcadas: dict) -> tuple:
+        valor_no, valor_si = self._valor
+        ids = self.ids
+        return tuple(
+            (ids[i], val, valor_si[i] if val.lower() == "yes" else valor_no[i])
+            for i, val in marcadas.items()
+        )
+
+    def _puntuar(self, marcadas: dict) -> Resultado:
+        omitidas = self._omitidas(marcadas)
+        if omitidas:
+            marcadas = {i: val for i, val in marcadas.items() if i not in omitidas}
+        maximo = self._maximo
+        detalle = self._detalle(marcadas)
+        puntaje_total = sum(d[2] for d in detalle)
+        puntaje_maximo = sum(maximo[i] for i in marcadas)
+        porcentaje = (puntaje_total / puntaje_maximo * 100) if puntaje_maximo > 0 else 0
+        return Resultado(puntaje_total, puntaje_maximo, porcentaje, detalle)
+
+    def detalle(self, respuestas: list) -> tuple:
+        """(question_id, response_value, puntos) por respuesta válida, sin aplicar
+        skip_if: para guardar progreso o borradores que todavía están incompletos."""
+        return self._detalle(self._marcar(respuestas))
+
+    def faltantes(self, respuestas: list) -> int:
+        """Preguntas alcanzables que todavía no tienen respuesta."""
+        marcadas = self._marcar(respuestas)
+        omitidas = self._omitidas(marcadas)
+        return sum(1 for i in range(len(self.ids)) if i not in marcadas and i not in omitidas)
+
+    def siguiente_pagina(self, respuestas: list) -> tuple:
+        """Sección de la primera pregunta alcanzable sin responder.
+
+        Devuelve (seccion, índices alcanzables de esa sección, faltantes en
+        total); con todo respondido, (None, (), 0).
+        """
+        marcadas = self._marcar(respuestas)
+        omitidas = self._omitidas(marcadas)
+        pendientes = [i for i in range(len(self.ids)) if i not in marcadas and i not in omitidas]
+        if not pendientes:
+            return None, (), 0
+        seccion = self.secciones[pendientes[0]]
+        # Página = tramo contiguo de la misma sección alrededor de la primera pendiente
+        inicio = pendientes[0]
+        while inicio > 0 and self.secciones[inicio - 1] == seccion:
+            inicio -= 1
+        fin = pendientes[0]
+        while fin < len(self.ids) and self.secciones[fin] == seccion:
+            fin += 1
+        return seccion, tuple(i for i in range(inicio, fin) if i not in omitidas), len(pendientes)
+
+    def score(self, respuestas: list) -> Resultado:
+        return self._puntuar(self._marcar(respuestas))
+
+    def score_many(self, envios) -> list:
+        """Puntúa un lote de envíos (listas de respuestas) con el mismo formulario."""
+        return [self._puntuar(self._marcar(respuestas)) for respuestas in envios]
@@ -0,0 +1,252 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+from uuid import UUID
+from utils.config import get_supabase
+import os
+
+# Acceso a datos de formularios, preguntas, respuestas y puntajes. Los routers
+# y utilidades hablan con get_repositorio() y no con un cliente concreto:
+#
+#   REPOSITORIO=supabase   (por defecto) PostgREST vía el cliente de Supabase
+#   REPOSITORIO=sqlite     archivo local SQLITE_RUTA, sin servicios externos
+#   REPOSITORIO=postgres   conexión directa a DATABASE_URL (asyncpg)
+#
+# La autenticación sigue siendo de Supabase (o de quien firme los JWT).
+REPOSITORIO = os.getenv("REPOSITORIO", "supabase")
+# PostgREST corta cada respuesta en max-rows filas (1000 por defecto en
+# Supabase) sin avisar: ninguna consulta sin paginar debe poder pasarse.
+MAX_FILAS = int(os.getenv("PGRST_MAX_ROWS", "1000"))
+
+
+class IdInvalido(ValueError):
+    """Un id que no es UUID; los routers lo responden con 400."""
+
+
+def _uuid(valor) -> str:
+    """Id validado antes de interpolarlo en un filtro de PostgREST (or_, in):
+    una coma o un paréntesis en el valor cambiarían la consulta."""
+    try:
+        return str(UUID(str(valor)))
+    except ValueError:
+        raise IdInvalido(f"Identificador inválido: {valor}")
+
+
+class Repositorio(ABC):
+    @abstractmethod
+    async def formularios(self, solo_activos: bool = True) -> list:
+        """Filas de forms."""
+
+    @abstractmethod
+    async def preguntas(self, form_ids: list) -> list:
+        """Preguntas de los formularios indicados, ordenadas por order_index."""
+
+    @abstractmethod
+    async def niveles(self, form_ids: list) -> list:
+        """Filas de readiness_levels de esos formularios más las globales (form_id nulo)."""
+
+    @abstractmethod
+    async def respuestas(self, user_id: str, form_ids: list) -> list:
+        """form_id, question_id y response_value guardados por el usuario."""
+
+    @abstractmethod
+    async def guardar_evaluaciones(self, respuestas: list, puntajes: list,
+                                   historial: Optional[list] = None):
+        """Upsert de respuestas y puntajes en una sola transacción, más una fila
+        de user_form_score_history por cada elemento de `historial` (por
+        defecto, los mismos puntajes)."""
+
+    @abstractmethod
+    async def sincronizar_borrador(self, user_id: str, form_id: str, cambios: list,
+                                   desde: Optional[str]) -> dict:
+        """Aplica cambios {question_id, response_value, score, version} con
+        last-writer-wins por version y devuelve {"cambios": filas tocadas desde
+        `desde` más las de las preguntas enviadas, "cursor": max(updated_at)}."""
+
+    @abstractmethod
+    async def puntajes(self, user_id: str, form_ids: Optional[list] = None,
+                       con_formulario: bool = False, columnas: Optional[list] = None,
+                       despues_de: Optional[str] = None, limite: Optional[int] = None) -> list:
+        """Filas de user_form_scores del usuario; con_formulario agrega forms(title, description).
+        Con limite se ordenan por form_id y se devuelven las posteriores a despues_de."""
+
+    @abstractmethod
+    async def historial(self, user_id: str, form_id: str, puntos: int, desde=None, hasta=None) -> dict:
+        """{"total", "puntos"}: la serie de puntajes del usuario reducida a lo
+        sumo `puntos` puntos (ver sql/008_historial.sql)."""
+
+    @abstractmethod
+    async def analitica(self, form_id: str, intervalo: str, desde=None, hasta=None) -> dict:
+        """Agregados del formulario (ver sql/011_analitica_rango.sql)."""
+
+    @abstractmethod
+    async def pagina_puntajes(self, filtros, cursor: Optional[tuple], tam: int) -> list:
+        """Puntajes filtrados, ordenados y paginados por keyset sobre (form_id, user_id)."""
+
+    @abstractmethod
+    async def respuestas_usuarios(self, form_id: str, user_ids: list) -> list:
+        """user_id, question_id, response_value y score de varios usuarios en un formulario."""
+
+    @abstractmethod
+    async def pagina_respuestas(self, form_id: str, desde_usuario: Optional[str], tam: int) -> list:
+        """Respuestas de un formulario ordenadas por (user_id, question_id), keyset sobre user_id."""
+
+    @abstractmethod
+    async def usuarios_con_puntaje(self, form_id: str, user_ids: list) -> list:
+        """De esos usuarios, los que ya tienen fila en user_form_scores para el formulario."""
+
+    @abstractmethod
+    async def guardar_puntajes(self, puntajes: list):
+        """Upsert de filas de user_form_scores."""
+
+    async def cerrar(self):
+        pass
+
+
+class RepositorioSupabase(Repositorio):
+    async def formularios(self, solo_activos: bool = True) -> list:
+        consulta = get_supabase().table('forms').select('*')
+        if solo_activos:
+            consulta = consulta.eq('is_active', True)
+        return (await consulta.execute()).data
+
+    async def preguntas(self, form_ids: list) -> list:
+        consulta = get_supabase().table('questions').select('*')
+        if len(form_ids) == 1:
+            consulta = consulta.eq('form_id', form_ids[0])
+        else:
+            consulta = consulta.in_('form_id', form_ids)
+        return (await consulta.order('order_index').execute()).data
+
+    async def niveles(self, form_ids: list) -> list:
+        respuesta = await get_supabase().table("readiness_levels").select("*")\
+            .or_(f"form_id.in.({','.join(_uuid(f) for f in form_ids)}),form_id.is.null").execute()
+        return respuesta.data
+
+    async def respuestas(self, user_id: str, form_ids: list) -> list:
+        respuesta = await get_supabase().table("user_responses")\
+            .select("form_id,question_id,response_value")\
+            .eq("user_id", user_id).in_("form_id", form_ids).execute()
+        return respuesta.data
+
+    async def guardar_evaluaciones(self, respuestas: list, puntajes: list,
+                                   historial: Optional[list] = None):
+        # RPC transaccional, ver sql/008_historial.sql
+        await get_supabase().rpc("guardar_evaluaciones", {
+            "p_respuestas": respuestas,
+            "p_puntajes": puntajes,
+            "p_historial": historial,
+        }).execute()
+
+    async def sincronizar_borrador(self, user_id: str, form_id: str, cambios: list,
+                                   desde: Optional[str]) -> dict:
+        # RPC transaccional, ver sql/007_borradores.sql
+        respuesta = await get_supabase().rpc("sincronizar_borrador", {
+            "p_user_id": user_id,
+            "p_form_id": form_id,
+            "p_cambios": cambios,
+            "p_desde": desde,
+        }).execute()
+        return respuesta.data
+
+    async def puntajes(self, user_id: str, form_ids: Optional[list] = None,
+                       con_formulario: bool = False, columnas: Optional[list] = None,
+                       despues_de: Optional[str] = None, limite: Optional[int] = None) -> list:
+        seleccion = ",".join(columnas) if columnas else "*"
+        if con_formulario:
+            seleccion += ", forms(title, description)"
+        consulta = get_supabase().table("user_form_scores").select(seleccion).eq("user_id", user_id)
+        if form_ids is not None:
+            consulta = consulta.in_("form_id", form_ids)
+        if despues_de is not None:
+            consulta = consulta.gt("form_id", despues_de)
+        if limite:
+            consulta = consulta.order("form_id").limit(limite)
+        return (await consulta.execute()).data
+
+    async def historial(self, user_id: str, form_id: str, puntos: int, desde=None, hasta=None) -> dict:
+        respuesta = await get_supabase().rpc("historial_puntajes", {
+            "p_user_id": user_id,
+            "p_form_id": form_id,
+            "p_puntos": puntos,
+            "p_desde": desde.isoformat() if desde else None,
+            "p_hasta": hasta.isoformat() if hasta else None,
+        }).execute()
+        return respuesta.data
+
+    async def analitica(self, form_id: str, intervalo: str, desde=None, hasta=None) -> dict:
+        respuesta = await get_supabase().rpc("analitica_formulario", {
+            "p_form_id": form_id,
+            "p_intervalo": intervalo,
+            "p_desde": desde.isoformat() if desde else None,
+            "p_hasta": hasta.isoformat() if hasta else None,
+        }).execute()
+        return respuesta.data
+
+    async def pagina_puntajes(self, filtros, cursor: Optional[tuple], tam: int) -> list:
+        consulta = get_supabase().table("user_form_scores").select(
+            "user_id,form_id,total_score,max_possible_score,percentage,"
+            "readiness_level,can_export,completed_at")
+        if filtros.form_id:
+            consulta = consulta.eq("form_id", filtros.form_id)
+        if filtros.desde:
+            consulta = consulta.gte("completed_at", filtros.desde.isoformat())
+        if filtros.hasta:
+            consulta = consulta.lt("completed_at", filtros.hasta.isoformat())
+        if filtros.nivel:
+            consulta = consulta.eq("readiness_level", filtros.nivel)
+        if cursor:
+            # Keyset sobre (form_id, user_id): nunca se usa offset
+            form_id, user_id = _uuid(cursor[0]), _uuid(cursor[1])
+            consulta = consulta.or_(f"form_id.gt.{form_id},and(form_id.eq.{form_id},user_id.gt.{user_id})")
+        consulta = consulta.order("form_id").order("user_id").limit(tam)
+        return (await consulta.execute()).data
+
+    async def respuestas_usuarios(self, form_id: str, user_ids: list) -> list:
+        respuesta = await get_supabase().table("user_responses")\
+            .select("user_id,question_id,response_value,score")\
+            .eq("form_id", form_id).in_("user_id", user_ids).execute()
+        return respuesta.data
+
+    async def pagina_respuestas(self, form_id: str, desde_usuario: Optional[str], tam: int) -> list:
+        consulta = get_supabase().table("user_responses")\
+            .select("user_id,question_id,response_value")\
+            .eq("form_id", form_id).order("user_id").order("question_id").limit(tam)
+        if desde_usuario is not None:
+            consulta = consulta.gt("user_id", desde_usuario)
+        return (await consulta.execute()).data
+
+    async def usuarios_con_puntaje(self, form_id: str, user_ids: list) -> list:
+        respuesta = await get_supabase().table("user_form_scores").select("user_id")\
+            .eq("form_id", form_id).in_("user_id", user_ids).execute()
+        return [f["user_id"] for f in respuesta.data]
+
+    async def guardar_puntajes(self, puntajes: list):
+        await get_supabase().table("user_form_scores").upsert(
+            puntajes, on_conflict="user_id,form_id").execute()
+
+
+_repositorio = None
+
+
+def get_repositorio() -> Repositorio:
+    """Repositorio compartido, creado en el primer uso según REPOSITORIO."""
+    global _repositorio
+    if _repositorio is None:
+        if REPOSITORIO == "supabase":
+            _repositorio = RepositorioSupabase()
+        elif REPOSITORIO == "sqlite":
+            from utils.repositorio_sql import RepositorioSQLite
+            _repositorio = RepositorioSQLite(os.getenv("SQLITE_RUTA", "termometro.sqlite"))
+        elif REPOSITORIO == "postgres":
+            from utils.repositorio_sql import RepositorioPostgres
+            _repositorio = RepositorioPostgres(os.getenv("DATABASE_URL"))
+        else:
+            raise RuntimeError(f"REPOSITORIO desconocido: {REPOSITORIO}")
+    return _repositorio
+
+
+async def cerrar_repositorio():
+    global _repositorio
+    if _repositorio is not None:
+        await _repositorio.cerrar()
+    _repositorio = None
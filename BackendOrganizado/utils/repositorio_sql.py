@@ -0,0 +1,583 @@
+from abc import abstractmethod
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Optional
+from uuid import UUID
+from fastapi.concurrency import run_in_threadpool
+from utils.repositorio import Repositorio
+import json
+import math
+import os
+import queue
+import re
+import sqlite3
+
+# Repositorio sobre SQL directo: las consultas calientes no pasan por HTTP ni
+# por PostgREST. Las sentencias se escriben una sola vez con marcadores $1, $2...
+# (asyncpg los usa tal cual; SQLite los recibe como ?1, ?2...) y ambos motores
+# las preparan una vez por conexión y las reutilizan.
+
+COLUMNAS_BOOLEANAS = {"is_active", "can_export", "is_required"}
+COLUMNAS_JSON = {"options", "skip_if"}
+# Puntos y pesos enteros salen como 3 y no 3.0 (SQLite los guarda como REAL)
+COLUMNAS_PUNTOS = {"score", "total_score", "max_possible_score", "weight", "points_for_yes", "points_for_no"}
+
+# Envío completo o progreso: deja su version (hora del servidor), así un delta
+# de borrador más viejo no lo sobrescribe después; y no pisa una respuesta más
+# nueva (un reintento atrasado de la escritura diferida, ver sql/012)
+UPSERT_RESPUESTA = """
+    insert into user_responses (user_id, form_id, question_id, response_value, score, version, updated_at)
+    values ($1, $2, $3, $4, $5, $6, $7)
+    on conflict (user_id, question_id) do update
+      set response_value = excluded.response_value, score = excluded.score,
+          version = excluded.version, updated_at = excluded.updated_at
+      where user_responses.version is null or excluded.version >= user_responses.version"""
+
+# Borrador: last-writer-wins por la version que asigna el cliente
+UPSERT_BORRADOR = """
+    insert into user_responses (user_id, form_id, question_id, response_value, score, version, updated_at)
+    values ($1, $2, $3, $4, $5, $6, $7)
+    on conflict (user_id, question_id) do update
+      set response_value = excluded.response_value, score = excluded.score,
+          version = excluded.version, updated_at = excluded.updated_at
+      where user_responses.version is null or excluded.version > user_responses.version"""
+
+UPSERT_PUNTAJE = """
+    insert into user_form_scores (
+      user_id, form_id, total_score, max_possible_score, percentage,
+      readiness_level, readiness_color, can_export, completion_status, completed_at)
+    values ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    on conflict (user_id, form_id) do update
+      set total_score = excluded.total_score,
+          max_possible_score = excluded.max_possible_score,
+          percentage = excluded.percentage,
+          readiness_level = excluded.readiness_level,
+          readiness_color = excluded.readiness_color,
+          can_export = excluded.can_export,
+          completion_status = coalesce(excluded.completion_status, user_form_scores.completion_status),
+          completed_at = coalesce(excluded.completed_at, user_form_scores.completed_at)
+      where excluded.completed_at is null or user_form_scores.completed_at is null
+         or excluded.completed_at >= user_form_scores.completed_at"""
+
+# Historial append-only: una fila por envío, escrita junto con UPSERT_PUNTAJE
+INSERT_HISTORIAL = """
+    insert into user_form_score_history (
+      user_id, form_id, total_score, max_possible_score, percentage,
+      readiness_level, can_export, completed_at)
+    values ($1, $2, $3, $4, $5, $6, $7, $8)"""
+
+# Mismas tablas que en Supabase, con los índices que usan las consultas de abajo
+ESQUEMA_SQLITE = """
+create table if not exists forms (
+  id text primary key,
+  title text,
+  description text,
+  is_active integer not null default 1,
+  created_at text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+create table if not exists questions (
+  id text primary key,
+  form_id text not null references forms (id) on delete cascade,
+  question_text text,
+  question_type text default 'yes_no',
+  options text,
+  order_index integer,
+  weight real default 1,
+  points_for_yes real default 1,
+  points_for_no real default 0,
+  section text,
+  skip_if text,
+  created_at text default (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+);
+create index if not exists questions_form_order_idx on questions (form_id, order_index);
+create table if not exists user_responses (
+  id integer primary key autoincrement,
+  user_id text not null,
+  form_id text not null,
+  question_id text not null,
+  response_value text,
+  score real,
+  version integer,
+  updated_at text,
+  created_at text default (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+  unique (user_id, question_id)
+);
+create index if not exists user_responses_user_form_idx on user_responses (user_id, form_id);
+create index if not exists user_responses_form_user_idx on user_responses (form_id, user_id, question_id);
+create table if not exists user_form_scores (
+  id integer primary key autoincrement,
+  user_id text not null,
+  form_id text not null,
+  total_score real,
+  max_possible_score real,
+  percentage real,
+  readiness_level text,
+  readiness_color text,
+  can_export integer,
+  completion_status text,
+  completed_at text,
+  unique (user_id, form_id)
+);
+create table if not exists user_form_score_history (
+  id integer primary key autoincrement,
+  user_id text not null,
+  form_id text not null,
+  total_score real,
+  max_possible_score real,
+  percentage real,
+  readiness_level text,
+  can_export integer,
+  completed_at text not null
+);
+create index if not exists user_form_score_history_user_form_completed_idx
+  on user_form_score_history (user_id, form_id, completed_at);
+create table if not exists readiness_levels (
+  id integer primary key autoincrement,
+  form_id text references forms (id) on delete cascade,
+  min_percentage real not null,
+  level text not null,
+  color text not null,
+  can_export integer not null default 0,
+  message text,
+  description text
+);
+create index if not exists readiness_levels_form_idx on readiness_levels (form_id);
+create index if not exists user_responses_user_form_updated_idx on user_responses (user_id, form_id, updated_at);
+create index if not exists user_form_scores_form_user_idx on user_form_scores (form_id, user_id);
+create index if not exists user_form_scores_form_completed_idx on user_form_scores (form_id, completed_at);
+create index if not exists user_form_scores_form_percentage_idx on user_form_scores (form_id, percentage);
+create index if not exists user_form_scores_completos_idx
+  on user_form_scores (form_id, completed_at, user_id) where completion_status = 'complete';
+"""
+
+# Columnas agregadas después de la primera versión del esquema: un archivo
+# SQLite ya creado las recibe con alter table al abrirse.
+COLUMNAS_AGREGADAS = (
+    ("questions", "section", "text"),
+    ("questions", "skip_if", "text"),
+    ("user_responses", "version", "integer"),
+    ("user_responses", "updated_at", "text"),
+)
+
+
+def _migrar_sqlite(conexion):
+    for tabla, columna, tipo in COLUMNAS_AGREGADAS:
+        existentes = {f[1] for f in conexion.execute(f"pragma table_info({tabla})")}
+        if existentes and columna not in existentes:
+            conexion.execute(f"alter table {tabla} add column {columna} {tipo}")
+    conexion.executescript(ESQUEMA_SQLITE)
+
+
+def _marcadores(cantidad: int, desde: int) -> str:
+    return ", ".join(f"${i}" for i in range(desde, desde + cantidad))
+
+
+def _valor(columna: str, valor):
+    if isinstance(valor, UUID):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return int(valor) if valor == valor.to_integral_value() else float(valor)
+    if columna in COLUMNAS_PUNTOS and isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if columna in COLUMNAS_BOOLEANAS and valor is not None:
+        return bool(valor)
+    if columna in COLUMNAS_JSON and isinstance(valor, str):
+        return json.loads(valor)
+    return valor
+
+
+def _fila(registro) -> dict:
+    """Fila del driver -> dict con los mismos tipos que devuelve PostgREST."""
+    return {columna: _valor(columna, valor) for columna, valor in dict(registro).items()}
+
+
+def _submuestrear(filas: list, puntos: int) -> list:
+    """Igual que historial_puntajes (sql/008): `filas` ordenadas por completed_at
+    en `puntos` tramos de tiempo iguales, el último envío de cada uno."""
+    if len(filas) <= puntos:
+        return [{**f, "envios": 1} for f in filas]
+    marcas = [datetime.fromisoformat(f["completed_at"].replace("Z", "+00:00")).timestamp() for f in filas]
+    inicio, ancho = marcas[0], marcas[-1] - marcas[0]
+    tramos = {}
+    for fila, marca in zip(filas, marcas):
+        tramo = 0 if not ancho else min(puntos - 1, math.floor((marca - inicio) / ancho * puntos))
+        _, envios = tramos.get(tramo, (None, 0))
+        tramos[tramo] = (fila, envios + 1)
+    return [{**fila, "envios": envios} for fila, envios in tramos.values()]
+
+
+def _periodo(completado: str, intervalo: str) -> str:
+    dia = datetime.fromisoformat(completado.replace("Z", "+00:00")).replace(
+        hour=0, minute=0, second=0, microsecond=0)
+    if intervalo == "week":
+        dia -= timedelta(days=dia.weekday())
+    elif intervalo == "month":
+        dia = dia.replace(day=1)
+    return dia.isoformat()
+
+
+class RepositorioSQL(Repositorio):
+    """Consultas comunes; cada motor implementa _consultar y _transaccion."""
+
+    @abstractmethod
+    async def _consultar(self, sql: str, parametros: tuple = ()) -> list:
+        """Filas como dicts; los parámetros van como $1, $2, ..."""
+
+    @abstractmethod
+    async def _transaccion(self, sentencias: list):
+        """sentencias: [(sql, [parametros, ...]), ...] ejecutadas en una transacción."""
+
+    def _tiempo(self, valor):
+        """Marca de tiempo tal como la espera el driver."""
+        return valor.isoformat() if isinstance(valor, datetime) else valor
+
+    async def formularios(self, solo_activos: bool = True) -> list:
+        if solo_activos:
+            return await self._consultar("select * from forms where is_active = $1", (True,))
+        return await self._consultar("select * from forms")
+
+    async def preguntas(self, form_ids: list) -> list:
+        return await self._consultar(
+            f"select * from questions where form_id in ({_marcadores(len(form_ids), 1)}) "
+            "order by form_id, order_index", tuple(form_ids))
+
+    async def niveles(self, form_ids: list) -> list:
+        return await self._consultar(
+            "select * from readiness_levels "
+            f"where form_id in ({_marcadores(len(form_ids), 1)}) or form_id is null", tuple(form_ids))
+
+    async def respuestas(self, user_id: str, form_ids: list) -> list:
+        return await self._consultar(
+            "select form_id, question_id, response_value from user_responses "
+            f"where user_id = $1 and form_id in ({_marcadores(len(form_ids), 2)})",
+            (user_id, *form_ids))
+
+    def _parametros_puntaje(self, p: dict) -> tuple:
+        return (p["user_id"], p["form_id"], p["total_score"], p["max_possible_score"],
+                p["percentage"], p["readiness_level"], p["readiness_color"], p["can_export"],
+                p.get("completion_status"), self._tiempo(p.get("completed_at")))
+
+    async def guardar_evaluaciones(self, respuestas: list, puntajes: list,
+                                   historial: Optional[list] = None):
+        instante = datetime.now(timezone.utc)
+        ahora = self._tiempo(instante)
+        version = int(instante.timestamp() * 1000)
+        await self._transaccion([
+            (UPSERT_RESPUESTA, [(r["user_id"], r["form_id"], r["question_id"], r["response_value"],
+                                 r["score"], r.get("version") or version, ahora) for r in respuestas]),
+            (UPSERT_PUNTAJE, [self._parametros_puntaje(p) for p in puntajes]),
+            (INSERT_HISTORIAL, [(p["user_id"], p["form_id"], p["total_score"], p["max_possible_score"],
+                                 p["percentage"], p["readiness_level"], p["can_export"],
+                                 self._tiempo(p.get("completed_at")) or ahora)
+                                for p in (puntajes if historial is None else historial)]),
+        ])
+
+    async def sincronizar_borrador(self, user_id: str, form_id: str, cambios: list,
+                                   desde: Optional[str]) -> dict:
+        ahora = self._tiempo(datetime.now(timezone.utc))
+        await self._transaccion([(UPSERT_BORRADOR, [
+            (user_id, form_id, c["question_id"], c["response_value"], c["score"], c["version"], ahora)
+            for c in cambios])])
+        parametros = [user_id, form_id]
+        sql = ("select question_id, response_value, version, updated_at from user_responses "
+               "where user_id = $1 and form_id = $2")
+        if desde is not None:
+            parametros.append(self._tiempo(desde))
+            condicion = f"updated_at >= ${len(parametros)}"
+            if cambios:
+                condicion += f" or question_id in ({_marcadores(len(cambios), len(parametros) + 1)})"
+                parametros.extend(c["question_id"] for c in cambios)
+            sql += f" and ({condicion})"
+        filas = await self._consultar(sql + " order by updated_at", tuple(parametros))
+        marcas = [f["updated_at"] for f in filas if f["updated_at"] is not None]
+        return {"cambios": filas, "cursor": max(marcas) if marcas else desde}
+
+    async def guardar_puntajes(self, puntajes: list):
+        await self._transaccion([(UPSERT_PUNTAJE, [self._parametros_puntaje(p) for p in puntajes])])
+
+    async def puntajes(self, user_id: str, form_ids: Optional[list] = None,
+                       con_formulario: bool = False, columnas: Optional[list] = None,
+                       despues_de: Optional[str] = None, limite: Optional[int] = None) -> list:
+        # columnas llega validada contra esquemas.Resultado (nunca texto del usuario)
+        sql = "select " + (", ".join(f"s.{c}" for c in columnas) if columnas else "s.*")
+        if con_formulario:
+            sql += ", f.title as form_title, f.description as form_description"
+        sql += " from user_form_scores s"
+        if con_formulario:
+            sql += " left join forms f on f.id = s.form_id"
+        sql += " where s.user_id = $1"
+        parametros = [user_id]
+        if form_ids is not None:
+            sql += f" and s.form_id in ({_marcadores(len(form_ids), 2)})"
+            parametros.extend(form_ids)
+        if despues_de is not None:
+            parametros.append(despues_de)
+            sql += f" and s.form_id > ${len(parametros)}"
+        if limite:
+            parametros.append(limite)
+            sql += f" order by s.form_id limit ${len(parametros)}"
+        filas = await self._consultar(sql, tuple(parametros))
+        if con_formulario:
+            for fila in filas:
+                fila["forms"] = {"title": fila.pop("form_title"), "description": fila.pop("form_description")}
+        return filas
+
+    async def pagina_puntajes(self, filtros, cursor: Optional[tuple], tam: int) -> list:
+        condiciones, parametros = [], []
+
+        def agregar(condicion: str, *valores):
+            marcas = [f"${len(parametros) + i + 1}" for i in range(len(valores))]
+            condiciones.append(condicion.format(*marcas))
+            parametros.extend(valores)
+
+        if filtros.form_id:
+            agregar("form_id = {}", filtros.form_id)
+        if filtros.desde:
+            agregar("completed_at >= {}", self._tiempo(filtros.desde))
+        if filtros.hasta:
+            agregar("completed_at < {}", self._tiempo(filtros.hasta))
+        if filtros.nivel:
+            agregar("readiness_level = {}", filtros.nivel)
+        if cursor:
+            agregar("(form_id, user_id) > ({}, {})", *cursor)
+        donde = f"where {' and '.join(condiciones)}" if condiciones else ""
+        return await self._consultar(
+            "select user_id, form_id, total_score, max_possible_score, percentage, "
+            f"readiness_level, can_export, completed_at from user_form_scores {donde} "
+            f"order by form_id, user_id limit {int(tam)}", tuple(parametros))
+
+    async def respuestas_usuarios(self, form_id: str, user_ids: list) -> list:
+        return await self._consultar(
+            "select user_id, question_id, response_value, score from user_responses "
+            f"where form_id = $1 and user_id in ({_marcadores(len(user_ids), 2)})",
+            (form_id, *user_ids))
+
+    async def usuarios_con_puntaje(self, form_id: str, user_ids: list) -> list:
+        filas = await self._consultar(
+            "select user_id from user_form_scores "
+            f"where form_id = $1 and user_id in ({_marcadores(len(user_ids), 2)})",
+            (form_id, *user_ids))
+        return [f["user_id"] for f in filas]
+
+    async def pagina_respuestas(self, form_id: str, desde_usuario: Optional[str], tam: int) -> list:
+        sql = "select user_id, question_id, response_value from user_responses where form_id = $1"
+        parametros = (form_id,)
+        if desde_usuario is not None:
+            sql += " and user_id > $2"
+            parametros += (desde_usuario,)
+        return await self._consultar(sql + f" order by user_id, question_id limit {int(tam)}", parametros)
+
+    async def historial(self, user_id: str, form_id: str, puntos: int, desde=None, hasta=None) -> dict:
+        sql = ("select completed_at, percentage, total_score, max_possible_score, readiness_level, "
+               "can_export from user_form_score_history where user_id = $1 and form_id = $2")
+        parametros = [user_id, form_id]
+        if desde:
+            parametros.append(self._tiempo(desde))
+            sql += f" and completed_at >= ${len(parametros)}"
+        if hasta:
+            parametros.append(self._tiempo(hasta))
+            sql += f" and completed_at < ${len(parametros)}"
+        filas = await self._consultar(sql + " order by completed_at", tuple(parametros))
+        return {"total": len(filas), "puntos": _submuestrear(filas, puntos)}
+
+    async def analitica(self, form_id: str, intervalo: str, desde=None, hasta=None) -> dict:
+        """Mismo JSON que analitica_formulario (sql/011). Todo se agrega en SQL:
+        de user_form_scores solo llegan conteos y los dos valores que rodean
+        cada percentil, nunca una fila por usuario."""
+        filtro, parametros = "s.form_id = $1", [form_id]
+        if desde:
+            parametros.append(self._tiempo(desde))
+            filtro += f" and s.completed_at >= ${len(parametros)}"
+        if hasta:
+            parametros.append(self._tiempo(hasta))
+            filtro += f" and s.completed_at < ${len(parametros)}"
+        parametros = tuple(parametros)
+
+        resumen = (await self._consultar(
+            "select count(*) as respondentes, count(s.percentage) as con_porcentaje, "
+            f"avg(s.percentage) as promedio from user_form_scores s where {filtro}", parametros))[0]
+        niveles = await self._consultar(
+            f"select s.readiness_level, count(*) as total from user_form_scores s where {filtro} "
+            "group by s.readiness_level", parametros)
+        # Un grupo por día (la muestra conserva el formato de completed_at) y
+        # _periodo los junta por semana o mes
+        dias = await self._consultar(
+            "select min(s.completed_at) as muestra, count(*) as total from user_form_scores s "
+            f"where {filtro} and s.completed_at is not null group by substr(s.completed_at, 1, 10)",
+            parametros)
+        # Tasas de los usuarios con evaluación completa en el rango: se parte de
+        # sus filas de user_form_scores y se llega a las respuestas por índice
+        preguntas = await self._consultar(
+            "select q.id as question_id, q.question_text, count(*) as respuestas, "
+            "sum(case when lower(r.response_value) = 'yes' then 1 else 0 end) as respuestas_si "
+            "from user_form_scores s "
+            "join user_responses r on r.form_id = s.form_id and r.user_id = s.user_id "
+            "join questions q on q.id = r.question_id "
+            f"where {filtro} and s.completion_status = 'complete' "
+            "group by q.id, q.question_text, q.order_index order by q.order_index", parametros)
+
+        percentiles = {}
+        for q in (0.10, 0.25, 0.50, 0.75, 0.90):
+            percentiles[f"p{int(q * 100)}"] = await self._percentil(
+                filtro, parametros, resumen["con_porcentaje"], q)
+        completados = Counter()
+        for dia in dias:
+            completados[_periodo(dia["muestra"], intervalo)] += dia["total"]
+        return {
+            "respondentes": resumen["respondentes"],
+            "niveles": {n["readiness_level"]: n["total"] for n in niveles},
+            "percentiles": {
+                **percentiles,
+                "promedio": round(resumen["promedio"], 2) if resumen["promedio"] is not None else None,
+            },
+            "preguntas": [{
+                "question_id": p["question_id"],
+                "question_text": p["question_text"],
+                "respuestas": p["respuestas"],
+                "tasa_si": round(p["respuestas_si"] / p["respuestas"], 4) if p["respuestas"] else None,
+            } for p in preguntas],
+            "completados": [{"periodo": periodo, "total": total}
+                            for periodo, total in sorted(completados.items())],
+        }
+
+    async def _percentil(self, filtro: str, parametros: tuple, total: int, p: float):
+        """Igual que percentile_cont de Postgres (interpolación lineal), leyendo
+        solo los dos porcentajes vecinos de la posición."""
+        if not total:
+            return None
+        posicion = (total - 1) * p
+        abajo = math.floor(posicion)
+        vecinos = [f["percentage"] for f in await self._consultar(
+            f"select s.percentage from user_form_scores s where {filtro} and s.percentage is not null "
+            f"order by s.percentage limit 2 offset {abajo}", parametros)]
+        return vecinos[0] + (vecinos[-1] - vecinos[0]) * (posicion - abajo)
+
+
+@lru_cache(maxsize=256)
+def _a_sqlite(sql: str) -> str:
+    return re.sub(r"\$(\d+)", r"?\1", sql)
+
+
+class RepositorioSQLite(RepositorioSQL):
+    """Archivo SQLite local con un pool fijo de conexiones usadas desde hilos."""
+
+    def __init__(self, ruta: str, tam_pool: int = int(os.getenv("SQLITE_POOL", "4"))):
+        self.ruta = ruta
+        self._pool = queue.LifoQueue()
+        for i in range(tam_pool):
+            conexion = self._conectar()
+            if i == 0:
+                _migrar_sqlite(conexion)
+            self._pool.put(conexion)
+
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, check_same_thread=False, isolation_level=None,
+                                   cached_statements=256)
+        conexion.row_factory = sqlite3.Row
+        conexion.execute("pragma journal_mode=wal")
+        conexion.execute("pragma synchronous=normal")
+        conexion.execute("pragma foreign_keys=on")
+        conexion.execute("pragma busy_timeout=5000")
+        return conexion
+
+    def _con_conexion(self, funcion, *args):
+        conexion = self._pool.get()
+        try:
+            return funcion(conexion, *args)
+        finally:
+            self._pool.put(conexion)
+
+    @staticmethod
+    def _leer(conexion, sql: str, parametros: tuple) -> list:
+        return [_fila(r) for r in conexion.execute(_a_sqlite(sql), parametros).fetchall()]
+
+    @staticmethod
+    def _escribir(conexion, sentencias: list):
+        conexion.execute("begin immediate")
+        try:
+            for sql, filas in sentencias:
+                if filas:
+                    conexion.executemany(_a_sqlite(sql), filas)
+            conexion.execute("commit")
+        except Exception:
+            conexion.execute("rollback")
+            raise
+
+    async def _consultar(self, sql: str, parametros: tuple = ()) -> list:
+        return await run_in_threadpool(self._con_conexion, self._leer, sql, parametros)
+
+    async def _transaccion(self, sentencias: list):
+        await run_in_threadpool(self._con_conexion, self._escribir, sentencias)
+
+    async def cerrar(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class RepositorioPostgres(RepositorioSQL):
+    """Postgres directo con un pool de asyncpg (sentencias preparadas y cacheadas por conexión).
+
+    El esquema es el de Supabase; los índices están en sql/004_indices.sql.
+    """
+
+    def __init__(self, dsn: str, tam_pool: int = int(os.getenv("DATABASE_POOL", "10"))):
+        if not dsn:
+            raise RuntimeError("REPOSITORIO=postgres requiere DATABASE_URL")
+        self.dsn = dsn
+        self.tam_pool = tam_pool
+        self._pool = None
+
+    @staticmethod
+    async def _configurar(conexion):
+        for tipo in ("json", "jsonb"):
+            await conexion.set_type_codec(tipo, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+    async def _obtener_pool(self):
+        if self._pool is None:
+            try:
+                import asyncpg
+            except ImportError:
+                raise RuntimeError("REPOSITORIO=postgres requiere instalar asyncpg")
+            self._pool = await asyncpg.create_pool(
+                self.dsn, min_size=1, max_size=self.tam_pool, init=self._configurar,
+                server_settings={"search_path": "public"})
+        return self._pool
+
+    def _tiempo(self, valor):
+        if isinstance(valor, str):
+            return datetime.fromisoformat(valor.replace("Z", "+00:00"))
+        return valor
+
+    async def _consultar(self, sql: str, parametros: tuple = ()) -> list:
+        pool = await self._obtener_pool()
+        async with pool.acquire() as conexion:
+            return [_fila(r) for r in await conexion.fetch(sql, *parametros)]
+
+    async def _transaccion(self, sentencias: list):
+        pool = await self._obtener_pool()
+        async with pool.acquire() as conexion:
+            async with conexion.transaction():
+                for sql, filas in sentencias:
+                    if filas:
+                        await conexion.executemany(sql, filas)
+
+    async def analitica(self, form_id: str, intervalo: str, desde=None, hasta=None) -> dict:
+        pool = await self._obtener_pool()
+        async with pool.acquire() as conexion:
+            return await conexion.fetchval(
+                "select analitica_formulario($1, $2, $3, $4)", form_id, intervalo, desde, hasta)
+
+    async def historial(self, user_id: str, form_id: str, puntos: int, desde=None, hasta=None) -> dict:
+        pool = await self._obtener_pool()
+        async with pool.acquire() as conexion:
+            return await conexion.fetchval(
+                "select historial_puntajes($1, $2, $3, $4, $5)", user_id, form_id, puntos, desde, hasta)
+
+    async def cerrar(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
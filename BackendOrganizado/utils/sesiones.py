@@ -0,0 +1,117 @@
+from fastapi import HTTPException
+from typing import Optional
+from utils import auth_utils
+from utils.almacen import get_almacen
+from utils.coalescer import SingleFlight
+from utils.config import cliente_auth
+from utils.esquemas import Usuario
+import hashlib
+import logging
+import os
+
+# Sesiones de usuario del lado del servidor. Cada login, refresh o logout usa
+# su propio cliente de auth (utils.config.cliente_auth), nunca el compartido,
+# así que un usuario no pisa la sesión de otro en el mismo worker.
+#
+# El refresh_token de cada access_token emitido queda en el almacén compartido
+# (utils/almacen.py), así que con varios workers cualquiera lo encuentra: el
+# cliente puede llamar a /auth/refresh solo con su Bearer antes de que venza,
+# sin volver a pedir la contraseña.
+SESION_TTL = float(os.getenv("SESION_TTL", str(7 * 24 * 3600)))
+
+# Un Bearer solo sirve para renovar si vence dentro de esta ventana o venció
+# hace menos que esto; uno viejo o filtrado no es una credencial de larga vida.
+RENOVACION_HOLGURA = float(os.getenv("RENOVACION_HOLGURA", "300"))
+
+# Supabase invalida el refresh_token al usarlo: si dos pestañas refrescan a la
+# vez, la segunda recibe la misma sesión nueva en lugar de un error (en el
+# mismo worker por SingleFlight; en otro, por la copia de RENOVADA_TTL segundos).
+_renovaciones = SingleFlight()
+RENOVADA_TTL = 10
+
+log = logging.getLogger(__name__)
+
+
+def _clave(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def _abrir(sesion) -> dict:
+    """Guarda la sesión y arma la respuesta de login/refresh."""
+    await auth_utils.registrar_sesion(sesion.access_token)
+    try:
+        await get_almacen().guardar(f"sesion:{_clave(sesion.access_token)}", sesion.refresh_token, SESION_TTL)
+    except Exception as e:
+        # El login sigue valiendo; solo /auth/refresh necesitará el refresh_token en el body
+        log.warning("No se pudo guardar la sesión en el almacén: %s", e)
+    return {
+        "exito": True,
+        "access_token": sesion.access_token,
+        "refresh_token": sesion.refresh_token,
+        "expires_at": sesion.expires_at,
+        "usuario": Usuario.desde_supabase(sesion.user).model_dump(),
+    }
+
+
+async def registrar(email: str, password: str) -> dict:
+    """Alta de usuario; si el proyecto no pide confirmar el correo ya queda con
+    sesión y se devuelven sus tokens como en el login."""
+    resp = await cliente_auth().sign_up({"email": email, "password": password})
+    if resp.user is None:
+        raise HTTPException(400, "No se pudo registrar el usuario")
+    if resp.session:
+        return await _abrir(resp.session)
+    return {"exito": True, "usuario": Usuario.desde_supabase(resp.user)}
+
+
+async def iniciar(email: str, password: str) -> dict:
+    resp = await cliente_auth().sign_in_with_password({"email": email, "password": password})
+    if not resp.session:
+        raise HTTPException(400, "Credenciales inválidas")
+    return await _abrir(resp.session)
+
+
+async def renovar(refresh_token: Optional[str], access_token: Optional[str] = None) -> dict:
+    """Nuevo access_token a partir del refresh_token enviado o, si no viene, del
+    que se guardó al emitir `access_token`."""
+    if not refresh_token and access_token:
+        await auth_utils.verificar_para_renovar(access_token, RENOVACION_HOLGURA)
+        refresh_token = await get_almacen().obtener(f"sesion:{_clave(access_token)}")
+    if not refresh_token:
+        raise HTTPException(400, "Se requiere el refresh_token")
+
+    clave = _clave(refresh_token)
+    hecha = await get_almacen().obtener(f"renovada:{clave}")
+    if hecha is not None:
+        return hecha
+
+    async def pedir():
+        try:
+            resp = await cliente_auth().refresh_session(refresh_token)
+        except Exception:
+            raise HTTPException(401, "Sesión expirada, inicia sesión de nuevo")
+        # La entrada del access_token anterior se deja: dentro de RENOVADA_TTL
+        # otra pestaña con ese token recibe esta misma sesión
+        resultado = await _abrir(resp.session)
+        await get_almacen().guardar(f"renovada:{clave}", resultado, RENOVADA_TTL)
+        return resultado
+
+    return await _renovaciones.hacer(clave, pedir)
+
+
+async def cerrar(access_token: str):
+    """Revoca la sesión del token (solo esa, scope local) en el servidor de auth
+    y lo rechaza en este proceso hasta que expire."""
+    try:
+        await get_almacen().borrar(f"sesion:{_clave(access_token)}")
+    except Exception as e:
+        # Sin almacén el cierre sigue: la entrada vence sola en SESION_TTL y el
+        # token queda revocado igual
+        log.warning("No se pudo borrar la sesión del almacén: %s", e)
+    await auth_utils.revocar(access_token)
+    try:
+        await cliente_auth().admin.sign_out(access_token, "local")
+    except Exception as e:
+        # Un token ya vencido o revocado no tiene nada más que cerrar
+        log.info("No se pudo revocar la sesión en el servidor de auth: %s", e)
+